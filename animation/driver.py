@@ -0,0 +1,151 @@
+from array import array
+
+from animation.tables import FrameClock
+from instrumentation.metrics import timer
+
+# What an AnimatedShape has staged for its next commit
+_MOVED = 1
+_POINTS = 2
+_RADIUS = 4
+
+
+class AnimationDriver:
+    def __init__(self, display):
+        """
+        Commits staged shape changes once per frame and refreshes the display only when something changed.
+
+        Animations write to AnimatedShapes from track() instead of to vectorio directly.  Writes that change
+          nothing are dropped, the rest are held until frame(), which applies each changed shape's properties in
+          one go and calls display.refresh() at most once.  Turns off the display's auto_refresh so frames are the
+          only refreshes.
+
+        Animations that depend on time can take their phase from clock, an animation.tables.FrameClock ticked once
+          per frame, rather than each reading the time.
+
+        :param display: a displayio.Display
+        """
+        self._display = display
+        display.auto_refresh = False
+        self._shapes = []
+        # Changed shapes in _dirty[:_dirty_count], so marking one doesn't grow a list
+        self._dirty = []
+        self._dirty_count = 0
+        self.clock = FrameClock()
+        self.frames = 0
+        self.refreshes = 0
+
+    def track(self, vector_shape, shape=None):
+        """
+        Start animating a vectorio.VectorShape.
+        :param shape: the VectorShape's vectorio.Polygon or vectorio.Circle, if you'll change its points or radius
+        :return: the AnimatedShape to write to
+        """
+        animated = AnimatedShape(self, vector_shape, shape)
+        self._shapes.append(animated)
+        self._dirty.append(None)
+        return animated
+
+    def _mark(self, animated):
+        self._dirty[self._dirty_count] = animated
+        self._dirty_count += 1
+
+    @timer('animation_frame')
+    def frame(self):
+        """
+        Apply this frame's changes and refresh, if there were any.  Schedule it at your frame rate, after the
+          functions that animate.
+        :return: True if the display was refreshed
+        """
+        self.frames += 1
+        # The time for the animations between this frame and the next
+        self.clock.tick()
+        count = self._dirty_count
+        if count == 0:
+            return False
+        dirty = self._dirty
+        for index in range(count):
+            dirty[index]._commit()
+            dirty[index] = None
+        self._dirty_count = 0
+        self._display.refresh()
+        self.refreshes += 1
+        return True
+
+
+class AnimatedShape:
+    __slots__ = (
+        'vector_shape', 'shape', 'points', '_point_list', '_changed_points', '_x', '_y', '_radius', '_dirty', '_driver'
+    )
+
+    def __init__(self, driver, vector_shape, shape):
+        """
+        Staging area for one VectorShape's properties.  Get these from AnimationDriver.track().
+
+        A Polygon's points are kept as x, y pairs in the points array('h'), which set_point() writes in place.  On
+          commit they're copied into a list made once here, so new points don't cost a new list each time.  vectorio
+          wants an (x, y) tuple per point, so a commit builds tuples for the points that changed and keeps the rest.
+        """
+        self.vector_shape = vector_shape
+        self.shape = shape
+        self._driver = driver
+        self._x = vector_shape.x
+        self._y = vector_shape.y
+        self._radius = 0
+        self.points = None
+        self._point_list = None
+        self._changed_points = None
+        if shape is not None and hasattr(shape, 'points'):
+            initial = shape.points
+            self.points = array('h', [0] * (2 * len(initial)))
+            for index in range(len(initial)):
+                self.points[2 * index] = initial[index][0]
+                self.points[2 * index + 1] = initial[index][1]
+            self._point_list = list(initial)
+            self._changed_points = bytearray(len(initial))
+        elif shape is not None and hasattr(shape, 'radius'):
+            self._radius = shape.radius
+        self._dirty = 0
+
+    def move(self, x: int, y: int):
+        if x != self._x or y != self._y:
+            self._x = x
+            self._y = y
+            self._stage(_MOVED)
+
+    def set_point(self, index: int, x: int, y: int):
+        points = self.points
+        offset = 2 * index
+        if points[offset] != x or points[offset + 1] != y:
+            points[offset] = x
+            points[offset + 1] = y
+            self._changed_points[index] = 1
+            self._stage(_POINTS)
+
+    def set_radius(self, radius: int):
+        if radius != self._radius:
+            self._radius = radius
+            self._stage(_RADIUS)
+
+    def _stage(self, change):
+        if not self._dirty:
+            self._driver._mark(self)
+        self._dirty |= change
+
+    def _commit(self):
+        dirty = self._dirty
+        if dirty & _MOVED:
+            self.vector_shape.x = self._x
+            self.vector_shape.y = self._y
+        if dirty & _POINTS:
+            points = self.points
+            point_list = self._point_list
+            changed = self._changed_points
+            for index in range(len(point_list)):
+                if changed[index]:
+                    changed[index] = 0
+                    point_list[index] = (points[2 * index], points[2 * index + 1])
+            # Polygon copies the points, so the same list can be handed over again next time
+            self.shape.points = point_list
+        if dirty & _RADIUS:
+            self.shape.radius = self._radius
+        self._dirty = 0
@@ -0,0 +1,91 @@
+import displayio
+import vectorio
+
+# Draws nothing; stands in for spaces and characters the font doesn't have
+_BLANK = ((0, 0), (0, 0), (0, 0))
+
+
+class VectorFont:
+    def __init__(self, glyphs: dict, spacing: int = 2, space_width: int = None):
+        """
+        A font of vectorio polygons, defined once and shared by every label that uses it.
+
+        Each glyph's Polygon is made the first time it's used and then shared by every VectorShape showing that
+          character, so repeating a character costs a VectorShape and nothing more.
+
+        :param glyphs: character -> polygon points, with (0, 0) at the glyph's top left
+        :param spacing: pixels between glyphs
+        :param space_width: how far a space or a missing character advances.  Defaults to the widest glyph.
+        """
+        self._glyphs = glyphs
+        self._polygons = {}
+        self._advances = {}
+        for character, points in glyphs.items():
+            self._advances[character] = max(x for x, _ in points) + spacing
+        if space_width is None:
+            space_width = max(self._advances.values()) - spacing
+        self._blank_advance = space_width + spacing
+
+    def polygon(self, character: str):
+        """
+        :return: the shared vectorio.Polygon for character
+        """
+        polygon = self._polygons.get(character, None)
+        if polygon is None:
+            polygon = vectorio.Polygon(points=list(self._glyphs.get(character, _BLANK)))
+            self._polygons[character] = polygon
+        return polygon
+
+    def advance(self, character: str) -> int:
+        """
+        :return: pixels from character's left edge to the next one's
+        """
+        return self._advances.get(character, self._blank_advance)
+
+
+class VectorLabel:
+    def __init__(self, font: VectorFont, pixel_shader, max_length: int, text: str = '', x: int = 0, y: int = 0):
+        """
+        A line of text from a VectorFont.  Show it by appending group to your display group; move it with group.x
+          and group.y.
+
+        Setting text only replaces the shapes whose character changed.  Characters that stay the same but shift
+          because an earlier one changed width are moved by x alone.
+
+        :param pixel_shader: a displayio.Palette, shared by every character
+        :param max_length: the most characters it will ever show
+        """
+        self.group = displayio.Group(max_size=max_length, x=x, y=y)
+        self._font = font
+        self._pixel_shader = pixel_shader
+        self._text = ''
+        self.text = text
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    @text.setter
+    def text(self, text: str):
+        old = self._text
+        group = self.group
+        font = self._font
+        x = 0
+        for index in range(len(text)):
+            character = text[index]
+            if index < len(old) and old[index] == character:
+                shape = group[index]
+                if shape.x != x:
+                    shape.x = x
+            else:
+                shape = vectorio.VectorShape(
+                    shape=font.polygon(character), pixel_shader=self._pixel_shader, x=x, y=0
+                )
+                if index < len(old):
+                    group[index] = shape
+                else:
+                    group.append(shape)
+            x += font.advance(character)
+        for _ in range(len(text), len(old)):
+            group.pop()
+        self._text = text
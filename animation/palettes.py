@@ -0,0 +1,78 @@
+import displayio
+
+
+class PaletteCache:
+    def __init__(self, capacity: int = 16):
+        """
+        Interned two-color palettes, so every shape of one color shares one displayio.Palette.
+
+        Palettes are counted by the shapes using them.  Tell the cache with release() when you drop a shape; a
+          palette nothing uses stays cached for the next shape of that color until the cache holds more than
+          capacity, then the least recently released ones go first.  Palettes in use are never evicted, so
+          with more colors on screen than capacity the cache just grows to fit.
+        """
+        self._capacity = capacity
+        self._palettes = {}
+        self._references = {}
+        # Colors whose palettes nothing uses, least recently released first
+        self._unused = []
+
+    def __len__(self):
+        return len(self._palettes)
+
+    def monochrome(self, color: int):
+        """
+        :return: A palette for a vectorio shape: transparent background, color foreground
+        """
+        palette = self._palettes.get(color, None)
+        if palette is None:
+            palette = displayio.Palette(2)
+            palette.make_transparent(0)
+            palette[1] = color
+            self._palettes[color] = palette
+            self._references[color] = 1
+            self._evict()
+            return palette
+        references = self._references[color]
+        if references == 0:
+            self._unused.remove(color)
+        self._references[color] = references + 1
+        return palette
+
+    def release(self, color: int):
+        """
+        A shape using color's palette is gone.  Release once per monochrome() call.
+        :raises ValueError: when no shape is using color's palette, rather than let a count go below zero and
+          the palette be evicted while a shape still shows it
+        """
+        references = self._references.get(color, 0)
+        if references == 0:
+            raise ValueError('no palette in use for color 0x{:06x}'.format(color))
+        references -= 1
+        self._references[color] = references
+        if references == 0:
+            self._unused.append(color)
+            self._evict()
+
+    def _evict(self):
+        while len(self._palettes) > self._capacity and self._unused:
+            color = self._unused.pop(0)
+            del self._palettes[color]
+            del self._references[color]
+
+
+_default_cache = PaletteCache()
+
+
+def monochrome(color: int):
+    """
+    :return: the shared palette for color from the default PaletteCache
+    """
+    return _default_cache.monochrome(color)
+
+
+def release(color: int):
+    """
+    Release a palette from monochrome() when its shape is gone.
+    """
+    _default_cache.release(color)
@@ -0,0 +1,80 @@
+import math
+from array import array
+
+from functional.ticks import ticks_ms
+
+#
+# Fixed point lookup tables for animations, so a frame costs integer math and no float boxing.
+#
+# Phases are ints in [0, PHASE_PERIOD), a whole cycle.  Table values are fixed point with ONE meaning 1.0, so
+#  scale(value, amount) multiplies an int by one.  Each table has TABLE_SIZE entries over a cycle; phases between
+#  entries round down.
+#
+
+PHASE_BITS = 12
+PHASE_PERIOD = 1 << PHASE_BITS
+TABLE_BITS = 8
+TABLE_SIZE = 1 << TABLE_BITS
+FRACTION_BITS = 14
+ONE = 1 << FRACTION_BITS
+
+_INDEX_SHIFT = PHASE_BITS - TABLE_BITS
+_INDEX_MASK = TABLE_SIZE - 1
+_QUARTER = TABLE_SIZE // 4
+
+# sin over a cycle: -ONE to ONE
+SINE = array('h', [round(math.sin(2 * math.pi * index / TABLE_SIZE) * ONE) for index in range(TABLE_SIZE)])
+# 0 up to ONE at half a cycle and back down
+TRIANGLE = array('h', [
+    round(ONE * (1 - abs(2 * index - TABLE_SIZE) / TABLE_SIZE)) for index in range(TABLE_SIZE)
+])
+# 0 to ONE over a cycle, slow at both ends
+EASE_IN_OUT = array('h', [
+    round(ONE * (1 - math.cos(math.pi * index / (TABLE_SIZE - 1))) / 2) for index in range(TABLE_SIZE)
+])
+
+
+def sin(phase: int) -> int:
+    return SINE[(phase >> _INDEX_SHIFT) & _INDEX_MASK]
+
+
+def cos(phase: int) -> int:
+    return SINE[((phase >> _INDEX_SHIFT) + _QUARTER) & _INDEX_MASK]
+
+
+def lookup(table, phase: int) -> int:
+    """
+    table's value at phase, for TRIANGLE, EASE_IN_OUT or a table of your own with TABLE_SIZE entries.
+    """
+    return table[(phase >> _INDEX_SHIFT) & _INDEX_MASK]
+
+
+def scale(value: int, amount: int) -> int:
+    """
+    value * amount, where amount is fixed point like the tables' values.
+    """
+    return (value * amount) >> FRACTION_BITS
+
+
+class FrameClock:
+    def __init__(self):
+        """
+        One clock read per frame, shared by every animation in it.
+
+        tick() reads ticks_ms() once; phase() turns that into where a cycle of some period is, with integer
+          math.  Animations that ask for a phase during the same frame all see the same instant.
+
+        Phases jump when ticks_ms() wraps, every 6 days or so.
+        """
+        self.now_ms = ticks_ms()
+
+    def tick(self) -> int:
+        self.now_ms = ticks_ms()
+        return self.now_ms
+
+    def phase(self, period_ms: int) -> int:
+        """
+        :param period_ms: up to 2**17 (about 2 minutes), so the math stays in small ints on a board
+        :return: how far through a cycle of period_ms the last tick() was, in [0, PHASE_PERIOD)
+        """
+        return ((self.now_ms % period_ms) << PHASE_BITS) // period_ms
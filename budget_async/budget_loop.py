@@ -0,0 +1,130 @@
+import time
+
+from budget_async.heap import heappush, heappop
+
+
+class BudgetEventLoop:
+    def __init__(self, budget_ms: float = 10):
+        """
+        A cooperative event loop you drive yourself, one tick at a time, from your loop().
+
+        Each next(loop) wakes the sleepers whose deadlines have passed and then runs ready tasks until
+          either every task that was ready at the start of the tick has had a turn or budget_ms runs out.
+          Whatever didn't get a turn goes first next tick.  A tick with nothing ready costs a clock read
+          and a couple of comparisons.
+
+        Sleeping tasks wait in a heap keyed by deadline, so a tick is O(log n) in sleeping tasks rather
+          than a scan over all of them.
+
+        :param budget_ms: float milliseconds: How long one tick may spend running tasks.  At least one task
+          always runs per tick with ready work, so a slow task can overrun this but can't starve the loop.
+        """
+        self._budget_ns = int(budget_ms * 1000000)
+        self._ready = []
+        self._spare = []
+        self._sleeping = []
+        self._sequence = 0
+
+    def create_task(self, coroutine):
+        """
+        Schedule a coroutine to start on the next tick.
+        :return: the coroutine you passed in
+        """
+        self._ready.append(coroutine)
+        return coroutine
+
+    def sleep(self, seconds: float):
+        """
+        await loop.sleep(seconds) from a task to give up the cpu until seconds have elapsed.
+        await loop.sleep(0) yields to the other ready tasks.
+        The deadline is counted from this call, so a sleep you hold on to before awaiting ends that much sooner.
+        """
+        return _Sleep(time.monotonic_ns() + int(seconds * 1000000000))
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        """
+        Run one tick.
+        :return: int nanoseconds until the loop has work to do: 0 if tasks are ready now, None if no task
+          is scheduled at all.  Handy if you want to sleep between ticks.
+        """
+        now = time.monotonic_ns()
+        ready = self._ready
+        sleeping = self._sleeping
+        while sleeping and sleeping[0][0] <= now:
+            ready.append(heappop(sleeping)[2])
+        if ready:
+            self._run_ready(ready, now + self._budget_ns)
+        if self._ready:
+            return 0
+        if sleeping:
+            return max(0, sleeping[0][0] - time.monotonic_ns())
+        return None
+
+    def run_forever(self):
+        """
+        Tick forever, sleeping through the idle gaps between deadlines.
+        """
+        while True:
+            wait_nanos = next(self)
+            if wait_nanos is None:
+                return
+            if wait_nanos > 0:
+                time.sleep(wait_nanos / 1000000000)
+
+    def _run_ready(self, ready, deadline):
+        # Tasks that become ready while this tick runs queue up behind the ones that were already waiting.
+        requeued = self._spare
+        self._ready = requeued
+        ran = 0
+        try:
+            for task in ready:
+                ran += 1
+                self._step(task)
+                if time.monotonic_ns() >= deadline:
+                    break
+        finally:
+            del ready[:ran]
+            ready.extend(requeued)
+            requeued.clear()
+            self._spare = requeued
+            self._ready = ready
+
+    def _step(self, task):
+        try:
+            request = task.send(None)
+        except StopIteration:
+            return
+        if type(request) is _Sleep:
+            self._sequence += 1
+            heappush(self._sleeping, (request.deadline, self._sequence, task))
+        else:
+            # A bare yield: go again on the next tick.
+            self._ready.append(task)
+
+
+class _Sleep:
+    """
+    The awaitable behind BudgetEventLoop.sleep().  One per call, so sleeps that are stored or gathered before
+      being awaited each keep their own deadline.
+    """
+    __slots__ = ('deadline', '_pending')
+
+    def __init__(self, deadline):
+        self.deadline = deadline
+        self._pending = True
+
+    def __await__(self):
+        return self
+
+    __iter__ = __await__
+
+    def __next__(self):
+        if self._pending:
+            # First step: hand ourselves to the loop, which reads the deadline.
+            self._pending = False
+            return self
+        # Resumed by the loop: the sleep is over.
+        raise StopIteration
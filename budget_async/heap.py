@@ -0,0 +1,43 @@
+# heapq-compatible min-heap helpers for the schedulers in this repo.
+#
+# CPython and some MicroPython ports ship heapq; most CircuitPython builds don't.  Either way
+#  you get heappush/heappop operating on a plain list in O(log n).
+try:
+    from heapq import heappush, heappop
+except ImportError:
+    def heappush(heap, item):
+        """
+        Push item onto heap, maintaining the heap invariant.
+        """
+        heap.append(item)
+        position = len(heap) - 1
+        while position > 0:
+            parent = (position - 1) >> 1
+            if not item < heap[parent]:
+                break
+            heap[position] = heap[parent]
+            position = parent
+        heap[position] = item
+
+    def heappop(heap):
+        """
+        Pop and return the smallest item from heap, maintaining the heap invariant.
+        """
+        last = heap.pop()
+        if not heap:
+            return last
+        smallest = heap[0]
+        size = len(heap)
+        position = 0
+        child = 1
+        while child < size:
+            right = child + 1
+            if right < size and heap[right] < heap[child]:
+                child = right
+            if not heap[child] < last:
+                break
+            heap[position] = heap[child]
+            position = child
+            child = 2 * position + 1
+        heap[position] = last
+        return smallest
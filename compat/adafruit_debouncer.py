@@ -0,0 +1,37 @@
+# Host stand-in for adafruit_debouncer.
+
+
+class Debouncer:
+    def __init__(self, io=None, interval=0.010):
+        """
+        A debounced input you drive with press() and release() instead of a pin.
+
+        Like a button wired to a pulled up pin, value is True while released.  Changes show up as
+          fell/rose on the next update(), one update later, like the real thing.
+        """
+        self.interval = interval
+        self._pressed = False
+        self._value = True
+        self._previous = True
+
+    def press(self):
+        self._pressed = True
+
+    def release(self):
+        self._pressed = False
+
+    def update(self):
+        self._previous = self._value
+        self._value = not self._pressed
+
+    @property
+    def value(self):
+        return self._value
+
+    @property
+    def rose(self):
+        return self._value and not self._previous
+
+    @property
+    def fell(self):
+        return self._previous and not self._value
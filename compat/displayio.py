@@ -0,0 +1,90 @@
+# Host stand-in for CircuitPython's displayio: enough to build and animate scenes without a screen.
+
+
+def release_displays():
+    pass
+
+
+class Palette:
+    def __init__(self, color_count: int):
+        self._colors = [0] * color_count
+        self._transparent = set()
+
+    def make_transparent(self, palette_index: int):
+        self._transparent.add(palette_index)
+
+    def make_opaque(self, palette_index: int):
+        self._transparent.discard(palette_index)
+
+    def is_transparent(self, palette_index: int):
+        return palette_index in self._transparent
+
+    def __len__(self):
+        return len(self._colors)
+
+    def __getitem__(self, index):
+        return self._colors[index]
+
+    def __setitem__(self, index, color):
+        self._colors[index] = color
+
+
+class Group:
+    def __init__(self, max_size: int = 4, scale: int = 1, x: int = 0, y: int = 0):
+        self._max_size = max_size
+        self._layers = []
+        self.scale = scale
+        self.x = x
+        self.y = y
+        self.hidden = False
+
+    def append(self, layer):
+        if len(self._layers) >= self._max_size:
+            raise RuntimeError('Group full')
+        self._layers.append(layer)
+
+    def insert(self, index, layer):
+        if len(self._layers) >= self._max_size:
+            raise RuntimeError('Group full')
+        self._layers.insert(index, layer)
+
+    def remove(self, layer):
+        self._layers.remove(layer)
+
+    def pop(self, index=-1):
+        return self._layers.pop(index)
+
+    def index(self, layer):
+        return self._layers.index(layer)
+
+    def __len__(self):
+        return len(self._layers)
+
+    def __getitem__(self, index):
+        return self._layers[index]
+
+    def __setitem__(self, index, layer):
+        self._layers[index] = layer
+
+    def __delitem__(self, index):
+        del self._layers[index]
+
+
+class Display:
+    def __init__(self, width: int = 320, height: int = 240, auto_refresh: bool = True):
+        """
+        Counts refreshes instead of drawing.
+        """
+        self.width = width
+        self.height = height
+        self.auto_refresh = auto_refresh
+        self.brightness = 1
+        self.root_group = None
+        self.refresh_count = 0
+
+    def show(self, group):
+        self.root_group = group
+
+    def refresh(self, *, target_frames_per_second=60, minimum_frames_per_second=1):
+        self.refresh_count += 1
+        return True
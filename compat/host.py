@@ -0,0 +1,101 @@
+import gc
+import sys
+
+#
+# Run the utilities under desktop python.
+#
+# import compat.host
+# compat.host.install()
+#
+# After install(), gc.mem_alloc()/gc.mem_free() work (backed by tracemalloc) and `import displayio`, `vectorio`,
+#  `rotaryio`, `keypad` and `adafruit_debouncer` get the fakes in this package.  Call it before importing anything that
+#  uses them.
+#
+# Benchmarks measure allocations with bytes_per_call(), which also runs on a board: tracemalloc is only imported
+#  under desktop python, so the benchmarks in examples/ can be copied over with this file.
+#
+
+# Pretend heap size for mem_free(), about what a Feather M4 has left for python.
+HEAP_SIZE = 192 * 1024
+
+
+def mem_alloc():
+    """Bytes currently allocated by python, as traced since install()"""
+    import tracemalloc
+    return tracemalloc.get_traced_memory()[0]
+
+
+def mem_free():
+    """HEAP_SIZE less what's allocated.  Can go negative: desktop python doesn't run out where a board would."""
+    return HEAP_SIZE - mem_alloc()
+
+
+def bytes_per_call(function, calls: int = 1000, batch: int = 100) -> float:
+    """
+    Average bytes allocated by function() over calls calls, garbage included.
+
+    On a board gc.mem_alloc() only goes up while the gc is disabled, so a difference counts every byte.  The calls
+      run batch at a time with a collection in between, so the garbage fits in a small heap.
+    Desktop python frees garbage as soon as nothing refers to it, so tracemalloc's current total misses it.  This
+      adds up tracemalloc's peak over each call instead, which counts what a call allocated even if it was freed
+      before returning.  Desktop objects are bigger than a board's, so compare paths rather than reading absolute
+      numbers there.
+    """
+    try:
+        import tracemalloc
+    except ImportError:
+        return _board_bytes_per_call(function, calls, batch)
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        total = 0
+        for _ in range(calls):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            function()
+            total += tracemalloc.get_traced_memory()[1] - before
+        return total / calls
+    finally:
+        if started:
+            tracemalloc.stop()
+
+
+def _board_bytes_per_call(function, calls, batch):
+    total = 0
+    remaining = calls
+    while remaining > 0:
+        count = min(batch, remaining)
+        remaining -= count
+        gc.collect()
+        gc.disable()
+        try:
+            before = gc.mem_alloc()
+            for _ in range(count):
+                function()
+            total += gc.mem_alloc() - before
+        finally:
+            gc.enable()
+    return total / calls
+
+
+def install():
+    """
+    Start tracing allocations, give gc mem_alloc/mem_free, and register the fake hardware modules.
+    Safe to call more than once.
+    """
+    import tracemalloc
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if not hasattr(gc, 'mem_alloc'):
+        gc.mem_alloc = mem_alloc
+        gc.mem_free = mem_free
+    from compat import adafruit_debouncer, displayio, keypad, rotaryio, vectorio
+    for name, module in (
+            ('adafruit_debouncer', adafruit_debouncer),
+            ('displayio', displayio),
+            ('keypad', keypad),
+            ('rotaryio', rotaryio),
+            ('vectorio', vectorio),
+    ):
+        sys.modules.setdefault(name, module)
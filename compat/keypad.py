@@ -0,0 +1,69 @@
+# Host stand-in for CircuitPython's keypad.
+from functional.ticks import ticks_ms as _ticks_ms
+
+
+class Event:
+    def __init__(self, key_number: int = 0, pressed: bool = True, timestamp: int = None):
+        self.key_number = key_number
+        self.pressed = pressed
+        self.timestamp = _ticks_ms() if timestamp is None else timestamp
+
+    @property
+    def released(self):
+        return not self.pressed
+
+
+class EventQueue:
+    def __init__(self, max_events: int = 64):
+        self._events = []
+        self._max_events = max_events
+        self.overflowed = False
+
+    def get(self):
+        return self._events.pop(0) if self._events else None
+
+    def get_into(self, event: Event) -> bool:
+        if not self._events:
+            return False
+        queued = self._events.pop(0)
+        event.key_number = queued.key_number
+        event.pressed = queued.pressed
+        event.timestamp = queued.timestamp
+        return True
+
+    def clear(self):
+        self._events.clear()
+        self.overflowed = False
+
+    def __len__(self):
+        return len(self._events)
+
+    def __bool__(self):
+        return len(self._events) > 0
+
+    def _put(self, event):
+        if len(self._events) >= self._max_events:
+            self.overflowed = True
+        else:
+            self._events.append(event)
+
+
+class Keys:
+    def __init__(self, pins=(), *, value_when_pressed=False, pull=True, interval=0.02, max_events=64):
+        """
+        Queues events when you call press() and release() instead of scanning pins.
+        """
+        self.key_count = len(pins)
+        self.events = EventQueue(max_events)
+
+    def press(self, key_number: int, timestamp: int = None):
+        self.events._put(Event(key_number, True, timestamp))
+
+    def release(self, key_number: int, timestamp: int = None):
+        self.events._put(Event(key_number, False, timestamp))
+
+    def reset(self):
+        self.events.clear()
+
+    def deinit(self):
+        pass
@@ -0,0 +1,23 @@
+# Host stand-in for CircuitPython's rotaryio.
+
+
+class IncrementalEncoder:
+    def __init__(self, pin_a=None, pin_b=None, divisor=4):
+        """
+        Counts detents when you call turn() instead of reading pins.
+        """
+        self.position = 0
+        self.divisor = divisor
+
+    def turn(self, detents: int):
+        """Turn the knob: positive one way, negative the other."""
+        self.position += detents
+
+    def deinit(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.deinit()
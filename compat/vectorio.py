@@ -0,0 +1,25 @@
+# Host stand-in for CircuitPython's vectorio.
+
+
+class Polygon:
+    def __init__(self, *, points):
+        self.points = points
+
+
+class Circle:
+    def __init__(self, *, radius):
+        self.radius = radius
+
+
+class Rectangle:
+    def __init__(self, *, width, height):
+        self.width = width
+        self.height = height
+
+
+class VectorShape:
+    def __init__(self, *, shape, pixel_shader, x=0, y=0):
+        self.shape = shape
+        self.pixel_shader = pixel_shader
+        self.x = x
+        self.y = y
@@ -0,0 +1,77 @@
+from array import array
+
+from functional.ticks import ticks_diff
+
+# Multipliers are stored in fixed point with this many fractional bits
+_FRACTION_BITS = 4
+_ONE = 1 << _FRACTION_BITS
+
+
+class Acceleration:
+    def __init__(self, window_ms: int = 150,
+                 curve: tuple = ((0, 1), (3, 1), (6, 3), (12, 8), (24, 20)),
+                 history: int = 8
+    ):
+        """
+        Turns fast spins into bigger increments, so crossing a long list or a wide range takes a flick instead of
+          hundreds of detents.
+
+        Remembers the last few ticks' detents and when they happened, counts the detents in the last window_ms
+          and looks up a multiplier for that speed.  The curve is interpolated into a lookup table up front, so
+          scale() is integer math.
+
+        :param window_ms: how far back to count detents
+        :param curve: (detents per window, multiplier) points, ascending.  Speeds between points are interpolated
+          and speeds past the last point use its multiplier.
+        :param history: how many ticks with rotation to remember.  Spins with more ticks than this per window read slower.
+        """
+        self._window_ms = window_ms
+        max_rate = curve[-1][0]
+        table = array('H', [_ONE] * (max_rate + 1))
+        for point in range(len(curve) - 1):
+            (rate_from, multiplier_from), (rate_to, multiplier_to) = curve[point], curve[point + 1]
+            for rate in range(rate_from, rate_to + 1):
+                fraction = (rate - rate_from) / max(1, rate_to - rate_from)
+                multiplier = multiplier_from + fraction * (multiplier_to - multiplier_from)
+                table[rate] = max(_ONE, int(multiplier * _ONE + 0.5))
+        self._table = table
+        self._max_rate = max_rate
+        self._timestamps = array('L', [0] * history)
+        self._detents = array('H', [0] * history)
+        self._next = 0
+        # When scale() was last called, None before the first call and after reset()
+        self._last_ms = None
+
+    def scale(self, delta: int, now_ms: int) -> int:
+        """
+        Record delta detents at now_ms and return it scaled for how fast the knob is turning.
+        :param now_ms: functional.ticks.ticks_ms()
+        """
+        magnitude = delta if delta >= 0 else -delta
+        if self._last_ms is not None:
+            gap = ticks_diff(now_ms, self._last_ms)
+            if gap < 0 or gap >= self._window_ms:
+                # Still long enough that none of the history counts.  Forget it, or ticks_ms() wrapping could
+                #  bring timestamps from days ago back into the window.
+                self.reset()
+        self._last_ms = now_ms
+        index = self._next
+        self._timestamps[index] = now_ms
+        self._detents[index] = magnitude if magnitude < 65535 else 65535
+        self._next = (index + 1) % len(self._timestamps)
+
+        rate = 0
+        for entry in range(len(self._timestamps)):
+            age = ticks_diff(now_ms, self._timestamps[entry])
+            if 0 <= age < self._window_ms:
+                rate += self._detents[entry]
+        if rate > self._max_rate:
+            rate = self._max_rate
+        scaled = (magnitude * self._table[rate] + (_ONE >> 1)) >> _FRACTION_BITS
+        return scaled if delta >= 0 else -scaled
+
+    def reset(self):
+        """Forget the history.  scale() does this itself when the knob has been still for window_ms."""
+        for entry in range(len(self._detents)):
+            self._detents[entry] = 0
+        self._last_ms = None
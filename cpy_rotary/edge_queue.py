@@ -0,0 +1,154 @@
+from array import array
+
+from functional.ticks import ticks_ms
+
+PRESS = 1
+RELEASE = 2
+ROTATE = 3
+# Interpreted button events, as InputManager queues them
+CLICK = 4
+LONGHOLD_HOLD = 5
+LONGHOLD_RELEASE = 6
+
+
+class EdgeEvent:
+    """
+    One event out of an EdgeQueue.  Reuse one with EdgeQueue.get_into() so reading events doesn't allocate.
+    """
+    __slots__ = ('kind', 'key_number', 'value', 'timestamp')
+
+    def __init__(self):
+        self.kind = 0
+        # Which encoder or button, when there are several
+        self.key_number = 0
+        # Rotation delta for ROTATE
+        self.value = 0
+        self.timestamp = 0
+
+    @property
+    def pressed(self):
+        return self.kind == PRESS
+
+    @property
+    def released(self):
+        return self.kind == RELEASE
+
+
+class EdgeQueue:
+    def __init__(self, capacity: int = 16):
+        """
+        Fixed size ring of button edges and rotation deltas, shaped like keypad.EventQueue.
+
+        Whatever sees input pushes into it (an EdgeSource polling keypad/rotaryio, or a test) and the consumer
+          drains everything pending in one go.  Nothing is allocated after construction.
+
+        Rotations pushed right after a rotation of the same key merge into it, so a fast spin takes one slot and
+          rotation is never dropped while the last slot is a rotation.  Otherwise when full, new events are dropped and
+          overflowed is set.
+        """
+        self._kinds = array('B', [0] * capacity)
+        self._key_numbers = array('B', [0] * capacity)
+        self._values = array('l', [0] * capacity)
+        self._timestamps = array('L', [0] * capacity)
+        self._capacity = capacity
+        self._head = 0
+        self._length = 0
+        self.overflowed = False
+
+    def __len__(self):
+        return self._length
+
+    def __bool__(self):
+        return self._length > 0
+
+    def push_press(self, key_number: int = 0, timestamp: int = None):
+        self.push(PRESS, key_number, 0, timestamp)
+
+    def push_release(self, key_number: int = 0, timestamp: int = None):
+        self.push(RELEASE, key_number, 0, timestamp)
+
+    def push_rotation(self, delta: int, key_number: int = 0, timestamp: int = None):
+        """
+        :param delta: detents, signed the way RotaryButton reports them to on_increment
+        """
+        if delta == 0:
+            return
+        if self._length > 0:
+            tail = (self._head + self._length - 1) % self._capacity
+            if self._kinds[tail] == ROTATE and self._key_numbers[tail] == key_number:
+                self._values[tail] += delta
+                return
+        self.push(ROTATE, key_number, delta, timestamp)
+
+    def push(self, kind: int, key_number: int, value: int, timestamp: int = None):
+        """
+        Queue any kind of event.  Drops it and sets overflowed when full.
+        :param timestamp: ticks_ms() when it happened; now if None
+        """
+        if self._length == self._capacity:
+            self.overflowed = True
+            return
+        tail = (self._head + self._length) % self._capacity
+        self._kinds[tail] = kind
+        self._key_numbers[tail] = key_number
+        self._values[tail] = value
+        self._timestamps[tail] = ticks_ms() if timestamp is None else timestamp
+        self._length += 1
+
+    def get_into(self, event: EdgeEvent) -> bool:
+        """
+        Move the oldest event into event.
+        :return: False if there was nothing to get
+        """
+        if self._length == 0:
+            return False
+        head = self._head
+        event.kind = self._kinds[head]
+        event.key_number = self._key_numbers[head]
+        event.value = self._values[head]
+        event.timestamp = self._timestamps[head]
+        self._head = (head + 1) % self._capacity
+        self._length -= 1
+        return True
+
+    def clear(self):
+        self._head = 0
+        self._length = 0
+        self.overflowed = False
+
+
+class EdgeSource:
+    def __init__(self, queue: EdgeQueue, encoder=None, keys=None):
+        """
+        Feeds an EdgeQueue from hardware that keeps counting while your loop is busy: a rotaryio.IncrementalEncoder
+          (or countio.Counter) for rotation, a keypad.Keys for the button.  Slow loops don't lose detents or clicks,
+          they just see them in a batch.
+
+        :param encoder: anything with a position
+        :param keys: a keypad.Keys (or anything with an events queue of keypad.Events)
+        """
+        self._queue = queue
+        self._encoder = encoder
+        self._position = 0 if encoder is None else encoder.position
+        self._keys = keys
+        self._key_event = None
+        if keys is not None:
+            import keypad
+            self._key_event = keypad.Event()
+
+    def poll(self):
+        """Move whatever happened since the last poll into the queue."""
+        encoder = self._encoder
+        if encoder is not None:
+            position = encoder.position
+            if position != self._position:
+                self._queue.push_rotation(self._position - position)
+                self._position = position
+        keys = self._keys
+        if keys is not None and keys.events:
+            event = self._key_event
+            while keys.events.get_into(event):
+                if event.pressed:
+                    self._queue.push_press(event.key_number, event.timestamp)
+                else:
+                    self._queue.push_release(event.key_number, event.timestamp)
@@ -0,0 +1,217 @@
+from instrumentation.metrics import timer
+from cpy_rotary.edge_queue import EdgeEvent, ROTATE
+from functional.ticks import ticks_ms, ticks_add, ticks_diff
+
+_do_nothing = tuple()
+
+# States
+IDLE = 0
+# Down, waiting to see whether it's a click or a hold
+DOWN = 1
+# Released, waiting to see whether another click follows
+UP = 2
+# Held past hold_duration, repeating
+REPEATING = 3
+# Turned while down: no click or hold when it comes up
+ROTATED = 4
+
+# Inputs
+_PRESS = 0
+_RELEASE = 1
+_ROTATE = 2
+_DEADLINE = 3
+_INPUT_COUNT = 4
+
+# Actions
+_NONE = 0
+_ARM_HOLD = 1
+_ARM_CLICK_WINDOW = 2
+_EMIT_CLICKS = 3
+_EMIT_CLICKS_AND_ROTATE = 4
+_ROTATE_ACTION = 5
+_PRESS_ROTATE = 6
+_REPEAT = 7
+_HOLD_RELEASE = 8
+_CANCEL = 9
+
+
+def _to(state, action):
+    return state << 4 | action
+
+
+# (state, input) -> next state << 4 | action, one row of _PRESS, _RELEASE, _ROTATE, _DEADLINE per state
+_TRANSITIONS = bytes((
+    # IDLE
+    _to(DOWN, _ARM_HOLD), _to(IDLE, _NONE), _to(IDLE, _ROTATE_ACTION), _to(IDLE, _NONE),
+    # DOWN
+    _to(DOWN, _NONE), _to(UP, _ARM_CLICK_WINDOW), _to(ROTATED, _PRESS_ROTATE), _to(REPEATING, _REPEAT),
+    # UP
+    _to(DOWN, _ARM_HOLD), _to(UP, _NONE), _to(IDLE, _EMIT_CLICKS_AND_ROTATE), _to(IDLE, _EMIT_CLICKS),
+    # REPEATING
+    _to(REPEATING, _NONE), _to(IDLE, _HOLD_RELEASE), _to(ROTATED, _PRESS_ROTATE), _to(REPEATING, _REPEAT),
+    # ROTATED
+    _to(ROTATED, _NONE), _to(IDLE, _CANCEL), _to(ROTATED, _PRESS_ROTATE), _to(ROTATED, _NONE),
+))
+
+
+class Gestures:
+    def __init__(self, events=None, event_source=None,
+                 on_increment: list = _do_nothing,
+                 on_click: list = _do_nothing,
+                 on_double_click: list = _do_nothing,
+                 on_triple_click: list = _do_nothing,
+                 click_window: float = 0.25,
+                 hold_duration: float = 0.4,
+                 repeat_hz: float = 8,
+                 on_hold_repeat: list = _do_nothing,
+                 on_hold_release: list = _do_nothing,
+                 on_press_rotate: list = _do_nothing
+    ):
+        """
+        Multi-click, hold-to-repeat and press-and-rotate for one encoder with a push button, so you don't have to
+          build timers for them on top of click and longhold.
+
+        Each press, release, rotation or expired deadline looks up (state, input) in a transition table to get the
+          next state and one action.  There's a single deadline at a time, for whichever of the hold, click window
+          or repeat is pending, so a tick is a couple of comparisons when nothing is happening.  Nothing is allocated
+          after construction.
+
+        A click is reported once click_window passes without another press, so a lone click arrives that much after
+          the release.  Clicks past three count as a triple click.
+
+        :param events: cpy_rotary.edge_queue.EdgeQueue to drain each loop().  Or call press(), release(), rotate()
+          and tick() yourself.
+        :param event_source: cpy_rotary.edge_queue.EdgeSource: polled at the start of each loop() to fill events.
+        :param on_increment: void (int amount): rotation while the button is up
+        :param on_click: void ()
+        :param on_double_click: void ()
+        :param on_triple_click: void ()
+        :param click_window: float seconds after a release to wait for the next click
+        :param hold_duration: float seconds down before it's a hold rather than a click
+        :param repeat_hz: how often on_hold_repeat is called while held
+        :param on_hold_repeat: void (int repeat): 0 when the hold starts, then 1, 2, ... repeat_hz times per second
+        :param on_hold_release: void ()
+        :param on_press_rotate: void (int amount): rotation while the button is down.  The press then makes no
+          click or hold.
+        """
+        self._events = events
+        self._event_source = event_source
+        self._event = EdgeEvent()
+        self.on_increment = on_increment
+        self.on_click = on_click
+        self.on_double_click = on_double_click
+        self.on_triple_click = on_triple_click
+        self.on_hold_repeat = on_hold_repeat
+        self.on_hold_release = on_hold_release
+        self.on_press_rotate = on_press_rotate
+        self._click_window_ms = int(click_window * 1000)
+        self._hold_ms = int(hold_duration * 1000)
+        self._repeat_ms = max(1, int(1000 / repeat_hz))
+
+        self.state = IDLE
+        self._clicks = 0
+        self._repeats = 0
+        self._deadline = 0
+        self._armed = False
+
+    @timer('gestures')
+    def tick(self, now_ms: int = None):
+        """
+        Drain events if there's a queue and fire whatever deadline has passed.
+        :param now_ms: ticks_ms(), if you've already read it this loop
+        """
+        if self._event_source is not None:
+            self._event_source.poll()
+        events = self._events
+        if events:
+            event = self._event
+            while events.get_into(event):
+                if event.kind == ROTATE:
+                    self.rotate(event.value, event.timestamp)
+                elif event.pressed:
+                    self.press(event.timestamp)
+                else:
+                    self.release(event.timestamp)
+        if self._armed:
+            self._check_deadline(ticks_ms() if now_ms is None else now_ms)
+
+    def press(self, timestamp: int):
+        self._check_deadline(timestamp)
+        self._input(_PRESS, 0, timestamp)
+
+    def release(self, timestamp: int):
+        self._check_deadline(timestamp)
+        self._input(_RELEASE, 0, timestamp)
+
+    def rotate(self, delta: int, timestamp: int):
+        self._check_deadline(timestamp)
+        self._input(_ROTATE, delta, timestamp)
+
+    def _check_deadline(self, now_ms):
+        # Late events still see the deadline that passed before them
+        if self._armed and ticks_diff(now_ms, self._deadline) >= 0:
+            self._armed = False
+            self._input(_DEADLINE, 0, now_ms)
+
+    def _input(self, event_input, value, now_ms):
+        transition = _TRANSITIONS[self.state * _INPUT_COUNT + event_input]
+        self.state = transition >> 4
+        action = transition & 0xf
+        if action == _NONE:
+            return
+        if action == _ARM_HOLD:
+            self._clicks += 1
+            self._arm(now_ms, self._hold_ms)
+        elif action == _ARM_CLICK_WINDOW:
+            self._arm(now_ms, self._click_window_ms)
+        elif action == _EMIT_CLICKS:
+            self._emit_clicks()
+        elif action == _EMIT_CLICKS_AND_ROTATE:
+            self._armed = False
+            self._emit_clicks()
+            for listener in self.on_increment:
+                listener(value)
+        elif action == _ROTATE_ACTION:
+            for listener in self.on_increment:
+                listener(value)
+        elif action == _PRESS_ROTATE:
+            self._armed = False
+            self._clicks = 0
+            for listener in self.on_press_rotate:
+                listener(value)
+        elif action == _REPEAT:
+            if self._clicks:
+                # Started holding: the clicks before it were the start of this hold, not clicks of their own
+                self._clicks = 0
+                self._repeats = 0
+            else:
+                self._repeats += 1
+            # From the deadline rather than now, so repeats don't drift later with each late tick
+            self._arm(self._deadline, self._repeat_ms)
+            if ticks_diff(now_ms, self._deadline) >= 0:
+                # Fell behind; repeat at the rate from now rather than bursting to catch up
+                self._arm(now_ms, self._repeat_ms)
+            for listener in self.on_hold_repeat:
+                listener(self._repeats)
+        elif action == _HOLD_RELEASE:
+            self._armed = False
+            for listener in self.on_hold_release:
+                listener()
+        elif action == _CANCEL:
+            self._armed = False
+
+    def _arm(self, from_ms, duration_ms):
+        self._deadline = ticks_add(from_ms, duration_ms)
+        self._armed = True
+
+    def _emit_clicks(self):
+        clicks = self._clicks
+        self._clicks = 0
+        if clicks == 1:
+            listeners = self.on_click
+        elif clicks == 2:
+            listeners = self.on_double_click
+        else:
+            listeners = self.on_triple_click
+        for listener in listeners:
+            listener()
@@ -0,0 +1,188 @@
+from array import array
+
+from instrumentation.metrics import timer
+from cpy_rotary.edge_queue import (
+    EdgeEvent, EdgeQueue, ROTATE, CLICK, LONGHOLD_HOLD, LONGHOLD_RELEASE
+)
+from functional.ticks import ticks_ms, ticks_diff
+
+_do_nothing = tuple()
+
+
+class InputManager:
+    # Encoders that turned within this many milliseconds are polled every tick
+    ACTIVE_MS = 500
+
+    def __init__(self, encoders=(), keys=None,
+                 on_increment: list = _do_nothing,
+                 on_click: list = _do_nothing,
+                 longhold_duration: float = 0.3,
+                 on_longhold_hold: list = _do_nothing,
+                 on_longhold_release: list = _do_nothing,
+                 queue_capacity: int = 32,
+                 idle_polls_per_tick: int = 2
+    ):
+        """
+        RotaryButton events for a panel of encoders and buttons, from one tick() per loop.
+
+        Device n is encoders[n] and key n of keys, so a knob and its push button share a number.  State lives in
+          arrays indexed by device rather than an object per device.  A tick reads the clock once, drains the
+          keypad's event queue, and only does more work for devices that changed or are being held.  The resulting
+          events go through one shared queue and are dispatched in a batch.
+
+        rotaryio has no event queue, so encoders have to be polled.  A tick reads the encoders that turned in the
+          last ACTIVE_MS and idle_polls_per_tick of the others, round robin.  The hardware keeps counting in
+          between, so no detents are lost: a knob that starts turning is noticed within
+          len(encoders) / idle_polls_per_tick ticks, and from then on every tick until it stops.
+
+        :param encoders: rotaryio.IncrementalEncoders (or anything with a position), one per knob
+        :param keys: a keypad.Keys for the buttons
+        :param on_increment: void (int device, int amount)
+        :param on_click: void (int device)
+        :param longhold_duration: float seconds: Shorter than this is a click, longer than this is a "longhold"
+        :param on_longhold_hold: void (int device)
+        :param on_longhold_release: void (int device)
+        :param queue_capacity: events per tick that fit before new ones get dropped
+        :param idle_polls_per_tick: how many idle encoders to check per tick.  None checks all of them every tick.
+        """
+        self._encoders = tuple(encoders)
+        self._keys = keys
+        key_count = 0 if keys is None else keys.key_count
+        device_count = max(len(self._encoders), key_count)
+        self.on_increment = on_increment
+        self.on_click = on_click
+        self._longhold_ms = int(longhold_duration * 1000)
+        self.on_longhold_hold = on_longhold_hold
+        self.on_longhold_release = on_longhold_release
+
+        encoder_count = len(self._encoders)
+        self._positions = array('l', [encoder.position for encoder in self._encoders])
+        # The encoders polled every tick, in _active[:_active_count], and when each last turned
+        self._active = bytearray(encoder_count)
+        self._active_count = 0
+        self._is_active = bytearray(encoder_count)
+        self._turned_at = array('L', [0] * encoder_count)
+        # Where the round robin over idle encoders carries on next tick
+        self._idle_polls = encoder_count if idle_polls_per_tick is None else min(idle_polls_per_tick, encoder_count)
+        self._next_idle = 0
+        self._press_starts = array('L', [0] * device_count)
+        self._longheld = bytearray(device_count)
+        # The devices currently pressed, in _held[:_held_count]
+        self._held = bytearray(device_count)
+        self._held_count = 0
+
+        self.events = EdgeQueue(queue_capacity)
+        self._event = EdgeEvent()
+        self._key_event = None
+        if keys is not None:
+            import keypad
+            self._key_event = keypad.Event()
+
+    @timer('input_manager')
+    def tick(self):
+        """
+        Call this every loop() iteration; it invokes your listeners for whatever happened since the last tick.
+        """
+        now = ticks_ms()
+        events = self.events
+        active = self._active
+        turned_at = self._turned_at
+        index = 0
+        while index < self._active_count:
+            device = active[index]
+            if self._poll(device, now):
+                turned_at[device] = now
+            elif ticks_diff(now, turned_at[device]) >= InputManager.ACTIVE_MS:
+                # Stopped turning: back to the round robin.  Swap the last active encoder into its place.
+                self._is_active[device] = 0
+                self._active_count -= 1
+                active[index] = active[self._active_count]
+                continue
+            index += 1
+
+        encoder_count = len(self._encoders)
+        for _ in range(self._idle_polls):
+            device = self._next_idle
+            self._next_idle = (device + 1) % encoder_count
+            if not self._is_active[device] and self._poll(device, now):
+                turned_at[device] = now
+                self._is_active[device] = 1
+                active[self._active_count] = device
+                self._active_count += 1
+
+        keys = self._keys
+        if keys is not None and keys.events:
+            key_event = self._key_event
+            while keys.events.get_into(key_event):
+                if key_event.pressed:
+                    self._press(key_event.key_number, key_event.timestamp)
+                else:
+                    self._release(key_event.key_number, key_event.timestamp)
+
+        for index in range(self._held_count):
+            device = self._held[index]
+            if not self._longheld[device] and ticks_diff(now, self._press_starts[device]) >= self._longhold_ms:
+                self._longheld[device] = 1
+                events.push(LONGHOLD_HOLD, device, 0, now)
+
+        if events:
+            self._dispatch()
+
+    def _poll(self, device, now):
+        """Queue encoder device's rotation since it was last polled.  :return: whether it turned"""
+        position = self._encoders[device].position
+        if position == self._positions[device]:
+            return False
+        self.events.push_rotation(self._positions[device] - position, device, now)
+        self._positions[device] = position
+        return True
+
+    def _press(self, device, timestamp):
+        for index in range(self._held_count):
+            if self._held[index] == device:
+                # Already down
+                return
+        self._press_starts[device] = timestamp
+        self._longheld[device] = 0
+        self._held[self._held_count] = device
+        self._held_count += 1
+
+    def _release(self, device, timestamp):
+        held = self._held
+        for index in range(self._held_count):
+            if held[index] == device:
+                # Swap the last held device into this one's place
+                self._held_count -= 1
+                held[index] = held[self._held_count]
+                break
+        else:
+            # Released without a press we saw
+            return
+        if not self._longheld[device] and ticks_diff(timestamp, self._press_starts[device]) >= self._longhold_ms:
+            # Held long enough, but released before a tick noticed
+            self._longheld[device] = 1
+            self.events.push(LONGHOLD_HOLD, device, 0, timestamp)
+        if self._longheld[device]:
+            self._longheld[device] = 0
+            self.events.push(LONGHOLD_RELEASE, device, 0, timestamp)
+        else:
+            self.events.push(CLICK, device, 0, timestamp)
+
+    def _dispatch(self):
+        events = self.events
+        event = self._event
+        while events.get_into(event):
+            kind = event.kind
+            device = event.key_number
+            if kind == ROTATE:
+                for listener in self.on_increment:
+                    listener(device, event.value)
+            elif kind == CLICK:
+                for listener in self.on_click:
+                    listener(device)
+            elif kind == LONGHOLD_HOLD:
+                for listener in self.on_longhold_hold:
+                    listener(device)
+            elif kind == LONGHOLD_RELEASE:
+                for listener in self.on_longhold_release:
+                    listener(device)
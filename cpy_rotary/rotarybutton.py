@@ -2,17 +2,38 @@ import time
 
 # Default event list
 from instrumentation.metrics import timer, atimer
+from instrumentation.event_trace import event_trace_enabled
+from cpy_rotary.edge_queue import EdgeEvent, ROTATE
+from functional.ticks import ticks_ms, ticks_diff
 
 _do_nothing = tuple()
 
 
 class RotaryButton:
+    # Event codes recorded into the trace
+    TRACE_INCREMENT = 1
+    TRACE_PRESS = 2
+    TRACE_CLICK = 3
+    TRACE_LONGHOLD_HOLD = 4
+    TRACE_LONGHOLD_RELEASE = 5
+    TRACE_EVENT_NAMES = {
+        TRACE_INCREMENT: 'increment',
+        TRACE_PRESS: 'press',
+        TRACE_CLICK: 'click',
+        TRACE_LONGHOLD_HOLD: 'longhold_hold',
+        TRACE_LONGHOLD_RELEASE: 'longhold_release',
+    }
+
     def __init__(self, rotary, button,
                  on_increment: list = _do_nothing,
                  on_click: list = _do_nothing,
                  longhold_duration: float = 0.3,
                  on_longhold_hold: list = _do_nothing,
-                 on_longhold_release: list = _do_nothing
+                 on_longhold_release: list = _do_nothing,
+                 events=None,
+                 event_source=None,
+                 trace=None,
+                 acceleration=None
     ):
         """
         Wraps an Adafruit rotary encoder with events.  Call loop() on this when you want to invoke your callbacks if
@@ -26,24 +47,92 @@ class RotaryButton:
         :param on_longhold_hold: void ()
         :param on_longhold_release: void ()
         :param on_increment: void (int amount)
+        :param events: cpy_rotary.edge_queue.EdgeQueue: Take input from this queue instead of polling rotary and
+          button.  loop() drains everything pending at once, with all the rotation in one on_increment, and costs
+          an empty-queue check when nothing happened.  Pass None for rotary and button.
+        :param event_source: cpy_rotary.edge_queue.EdgeSource: polled at the start of each loop() to fill events.
+        :param trace: instrumentation.event_trace.EventTrace: record what happened, to dump() when debugging.  Only
+          used when event tracing is enabled; otherwise it costs nothing.  Event codes are RotaryButton.TRACE_*.
+        :param acceleration: cpy_rotary.acceleration.Acceleration: scale each tick's rotation up by how fast the knob
+          is turning, so on_increment gets fewer, bigger amounts during fast spins.
         """
         self._rotary = rotary
         self._button = button
+        self._events = events
+        self._event_source = event_source
+        self._event = EdgeEvent()
+        self._trace = trace if event_trace_enabled else None
+        self._acceleration = acceleration
         self.on_click = on_click
         self._longhold_duration = longhold_duration
         self.on_longhold_hold = on_longhold_hold
         self.on_longhold_release = on_longhold_release
         self.on_increment = on_increment
-        self._rotaryposition = rotary.position
+        self._rotaryposition = 0 if rotary is None else rotary.position
         self._current_press_start = None
         self._longheld = False
 
     @atimer('rotary')
     async def loop(self):
+        if self._events is not None:
+            self._update_from_events()
+            return
         self._button.update()  # for debounce.  Inspect .rose and .fell for press/release events
         self._update_rotary_position()
         self._update_button()
 
+    def _update_from_events(self):
+        if self._event_source is not None:
+            self._event_source.poll()
+        if self._events:
+            self._drain_events()
+        if self._current_press_start is not None and not self._longheld:
+            self._check_longhold(ticks_ms())
+
+    def _drain_events(self):
+        events = self._events
+        event = self._event
+        rotation = 0
+        while events.get_into(event):
+            if event.kind == ROTATE:
+                rotation += event.value
+            elif event.pressed:
+                if self._current_press_start is None:
+                    self._current_press_start = event.timestamp
+                    if self._trace is not None:
+                        self._trace.record(RotaryButton.TRACE_PRESS)
+            elif self._current_press_start is not None:
+                # Released.  Decide click or longhold on the event's time, however late we got to it.
+                self._check_longhold(event.timestamp)
+                pressed_ms = ticks_diff(event.timestamp, self._current_press_start)
+                self._current_press_start = None
+                if self._longheld:
+                    self._longheld = False
+                    if self._trace is not None:
+                        self._trace.record(RotaryButton.TRACE_LONGHOLD_RELEASE, pressed_ms)
+                    for listener in self.on_longhold_release:
+                        listener()
+                else:
+                    if self._trace is not None:
+                        self._trace.record(RotaryButton.TRACE_CLICK, pressed_ms)
+                    for listener in self.on_click:
+                        listener()
+        if rotation != 0:
+            if self._acceleration is not None:
+                rotation = self._acceleration.scale(rotation, ticks_ms())
+            if self._trace is not None:
+                self._trace.record(RotaryButton.TRACE_INCREMENT, rotation)
+            for listener in self.on_increment:
+                listener(rotation)
+
+    def _check_longhold(self, now_ms):
+        if not self._longheld and ticks_diff(now_ms, self._current_press_start) >= self._longhold_duration * 1000:
+            self._longheld = True
+            if self._trace is not None:
+                self._trace.record(RotaryButton.TRACE_LONGHOLD_HOLD)
+            for listener in self.on_longhold_hold:
+                listener()
+
     def _update_button(self):
         if self._current_press_start:
             assert not self._button.fell, 'button is already down, it has to come up first doesn\'t it?'
@@ -52,23 +141,35 @@ class RotaryButton:
                 self._longheld = False  # whether or not we longheld, we're definitely not longholding now
                 self._current_press_start = None
                 if pressed_time < self._longhold_duration:
+                    if self._trace is not None:
+                        self._trace.record(RotaryButton.TRACE_CLICK, int(pressed_time * 1000))
                     for listener in self.on_click:
                         listener()
                 else:
+                    if self._trace is not None:
+                        self._trace.record(RotaryButton.TRACE_LONGHOLD_RELEASE, int(pressed_time * 1000))
                     for listener in self.on_longhold_release:
                         listener()
             elif not self._longheld and pressed_time >= self._longhold_duration:
                 self._longheld = True
+                if self._trace is not None:
+                    self._trace.record(RotaryButton.TRACE_LONGHOLD_HOLD)
                 for listener in self.on_longhold_hold:
                     listener()
         elif self._button.fell:
             self._current_press_start = time.monotonic()
+            if self._trace is not None:
+                self._trace.record(RotaryButton.TRACE_PRESS)
 
     def _update_rotary_position(self):
-        if self._rotaryposition == self._rotary.position:
+        position = self._rotary.position
+        if self._rotaryposition == position:
             return
-        difference = self._rotaryposition - self._rotary.position
-        self._rotaryposition = self._rotary.position
-        print('Rotary activity: {}'.format(difference))
+        difference = self._rotaryposition - position
+        self._rotaryposition = position
+        if self._acceleration is not None:
+            difference = self._acceleration.scale(difference, ticks_ms())
+        if self._trace is not None:
+            self._trace.record(RotaryButton.TRACE_INCREMENT, difference)
         for listener in self.on_increment:
             listener(difference)
@@ -0,0 +1,93 @@
+import compat.host
+compat.host.install()
+
+import random
+import time
+
+import displayio
+import vectorio
+
+from animation.driver import AnimationDriver
+
+
+# This benchmark runs on desktop python with the compat fakes, comparing two ways to animate a scene:
+#
+# * direct: animations assign fresh point lists and positions to vectorio, and every frame refreshes the display.
+# * driver: animations write through an AnimationDriver, which commits only changed shapes and refreshes only
+#     frames where something changed.
+#
+# A scene of 10 polygons that wobble every 4th frame, with nothing changing in between.
+# The fake display counts refreshes instead of drawing, so refreshes/frame is the number to compare with a board in
+#  mind: each refresh there costs milliseconds of SPI.  bytes/frame comes from compat.host.bytes_per_call(), which
+#  counts garbage too.
+
+FRAMES = 1000
+SHAPES = 10
+POINTS = 8
+WOBBLE_EVERY = 4
+
+
+def make_scene():
+    group = displayio.Group(max_size=SHAPES)
+    shapes = []
+    for index in range(SHAPES):
+        polygon = vectorio.Polygon(points=[(point * 4, (point % 2) * 10) for point in range(POINTS)])
+        shape = vectorio.VectorShape(shape=polygon, pixel_shader=displayio.Palette(2), x=index * 30, y=100)
+        group.append(shape)
+        shapes.append((polygon, shape))
+    return group, shapes
+
+
+def direct_frames():
+    display = displayio.Display()
+    _, shapes = make_scene()
+
+    def frame(number):
+        for index in range(SHAPES):
+            if number % WOBBLE_EVERY == 0:
+                polygon, shape = shapes[index]
+                polygon.points = [(point * 4 + random.randrange(-2, 2), (point % 2) * 10) for point in range(POINTS)]
+                shape.y = 100 + random.randrange(-2, 2)
+        display.refresh()
+    return frame, display
+
+
+def driver_frames():
+    display = displayio.Display()
+    driver = AnimationDriver(display)
+    _, shapes = make_scene()
+    animated = [driver.track(shape, polygon) for polygon, shape in shapes]
+
+    def frame(number):
+        for index in range(SHAPES):
+            if number % WOBBLE_EVERY == 0:
+                for point in range(POINTS):
+                    animated[index].set_point(point, point * 4 + random.randrange(-2, 2), (point % 2) * 10)
+                animated[index].move(index * 30, 100 + random.randrange(-2, 2))
+        driver.frame()
+    return frame, display
+
+
+def measure(make):
+    frame, display = make()
+    frames = iter(range(10, 10 + 2 * FRAMES))
+    for number in range(10):
+        frame(number)
+    allocated = compat.host.bytes_per_call(lambda: frame(next(frames)), FRAMES)
+    refreshes = display.refresh_count
+    start = time.monotonic_ns()
+    for _ in range(FRAMES):
+        frame(next(frames))
+    elapsed = time.monotonic_ns() - start
+    return allocated, elapsed / FRAMES / 1000, (display.refresh_count - refreshes) / FRAMES
+
+
+def run():
+    print('{:8s} | {:>12s} | {:>10s} | {:>16s}'.format('Path', 'bytes/frame', 'us/frame', 'refreshes/frame'))
+    for name, make in (('direct', direct_frames), ('driver', driver_frames)):
+        allocated, micros, refreshes = measure(make)
+        print('{:8s} | {:12.1f} | {:10.2f} | {:16.2f}'.format(name, allocated, micros, refreshes))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,100 @@
+import builtins
+builtins.metrics_enabled = True
+
+import time
+
+from compat.host import bytes_per_call
+from instrumentation import metrics
+from instrumentation.metrics import timer
+
+
+# This microbenchmark shows how much memory a timed call allocates once things are warmed up.
+#
+# * baseline Timer: the Timer this package shipped before timers were preallocated, copied below.  It builds a new
+#     Timer with per-call attributes every call and keeps open timers in a list it appends to and pops.
+# * Timer: one reused Timer entered with `with`, no decorator.  What's left here is the timing itself: clock reads
+#     and the arithmetic recording them, which still allocate (see Timer's docstring).
+# * @timer: the preallocated path, one Timer per decorated function with its node cached.
+#
+# Bytes per call come from compat.host.bytes_per_call(), which counts garbage too.  On a board, copy instrumentation/,
+#  compat/host.py and this file over and import it: that's where heap allocated clock ints show up at their real size.
+#  Under desktop python objects are bigger than a board's, so read the comparison rather than the totals.
+
+CALLS = 1000
+
+
+class BaselineTimer:
+    """The old Timer, unchanged except for recording into its own stack so it doesn't disturb the live one."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.monotonic_ns()
+        self.timer = _baseline_stack[-1].get(self.name, None)
+        if self.timer is None:
+            self.timer = metrics._TimerNode(self.name)
+            _baseline_stack[-1][self.name] = self.timer
+        self.pushed_timer = _baseline_stack[-1] is not self.timer
+        if self.pushed_timer:
+            _baseline_stack.append(self.timer)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        elapsed = time.monotonic_ns() - self.start
+        if self.pushed_timer:
+            _baseline_stack.pop(-1)
+        self.timer.observe(elapsed / 1000000)
+
+
+_baseline_stack = [metrics._TimerNode('root')]
+
+
+def untimed():
+    pass
+
+
+def baseline_timer():
+    # What the old @timer's wrapper did
+    with BaselineTimer('baseline'):
+        untimed()
+
+
+_reused = metrics.Timer('reused')
+
+
+def reused_timer():
+    with _reused:
+        untimed()
+
+
+@timer('preallocated')
+def preallocated():
+    untimed()
+
+
+def per_call(function):
+    # Warm up so the timer tree and stacks exist
+    for _ in range(10):
+        function()
+    allocated = bytes_per_call(function, CALLS)
+    start = time.monotonic_ns()
+    for _ in range(CALLS):
+        function()
+    return allocated, (time.monotonic_ns() - start) / CALLS / 1000
+
+
+def run():
+    print('{:24s} | {:>12s} | {:>10s}'.format('Path', 'bytes/call', 'us/call'))
+    for name, function in (
+            ('untimed', untimed),
+            ('baseline Timer', baseline_timer),
+            ('Timer', reused_timer),
+            ('@timer', preallocated),
+    ):
+        allocated, micros = per_call(function)
+        print('{:24s} | {:12.1f} | {:10.2f}'.format(name, allocated, micros))
+
+
+if __name__ == '__main__':
+    run()
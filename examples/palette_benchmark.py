@@ -0,0 +1,64 @@
+import compat.host
+compat.host.install()
+
+from instrumentation import config
+config.enable(metrics=False, memory_logging=True)
+
+import displayio
+import vectorio
+
+from animation.palettes import PaletteCache
+from instrumentation.memory_logging import track_alloc, log_allocations
+
+
+# This benchmark builds a scene of dozens of shapes in a handful of colors two ways and reports the memory each
+#  keeps with memory_logging:
+#
+# * fresh: a new Palette per shape, like the example's monochrome() used to make.
+# * interned: palettes from a PaletteCache, one per color.
+#
+# Runs on desktop python with the compat fakes, where a fake Palette is smaller than a real one, so read the
+#  difference rather than the totals.  On a board, drop the compat lines and give it a real display.
+
+SHAPES = 48
+COLORS = (0xff0000, 0x00ff00, 0x0000ff, 0xEE82EE)
+
+
+def fresh_palette(color):
+    palette = displayio.Palette(2)
+    palette.make_transparent(0)
+    palette[1] = color
+    return palette
+
+
+def build_scene(palette_for):
+    group = displayio.Group(max_size=SHAPES)
+    polygon = vectorio.Polygon(points=[(0, 0), (8, 0), (4, 8)])
+    for index in range(SHAPES):
+        group.append(vectorio.VectorShape(
+            shape=polygon, pixel_shader=palette_for(COLORS[index % len(COLORS)]), x=index * 6, y=10
+        ))
+    return group
+
+
+@track_alloc('fresh palettes')
+def fresh_scene():
+    return build_scene(fresh_palette)
+
+
+@track_alloc('interned palettes')
+def interned_scene(cache):
+    return build_scene(cache.monochrome)
+
+
+def run():
+    cache = PaletteCache()
+    # Keep the scenes alive, like they would be on a screen
+    scenes = [fresh_scene(), interned_scene(cache)]
+    log_allocations(target_seconds=0)
+    print('{} shapes in {} colors; {} interned palettes'.format(SHAPES, len(COLORS), len(cache)))
+    return scenes
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,72 @@
+import math
+import time
+
+from animation import tables
+from compat.host import bytes_per_call
+
+
+# This microbenchmark compares the vectorio example's circle animation done with the math module against the
+#  fixed point tables in animation.tables.
+#
+# * math: sin/cos of a float angle from time.monotonic(), like the example used to, read three times for the resize.
+# * tables: one clock read per frame, integer phases and table lookups.
+#
+# Run it on a board: copy animation/, functional/, compat/host.py and this file over, then import it and call run().
+#  That's where the comparison means something.  Without a floating point unit (M0), or with single precision only
+#  (M4), the math path does its trig in software and its floats can be heap allocated, while the tables path's ints
+#  stay small ints, which cost nothing to make.
+#
+# Desktop numbers come out the other way round: tables allocates more and runs about as fast.  CPython allocates every
+#  int above 256, so each phase and table index is an allocation there, while its floats come from a free list that
+#  tracemalloc doesn't see and its trig is a hardware instruction.  Don't read anything into desktop results beyond
+#  checking the benchmark runs.
+#
+# Bytes per frame come from compat.host.bytes_per_call(), which counts garbage too.
+
+CALLS = 1000
+AXIS_X, AXIS_Y = 170, 120
+REVOLUTION_RADIUS = 60
+MIN_RADIUS, MAX_RADIUS = 5, 20
+
+
+def math_frame():
+    revolution_radians = (time.monotonic() % 8) / 8 * 2 * math.pi
+    x = round(math.sin(revolution_radians) * REVOLUTION_RADIUS + AXIS_X)
+    y = round(math.cos(revolution_radians) * REVOLUTION_RADIUS + AXIS_Y)
+    size_ratio = abs(int(time.monotonic() % 26 / 13) - time.monotonic() % 13 / 13)
+    radius = int(MIN_RADIUS + size_ratio * (MAX_RADIUS - MIN_RADIUS))
+    return x, y, radius
+
+
+_clock = tables.FrameClock()
+
+
+def tables_frame():
+    _clock.tick()
+    phase = _clock.phase(8000)
+    x = AXIS_X + tables.scale(REVOLUTION_RADIUS, tables.sin(phase))
+    y = AXIS_Y + tables.scale(REVOLUTION_RADIUS, tables.cos(phase))
+    size_ratio = tables.lookup(tables.TRIANGLE, _clock.phase(26000))
+    radius = MIN_RADIUS + tables.scale(MAX_RADIUS - MIN_RADIUS, size_ratio)
+    return x, y, radius
+
+
+def per_call(function):
+    for _ in range(10):
+        function()
+    allocated = bytes_per_call(function, CALLS)
+    start = time.monotonic_ns()
+    for _ in range(CALLS):
+        function()
+    return allocated, (time.monotonic_ns() - start) / CALLS / 1000
+
+
+def run():
+    print('{:8s} | {:>12s} | {:>10s}'.format('Path', 'bytes/frame', 'us/frame'))
+    for name, function in (('math', math_frame), ('tables', tables_frame)):
+        allocated, micros = per_call(function)
+        print('{:8s} | {:12.1f} | {:10.2f}'.format(name, allocated, micros))
+
+
+if __name__ == '__main__':
+    run()
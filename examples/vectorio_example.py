@@ -1,11 +1,14 @@
-import math
-import time
-
 import displayio
 import vectorio
 
 import random
 
+from animation.driver import AnimationDriver
+from animation.glyphs import VectorFont, VectorLabel
+from animation.palettes import monochrome
+from animation import tables
+from functional.scheduler import Scheduler
+
 
 # This example demonstrates some of the features in `vectorio`.
 #
@@ -23,6 +26,11 @@ import random
 # * Orbiting circle
 #     A circle that travels around the wobbly star (occasionally
 #     eclipsing a point or two) and changes radius over time.
+#
+# The animations write through an AnimationDriver, which refreshes the
+# display once per frame and only when something moved.  The circle's
+# motion comes from fixed point lookup tables and the driver's once per
+# frame clock, so it costs no float math.
 
 
 def run():
@@ -34,11 +42,12 @@ def run():
     # Initialize the hardware
     display = get_display()
     group = displayio.Group(max_size=10)
+    driver = AnimationDriver(display)
 
     # Assemble the displaygroup (only using 1)
-    new_randart_fn = append_randart_shape(group, color=BACKGROUND)
-    wobble_star_fn = append_wobbly_star_shape(group, color=RED)
-    revolve_circle_fn, resize_circle_fn = append_circle_shape(group, color=GREEN)
+    new_randart_fn = append_randart_shape(group, driver, color=BACKGROUND)
+    wobble_star_fn = append_wobbly_star_shape(group, driver, color=RED)
+    revolve_circle_fn, resize_circle_fn = append_circle_shape(group, driver, color=GREEN)
     # Add a thing to revolve the circle under
     group.append(
         vectorio.VectorShape(
@@ -51,26 +60,27 @@ def run():
     append_vectorio_shape(group, color=VIOLET)
 
     # Schedule the animations
-    new_randart_fn = rate_limited(hz=1/5)(new_randart_fn)
-    wobble_star_fn = rate_limited(hz=6)(wobble_star_fn)
-    resize_circle_fn = rate_limited(hz=7)(resize_circle_fn)
-    revolve_circle_fn = rate_limited(hz=20)(revolve_circle_fn)
+    scheduler = Scheduler()
+    # Named, since with metrics enabled the timed ones are all called wrapper
+    scheduler.add(new_randart_fn, hz=1/5, name='randart')
+    # Phase locked so the related rates take turns rather than piling onto the same frame
+    scheduler.add(wobble_star_fn, hz=6, phase_locked=True, name='wobble star')
+    scheduler.add(resize_circle_fn, hz=7, phase_locked=True, name='resize circle')
+    scheduler.add(revolve_circle_fn, hz=20, phase_locked=True, name='revolve circle')
+    # Added last so each frame commits whatever the animations above changed
+    scheduler.add(driver.frame, hz=30, name='frame')
 
     # And turn on the display
     display.brightness = 1
     display.show(group)
 
-    # Now drive the scheduled animations forever
-    while True:
-        new_randart_fn()
-        wobble_star_fn()
-        resize_circle_fn()
-        revolve_circle_fn()
+    # Now drive the scheduled animations forever, sleeping until the next one is due
+    scheduler.run_forever()
 
 
 # ############ Application coroutine constructors ############ #
 
-def append_randart_shape(group: displayio.Group, color):
+def append_randart_shape(group: displayio.Group, driver: AnimationDriver, color):
     # Make a random polygon to sit on the left side of the screen.
     # We'll update its points every now and then with the returned function.
     random_polygon = vectorio.Polygon(
@@ -81,14 +91,16 @@ def append_randart_shape(group: displayio.Group, color):
         pixel_shader=monochrome(color),
     )
     group.append(random_shape)
+    randart = driver.track(random_shape, random_polygon)
 
     def new_randart():
-        random_polygon.points = [(random.randrange(0, 100), random.randrange(0, 240)) for _ in range(40)]
+        for point in range(40):
+            randart.set_point(point, random.randrange(0, 100), random.randrange(0, 240))
 
     return new_randart
 
 
-def append_wobbly_star_shape(group: displayio.Group, color):
+def append_wobbly_star_shape(group: displayio.Group, driver: AnimationDriver, color):
     # Make a wobbly star.  The returned function wobbles its points a little.
     wobbly_star_points = [
         (8, 50),
@@ -107,22 +119,25 @@ def append_wobbly_star_shape(group: displayio.Group, color):
         y=star_center_y
     )
     group.append(wobbly_star_shape)
+    wobbly_star = driver.track(wobbly_star_shape, wobbly_star_polygon)
 
     def make_star_wobble():
         tremble = 4
         shake = 3
-        trembling_points = [
-            (random.randrange(x - tremble, x + tremble), random.randrange(y - tremble, y + tremble))
-             for x,  y in wobbly_star_points
-        ]
-        wobbly_star_polygon.points = trembling_points
-        wobbly_star_shape.x = random.randrange(star_center_x - shake, star_center_x + shake)
-        wobbly_star_shape.y = random.randrange(star_center_y - shake, star_center_y + shake)
+        for point in range(len(wobbly_star_points)):
+            x, y = wobbly_star_points[point]
+            wobbly_star.set_point(
+                point, random.randrange(x - tremble, x + tremble), random.randrange(y - tremble, y + tremble)
+            )
+        wobbly_star.move(
+            random.randrange(star_center_x - shake, star_center_x + shake),
+            random.randrange(star_center_y - shake, star_center_y + shake)
+        )
 
     return make_star_wobble
 
 
-def append_circle_shape(group: displayio.Group, color):
+def append_circle_shape(group: displayio.Group, driver: AnimationDriver, color):
     # Make a circle that will revolve around the star while changing size
     min_circle_radius = 5
     max_circle_radius = 20
@@ -135,85 +150,45 @@ def append_circle_shape(group: displayio.Group, color):
         x=circle_axis[0], y=circle_axis[1]
     )
     group.append(circle_shape)
+    animated_circle = driver.track(circle_shape, circle)
 
-    radians_in_circle = 2 * math.pi
+    clock = driver.clock
 
     def revolve_circle():
-        seconds_per_revolution = 8
-        revolution_ratio = (time.monotonic() % seconds_per_revolution) / seconds_per_revolution
-        revolution_radians = revolution_ratio * radians_in_circle
-        s = math.sin(revolution_radians)
-        c = math.cos(revolution_radians)
-        x = s * circle_revolution_radius + circle_axis[0]
-        y = c * circle_revolution_radius + circle_axis[1]
-        circle_shape.x = round(x)
-        circle_shape.y = round(y)
+        phase = clock.phase(8000)
+        animated_circle.move(
+            circle_axis[0] + tables.scale(circle_revolution_radius, tables.sin(phase)),
+            circle_axis[1] + tables.scale(circle_revolution_radius, tables.cos(phase))
+        )
 
     def resize_circle():
-        seconds_per_size_cycle = 13
-        size_ratio = abs(int(time.monotonic() % (
-                    2 * seconds_per_size_cycle) / seconds_per_size_cycle) - time.monotonic() % seconds_per_size_cycle / seconds_per_size_cycle)
-        new_radius = min_circle_radius + size_ratio * (max_circle_radius - min_circle_radius)
-        circle.radius = int(new_radius)
+        # Grows for 13 seconds then shrinks for 13
+        size_ratio = tables.lookup(tables.TRIANGLE, clock.phase(26000))
+        animated_circle.set_radius(min_circle_radius + tables.scale(max_circle_radius - min_circle_radius, size_ratio))
 
     return revolve_circle, resize_circle
 
 
-def append_vectorio_shape(group: displayio.Group, color):
-    # Making fonts with vector points is a pain but the memory benefits are pretty nice.
-    # Also you can rotate points for spinny text if you want!
-    v_polygon = vectorio.Polygon(
-        points=[
-            (0, 0), (10, 0),
-            (18, 24),
-            (26, 0), (36, 0),
-            (22, 34), (10, 34),
-        ]
-    )
-    v_shape = vectorio.VectorShape(
-        shape=v_polygon,
-        pixel_shader=monochrome(color),
-        x=160, y=16
-    )
-    group.append(v_shape)
-
-
-# ############ Copy pastas and support code ############ #
+# Making fonts with vector points is a pain but the memory benefits are pretty nice.
+# Each glyph's polygon is shared by every label showing it, so repeats only cost a shape.
+# Also you can rotate points for spinny text if you want!
+VECTOR_FONT = VectorFont({
+    'V': [
+        (0, 0), (10, 0),
+        (18, 24),
+        (26, 0), (36, 0),
+        (22, 34), (10, 34),
+    ],
+    'I': [(0, 0), (10, 0), (10, 34), (0, 34)],
+})
 
-def monochrome(color):
-    """
-    :return: A palette for a vectorio shape
-    """
-    palette = displayio.Palette(2)
-    palette.make_transparent(0)
-    palette[1] = color
-    return palette
 
+def append_vectorio_shape(group: displayio.Group, color):
+    label = VectorLabel(VECTOR_FONT, monochrome(color), max_length=4, text='VIV', x=160, y=16)
+    group.append(label.group)
 
-def rate_limited(hz: float):
-    """
-    Pasted from https://github.com/WarriorOfWire/circuitpython-utilities/blob/master/functional/rate_limited.py
-    """
-    def decorator_rate_limit(decorated_fn):
-        last_invocation = 0
-        nanos_per_invocation = 1000000000 / hz
-        rate_limited_value = None
-
-        def rate_limited_fn(*args, **kwargs):
-            nonlocal last_invocation
-            nonlocal rate_limited_value
-            now = time.monotonic_ns()
-            if now - last_invocation > nanos_per_invocation:
-                # Normally we can schedule at the intended rate.
-                last_invocation += nanos_per_invocation
-                if last_invocation + nanos_per_invocation < now:
-                    # If we're falling behind, fall back to "with fixed delay"
-                    last_invocation = now
-                rate_limited_value = decorated_fn(*args, **kwargs)
-            return rate_limited_value
-        return rate_limited_fn
-    return decorator_rate_limit
 
+# ############ Copy pastas and support code ############ #
 
 def get_display():
     """
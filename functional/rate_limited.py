@@ -1,32 +1,330 @@
 import time
 
+from instrumentation import loop_stats
+from instrumentation.metrics import timer, measure
 
-def rate_limited(hz: float):
+# Phase locked schedules are grids counted from here, so their phases mean the same thing for every function
+_epoch = time.monotonic_ns()
+# Fractional part of the golden ratio: successive multiples spread out evenly over [0, 1)
+_SPREAD_STEP = 0.6180339887
+_spread_count = 0
+
+
+class RateStats:
+    """
+    Counts how often a rate limited function fell behind.  Pass one to rate_limited() or Scheduler.add().
+    """
+    __slots__ = ('late', 'skipped', 'throttled')
+
+    def __init__(self):
+        # Invocations that ran a whole interval or more after they were due
+        self.late = 0
+        # Intervals that passed without an invocation because of it
+        self.skipped = 0
+        # Invocations adaptive_rate_limited held back to stay within its utilization, and calls token_bucket turned
+        # away with no turn saved
+        self.throttled = 0
+
+    def reset(self):
+        self.late = 0
+        self.skipped = 0
+        self.throttled = 0
+
+
+def spread_phase() -> float:
+    """
+    :return: a phase for the next phase locked function that doesn't specify one, spread away from the others'
+    """
+    global _spread_count
+    _spread_count += 1
+    return (_spread_count * _SPREAD_STEP) % 1
+
+
+def first_due(now: int, nanos_per_invocation: float, phase: float):
+    """
+    :return: the first grid point at or after now, for a phase locked schedule
+    """
+    offset = _epoch + phase * nanos_per_invocation
+    intervals = -((offset - now) // nanos_per_invocation)
+    return offset + intervals * nanos_per_invocation
+
+
+def rate_limited(hz: float, phase_locked: bool = False, phase: float = None, stats: RateStats = None,
+                 name: str = None):
     """
     Describe how often a method should be called from your loop().
 
     You call this every loop() iteration and it invokes your method
       on your schedule.
 
+    By default the first call invokes your method and, when it falls behind, the schedule restarts from whenever it
+      caught up ("with fixed delay").  Functions with related rates then drift against each other and bunch up on
+      the same iteration now and then.  Phase locked functions instead run on a fixed grid of times, each offset by
+      its phase, and skip the slots they missed rather than shifting.  Give related functions different phases, or
+      let them spread themselves out, and they take turns instead of piling up.
+
     :param hz: How many times per second should the function run?
+    :param phase_locked: run on a fixed grid instead of restarting the schedule when behind.
+    :param phase: [0, 1): where in each interval to run, as a fraction of it.  Implies phase_locked.  If phase_locked
+      and no phase is given, one is picked to spread this function away from other phase locked functions.
+    :param stats: RateStats to count late invocations and skipped intervals in
+    :param name: what to call it in the lateness measurement.  Defaults to the function's __name__; give one for
+      @timer functions and lambdas, which would otherwise share theirs.
     :return: Decorator for your function suitable for loop().
+
+    With metrics enabled, how late each invocation runs is measured through instrumentation.loop_stats as
+      'late name ms'.
     """
+    if phase is not None:
+        phase_locked = True
+    elif phase_locked:
+        phase = spread_phase()
+
     def decorator_rate_limit(decorated_fn):
         last_invocation = 0
         nanos_per_invocation = 1000000000 / hz
         rate_limited_value = None
+        late_name = loop_stats.lateness_name(decorated_fn, name)
 
         def rate_limited_fn(*args, **kwargs):
             nonlocal last_invocation
             nonlocal rate_limited_value
             now = time.monotonic_ns()
             if now - last_invocation > nanos_per_invocation:
+                if late_name is not None and last_invocation > 0:
+                    loop_stats.lateness(late_name, now - last_invocation - nanos_per_invocation)
                 # Normally we can schedule at the intended rate.
                 last_invocation += nanos_per_invocation
                 if last_invocation + nanos_per_invocation < now:
                     # If we're falling behind, fall back to "with fixed delay"
+                    # The first call always lands here too, but it isn't late
+                    if stats is not None and last_invocation > nanos_per_invocation:
+                        stats.late += 1
+                        stats.skipped += int((now - last_invocation) // nanos_per_invocation)
                     last_invocation = now
                 rate_limited_value = decorated_fn(*args, **kwargs)
             return rate_limited_value
+
+        next_due = None
+
+        def phase_locked_fn(*args, **kwargs):
+            nonlocal next_due
+            nonlocal rate_limited_value
+            now = time.monotonic_ns()
+            if next_due is None:
+                next_due = first_due(now, nanos_per_invocation, phase)
+            if now < next_due:
+                return rate_limited_value
+            if late_name is not None:
+                loop_stats.lateness(late_name, now - next_due)
+            next_due += nanos_per_invocation
+            if next_due <= now:
+                # Behind: skip the slots we missed and stay on the grid
+                missed = int((now - next_due) // nanos_per_invocation) + 1
+                next_due += missed * nanos_per_invocation
+                if stats is not None:
+                    stats.late += 1
+                    stats.skipped += missed
+            rate_limited_value = decorated_fn(*args, **kwargs)
+            return rate_limited_value
+
+        return phase_locked_fn if phase_locked else rate_limited_fn
+    return decorator_rate_limit
+
+
+def token_bucket(hz: float, burst: int = 1, name: str = None, stats: RateStats = None):
+    """
+    Like rate_limited, but unused turns are saved up, to at most burst of them.
+
+    Your method runs whenever there's a turn saved, so after a quiet spell it can run burst times back to back, and
+      a slow invocation is made up for by the next ones running sooner rather than the rate silently dropping.
+      Over any stretch it still runs no more than hz times per second plus burst.
+
+    :param hz: How many turns per second to save up
+    :param burst: The most turns to save
+    :param name: What to call it in metrics.  When given and metrics are enabled, each invocation measures the rate
+      it's running at as name + ' hz' and the calls turned away since the last one as name + ' throttled'.
+    :param stats: RateStats to count the calls turned away with no turn saved in
+    :return: Decorator for your function suitable for loop().
+    """
+    def decorator_rate_limit(decorated_fn):
+        nanos_per_invocation = 1000000000 / hz
+        most_credit = burst * nanos_per_invocation
+        # Starts full
+        credit = most_credit
+        last_refill = time.monotonic_ns()
+        last_invocation = 0
+        held_back = 0
+        rate_limited_value = None
+        rate_name = None if name is None else name + ' hz'
+        throttled_name = None if name is None else name + ' throttled'
+
+        def rate_limited_fn(*args, **kwargs):
+            nonlocal credit
+            nonlocal last_refill
+            nonlocal last_invocation
+            nonlocal held_back
+            nonlocal rate_limited_value
+            now = time.monotonic_ns()
+            credit += now - last_refill
+            last_refill = now
+            if credit > most_credit:
+                credit = most_credit
+            if credit < nanos_per_invocation:
+                held_back += 1
+                if stats is not None:
+                    stats.throttled += 1
+                return rate_limited_value
+            credit -= nanos_per_invocation
+            if rate_name is not None:
+                # Back to back turns from a burst have no interval to measure
+                if last_invocation > 0 and now > last_invocation:
+                    measure(rate_name, 1000000000 / (now - last_invocation))
+                measure(throttled_name, held_back)
+            last_invocation = now
+            held_back = 0
+            rate_limited_value = decorated_fn(*args, **kwargs)
+            return rate_limited_value
+        return rate_limited_fn
+    return decorator_rate_limit
+
+
+def adaptive_rate_limited(name: str, hz: float, utilization: float = 0.5, min_hz: float = 1,
+                          stats: RateStats = None):
+    """
+    Like rate_limited, but slows down when your method gets expensive so it spends at most utilization of each
+      second running, like "render at most 60% of the time".
+
+    It keeps a running average of how long your method takes and stretches the interval to average / utilization
+      when that's longer than 1 / hz, but never beyond 1 / min_hz.  Your method is timed as name in
+      instrumentation.metrics, and when metrics are enabled each invocation measures the rate it's running at as
+      name + ' hz' and name + ' throttled' as 1 when it stretched the interval or 0 when it didn't.
+
+    :param name: What to call it in metrics
+    :param hz: The fastest it should run
+    :param utilization: (0, 1]: The most of the time it should spend running
+    :param min_hz: The slowest it should run however expensive it gets
+    :param stats: RateStats to count late and throttled invocations in
+    :return: Decorator for your function suitable for loop().
+    """
+    def decorator_rate_limit(decorated_fn):
+        timed_fn = timer(name)(decorated_fn)
+        rate_name = name + ' hz'
+        throttled_name = name + ' throttled'
+        fastest_interval = int(1000000000 / hz)
+        slowest_interval = int(1000000000 / min_hz)
+        permille = max(1, int(utilization * 1000))
+        interval = fastest_interval
+        average_cost = 0
+        next_due = 0
+        rate_limited_value = None
+
+        def rate_limited_fn(*args, **kwargs):
+            nonlocal interval
+            nonlocal average_cost
+            nonlocal next_due
+            nonlocal rate_limited_value
+            now = time.monotonic_ns()
+            if now < next_due:
+                return rate_limited_value
+            if stats is not None and next_due > 0 and now - next_due >= interval:
+                stats.late += 1
+                stats.skipped += (now - next_due) // interval
+            rate_limited_value = timed_fn(*args, **kwargs)
+            finished = time.monotonic_ns()
+            # Exponential moving average over about the last 8 invocations
+            average_cost += (finished - now - average_cost) >> 3
+            interval = average_cost * 1000 // permille
+            if interval > fastest_interval:
+                if interval > slowest_interval:
+                    interval = slowest_interval
+                if stats is not None:
+                    stats.throttled += 1
+                measure(throttled_name, 1)
+            else:
+                interval = fastest_interval
+                measure(throttled_name, 0)
+            measure(rate_name, 1000000000 / interval)
+            # From the start of this invocation, so the time spent running counts toward the interval
+            next_due = now + interval
+            return rate_limited_value
         return rate_limited_fn
     return decorator_rate_limit
+
+
+def async_rate_limited(hz: float, sleep, stats: RateStats = None):
+    """
+    @Decorator
+    rate_limited for coroutine functions.  Awaiting the decorated coroutine waits for its next turn by awaiting your
+      event loop's sleep for the rest of the interval, then runs it and returns its result.  Rather than polling and
+      getting a stale value, the caller gives up the cpu until it's due.
+
+    Like rate_limited, the first call runs right away and the schedule falls back to "with fixed delay" when behind.
+
+    :param hz: How many times per second should the coroutine run?
+    :param sleep: your event loop's sleep(seconds): budget_async's loop.sleep, or asyncio.sleep
+    :param stats: RateStats to count late invocations and skipped intervals in
+    """
+    def decorator_rate_limit(decorated_fn):
+        pacer = Paced(hz, sleep, stats)
+
+        async def rate_limited_coroutine(*args, **kwargs):
+            await pacer.wait()
+            return await decorated_fn(*args, **kwargs)
+        return rate_limited_coroutine
+    return decorator_rate_limit
+
+
+def paced(hz: float, sleep, stats: RateStats = None):
+    """
+    An async iterator that yields hz times per second, sleeping in between:
+
+        async for _ in paced(20, loop.sleep):
+            await rotarybutton.loop()
+
+    :param sleep: your event loop's sleep(seconds): budget_async's loop.sleep, or asyncio.sleep
+    :param stats: RateStats to count late iterations and skipped intervals in
+    :return: a Paced
+    """
+    return Paced(hz, sleep, stats)
+
+
+class Paced:
+    def __init__(self, hz: float, sleep, stats: RateStats = None):
+        """
+        Sleeps until the next of hz evenly spaced turns.  Use it through paced() or async_rate_limited(), or await
+          wait() yourself.
+        """
+        self._nanos_per_invocation = 1000000000 / hz
+        self._sleep = sleep
+        self._stats = stats
+        self._next_due = None
+        self.count = 0
+
+    async def wait(self):
+        """
+        Return when it's time for the next turn, sleeping through whatever remains of this interval.
+        """
+        now = time.monotonic_ns()
+        if self._next_due is None:
+            self._next_due = now
+        remaining = self._next_due - now
+        if remaining > 0:
+            await self._sleep(remaining / 1000000000)
+            now = time.monotonic_ns()
+        next_due = self._next_due + self._nanos_per_invocation
+        if next_due < now:
+            # If we're falling behind, fall back to "with fixed delay"
+            if self._stats is not None:
+                self._stats.late += 1
+                self._stats.skipped += int((now - self._next_due) // self._nanos_per_invocation)
+            next_due = now + self._nanos_per_invocation
+        self._next_due = next_due
+        self.count += 1
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await self.wait()
+        return self.count
@@ -0,0 +1,105 @@
+import time
+
+from budget_async.heap import heappush, heappop
+from functional.rate_limited import RateStats, spread_phase, first_due
+from instrumentation import loop_stats
+
+
+class Scheduler:
+    def __init__(self):
+        """
+        Runs many rate limited functions from one loop().
+
+        Where a stack of @rate_limited functions each read the clock and check their own schedule every
+          iteration, a Scheduler keeps its jobs in a heap ordered by next deadline.  tick() reads the clock
+          once, runs only the jobs that are due and tells you how long you can sleep until the next one.
+
+        Jobs keep rate_limited's schedule: they run at the intended rate and fall back to "with fixed delay"
+          when they fall behind, or stay on their grid when phase locked.
+
+        With metrics enabled, how late each job runs is measured through instrumentation.loop_stats, and
+          run_forever() records the loop's busy and idle time there too.
+        """
+        # Heap of [next_due_nanos, registration order, function, nanos_per_invocation, phase_locked, stats,
+        #  lateness measurement name]
+        self._jobs = []
+
+    def add(self, function, hz: float, phase_locked: bool = False, phase: float = None, stats: RateStats = None,
+            name: str = None):
+        """
+        Run function() about hz times per second.  It runs on the first tick after being added, unless phase locked.
+        :param phase_locked: like rate_limited's.  Spread the phases of related jobs so they take turns.
+        :param phase: like rate_limited's.  Implies phase_locked.
+        :param stats: RateStats to count late invocations and skipped intervals in
+        :param name: like rate_limited's: what to call the job in its lateness measurement
+        :return: the function you passed in
+        """
+        nanos_per_invocation = 1000000000 / hz
+        next_due = 0
+        if phase is None and phase_locked:
+            phase = spread_phase()
+        if phase is not None:
+            phase_locked = True
+            next_due = first_due(time.monotonic_ns(), nanos_per_invocation, phase)
+        heappush(self._jobs, [
+            next_due, len(self._jobs), function, nanos_per_invocation, phase_locked, stats,
+            loop_stats.lateness_name(function, name)
+        ])
+        return function
+
+    def rate_limited(self, hz: float, phase_locked: bool = False, phase: float = None, stats: RateStats = None,
+                     name: str = None):
+        """
+        @Decorator
+        Like functional.rate_limited.rate_limited, but the scheduler invokes your function from tick().
+        :param hz: How many times per second should the function run?
+        """
+        def decorator_rate_limit(decorated_fn):
+            return self.add(decorated_fn, hz, phase_locked, phase, stats, name)
+        return decorator_rate_limit
+
+    def tick(self):
+        """
+        Call this every loop() iteration and it invokes your functions on their schedules.
+        :return: int nanoseconds until the next job is due, or None if there are no jobs.
+        """
+        now = time.monotonic_ns()
+        jobs = self._jobs
+        while jobs and jobs[0][0] < now:
+            job = heappop(jobs)
+            if job[6] is not None and job[0] > 0:
+                loop_stats.lateness(job[6], now - job[0])
+            # Normally we can schedule at the intended rate.
+            next_due = job[0] + job[3]
+            if next_due < now:
+                missed = int((now - next_due) // job[3]) + 1
+                if job[4]:
+                    # Phase locked: skip the slots we missed and stay on the grid
+                    next_due += missed * job[3]
+                else:
+                    # If we're falling behind, fall back to "with fixed delay"
+                    next_due = now + job[3]
+                # Jobs added without a phase start out due at 0; their first run isn't late
+                if job[5] is not None and job[0] > 0:
+                    job[5].late += 1
+                    job[5].skipped += missed
+            job[0] = next_due
+            # Rescheduled before it runs, so a job that raises stays scheduled.  next_due is after now, so it
+            #  won't come round again this tick.
+            heappush(jobs, job)
+            job[2]()
+        if not jobs:
+            return None
+        return max(0, int(jobs[0][0] - now))
+
+    def run_forever(self):
+        """
+        Tick forever, sleeping until the next job is due instead of spinning.
+        """
+        while True:
+            loop_stats.tick()
+            wait_nanos = self.tick()
+            if wait_nanos is None:
+                return
+            if wait_nanos > 0:
+                loop_stats.sleep(wait_nanos / 1000000000)
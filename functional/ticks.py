@@ -0,0 +1,29 @@
+import time
+
+try:
+    from supervisor import ticks_ms as _board_ticks_ms
+except ImportError:
+    _board_ticks_ms = None
+
+# Millisecond ticks wrap like supervisor.ticks_ms() so they stay small ints: reading them doesn't allocate on a board
+#  however long it's been up, where time.monotonic_ns() does.  Compare them with ticks_diff().
+_TICKS_PERIOD = 1 << 29
+_TICKS_MASK = _TICKS_PERIOD - 1
+_TICKS_HALF = _TICKS_PERIOD // 2
+
+
+def ticks_ms() -> int:
+    """Milliseconds, wrapping every 2**29.  supervisor.ticks_ms() where there is one."""
+    if _board_ticks_ms is not None:
+        return _board_ticks_ms()
+    return (time.monotonic_ns() // 1000000) & _TICKS_MASK
+
+
+def ticks_add(ticks: int, delta: int) -> int:
+    """ticks plus delta milliseconds, wrapped like ticks_ms()."""
+    return (ticks + delta) & _TICKS_MASK
+
+
+def ticks_diff(newer: int, older: int) -> int:
+    """Signed milliseconds from older to newer, across wraparound."""
+    return ((newer - older + _TICKS_HALF) & _TICKS_MASK) - _TICKS_HALF
@@ -0,0 +1,36 @@
+import builtins
+import sys
+
+#
+# Turn instrumentation on or off without poking builtins yourself.
+#
+# from instrumentation import config
+# config.enable(metrics=True, memory_logging=True, event_trace=True)
+# from instrumentation.metrics import timer
+#
+# metrics, memory_logging and event_trace read their flag once, when first imported, so call this before anything imports them.
+#
+
+
+def enable(metrics: bool = True, memory_logging: bool = False, event_trace: bool = False) -> None:
+    """
+    Set builtins.metrics_enabled, builtins.memory_logging_enabled and builtins.event_trace_enabled for the
+      instrumentation modules to pick up.
+    Raises RuntimeError if one of them was already imported with a different setting, since that can't take effect.
+    """
+    for module_name, flag, enabled in (
+            ('instrumentation.metrics', 'metrics_enabled', metrics),
+            ('instrumentation.loop_stats', 'metrics_enabled', metrics),
+            ('instrumentation.memory_logging', 'memory_logging_enabled', memory_logging),
+            ('instrumentation.event_trace', 'event_trace_enabled', event_trace),
+    ):
+        module = sys.modules.get(module_name, None)
+        # The modules only define the flag themselves when it wasn't set in builtins
+        if module is not None and getattr(module, flag, getattr(builtins, flag, False)) != enabled:
+            raise RuntimeError('{} was already imported with {} = {}'.format(module_name, flag, not enabled))
+        setattr(builtins, flag, enabled)
+
+
+def disable() -> None:
+    """Turn everything off; the decorators leave your functions untouched."""
+    enable(metrics=False, memory_logging=False, event_trace=False)
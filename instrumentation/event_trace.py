@@ -0,0 +1,96 @@
+# Enable event tracing by setting builtins.event_trace_enabled = True before importing this the first time,
+#  or with instrumentation.config.enable(event_trace=True).
+#
+# An EventTrace is a fixed size ring of (milliseconds, event, value) records you dump when something looks wrong.
+#  When tracing is disabled EventTrace is a stub, so leave your trace.record() calls in.
+try:
+    global event_trace_enabled
+    if event_trace_enabled:
+        print('Enabling event tracing')
+    # A module level copy of the builtin, for `from instrumentation.event_trace import event_trace_enabled`
+    event_trace_enabled = event_trace_enabled
+except NameError:
+    # Set False by default to remove runtime overhead and make everything else early-out
+    event_trace_enabled = False
+
+
+if event_trace_enabled:
+    from array import array
+
+    from functional.ticks import ticks_ms as _ticks_ms
+
+
+    class EventTrace:
+        def __init__(self, capacity: int = 64):
+            """
+            Keeps the last capacity records.  Recording writes into arrays allocated here: no allocation, no printing.
+            """
+            self._timestamps = array('L', [0] * capacity)
+            self._events = array('B', [0] * capacity)
+            self._values = array('l', [0] * capacity)
+            self._capacity = capacity
+            self._next = 0
+            self._count = 0
+
+        def record(self, event: int, value: int = 0):
+            """
+            :param event: a small int code for what happened, 0-255
+            :param value: whatever number goes with it
+            """
+            index = self._next
+            self._timestamps[index] = _ticks_ms()
+            self._events[index] = event
+            self._values[index] = value
+            self._next = (index + 1) % self._capacity
+            if self._count < self._capacity:
+                self._count += 1
+
+        def records(self):
+            """
+            :return: generator of (ticks_ms, event, value), oldest first
+            """
+            start = (self._next - self._count) % self._capacity
+            for offset in range(self._count):
+                index = (start + offset) % self._capacity
+                yield self._timestamps[index], self._events[index], self._values[index]
+
+        def dump(self, names=None, clear=True):
+            """
+            Print the records, oldest first.
+            :param names: event code to name, like RotaryButton.TRACE_EVENT_NAMES
+            :param clear: start over afterwards
+            """
+            print('--------------   Event trace ({} records)   --------------'.format(self._count))
+            for timestamp, event, value in self.records():
+                name = names.get(event, event) if names else event
+                print('  {:>10d}ms {:>16} {:8d}'.format(timestamp, name, value))
+            if clear:
+                self.clear()
+
+        def clear(self):
+            self._next = 0
+            self._count = 0
+
+        def __len__(self):
+            return self._count
+else:
+    # Stub so you don't have to change your code, just the global event_trace_enabled boolean.
+
+    class EventTrace:
+        def __init__(self, capacity=64):
+            pass
+
+        def record(self, event, value=0):
+            pass
+
+        def records(self):
+            return iter(())
+
+        def dump(self, names=None, clear=True):
+            pass
+
+        def clear(self):
+            pass
+
+        def __len__(self):
+            return 0
@@ -0,0 +1,116 @@
+import time
+
+# How busy your main loop is and how late scheduled work runs, reported through instrumentation.metrics.
+#  Follows metrics: enabled by builtins.metrics_enabled = True (or instrumentation.config.enable()) before importing
+#  this the first time, and stubs otherwise so you can leave the calls in.
+#
+#   while True:
+#       loop_stats.tick()
+#       ...work...
+#       loop_stats.sleep(seconds_until_next_thing)
+#
+# Each report from log_metrics() then has these measurements:
+#   loop busy ms:        time per iteration not spent in loop_stats.sleep(); p99 is your worst frames
+#   loop utilization %:  busy share of each second
+#   loop iterations/s:   iterations in each second
+#   late <name> ms:      how long after its deadline each run of a scheduled job started
+# All of them are statistic sets with a fixed histogram, so memory stays constant however long it runs.
+try:
+    global metrics_enabled
+    # A module level copy of the builtin, like metrics reads it
+    metrics_enabled = metrics_enabled
+except NameError:
+    metrics_enabled = False
+
+
+if metrics_enabled:
+    from instrumentation.metrics import measure
+
+    _WINDOW_NANOS = 1000000000
+
+
+    def tick() -> None:
+        """
+        Call once per main loop iteration, at the same place each time.
+        """
+        global _last_tick, _idle, _window_start, _window_busy, _window_iterations
+        now = time.monotonic_ns()
+        busy = now - _last_tick - _idle
+        _last_tick = now
+        _idle = 0
+        measure('loop busy ms', busy / 1000000)
+        _window_busy += busy
+        _window_iterations += 1
+        window = now - _window_start
+        if window >= _WINDOW_NANOS:
+            measure('loop utilization %', _window_busy * 100 / window)
+            measure('loop iterations/s', _window_iterations * 1000000000 / window)
+            _window_start = now
+            _window_busy = 0
+            _window_iterations = 0
+
+
+    def sleep(seconds: float) -> None:
+        """
+        time.sleep() that counts as idle time for this iteration.
+        """
+        global _idle
+        start = time.monotonic_ns()
+        time.sleep(seconds)
+        _idle += time.monotonic_ns() - start
+
+
+    def idle(nanos: int) -> None:
+        """
+        Count nanos of this iteration as idle, when you wait some other way than sleep().
+        """
+        global _idle
+        _idle += nanos
+
+
+    def lateness(name: str, nanos: int) -> None:
+        """
+        Record how long after its deadline a scheduled job ran.
+        :param name: the measurement name, like 'late render ms'.  Make it once rather than per call.
+        """
+        measure(name, nanos / 1000000)
+
+
+    def lateness_name(function, name: str = None) -> str:
+        """
+        :param name: what to call the job.  Defaults to function.__name__, which every @timer wrapper and lambda
+          shares, so name those: their lateness would all land in one measurement.  MicroPython functions can't
+          be renamed, so the name has to come from here.
+        :return: the measurement name for function's lateness
+        """
+        if name is None:
+            name = getattr(function, '__name__', 'job')
+        return 'late {} ms'.format(name)
+
+
+    _last_tick = time.monotonic_ns()
+    _idle = 0
+    _window_start = _last_tick
+    _window_busy = 0
+    _window_iterations = 0
+else:
+    # Stubs so you don't have to change your code, just the global metrics_enabled boolean.
+
+    def tick():
+        pass
+
+
+    def sleep(seconds):
+        time.sleep(seconds)
+
+
+    def idle(_):
+        pass
+
+
+    def lateness(_, __):
+        pass
+
+
+    def lateness_name(_, name=None):
+        return None
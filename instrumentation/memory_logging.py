@@ -9,6 +9,30 @@ except NameError:
     # Set False by default to remove runtime overhead of decorators and make everything else early-out
     memory_logging_enabled = False
 
+
+def track_alloc(name, probe=False):
+    """
+    @Decorator
+    Record bytes allocated per invocation when started with memory_logging_enabled.
+    @:param name A string name for the function to be decorated.
+    @:param probe Also find the largest free block after each invocation, to see whether it fragments the heap.
+      Costs a largest_free_block() per call, so use it to find the culprit rather than leaving it on.
+    """
+    if type(name) is str:
+        def arg_wrapper(function):
+            if not memory_logging_enabled:
+                #  No runtime cost when memory logging is disabled
+                return function
+
+            context = AllocTracker(name, probe)
+
+            def wrapper(*args, **kwargs):
+                with context:
+                    return function(*args, **kwargs)
+            return wrapper
+        return arg_wrapper
+
+
 if memory_logging_enabled:
     import gc
     import time
@@ -16,25 +40,261 @@ if memory_logging_enabled:
     baseline = gc.mem_alloc()
     last_invocation = time.monotonic_ns()
 
+    def largest_free_block(steps: int = 12) -> int:
+        """
+        Roughly the biggest single allocation that would succeed right now.  Out of memory errors with plenty of
+          gc.mem_free() left mean the free heap is in pieces too small for what you asked for; this tells you how
+          big the biggest piece is.
+
+        Bisects between 0 and gc.mem_free() by allocating and dropping a bytearray of the middle size, for at most
+          steps tries, so it's within mem_free() / 2**steps.  A failed try runs the gc, which also frees the earlier
+          tries.  Every result is remembered for the lowest largest block in the next log_allocations() report.
+        """
+        global _largest_low_water
+        low = 0
+        high = gc.mem_free()
+        for _ in range(steps):
+            if high - low <= _PROBE_RESOLUTION:
+                break
+            middle = (low + high) // 2
+            try:
+                probe = bytearray(middle)
+            except MemoryError:
+                high = middle
+            else:
+                del probe
+                low = middle
+        if low < _largest_low_water:
+            _largest_low_water = low
+        return low
+
+
     # @instrumentation.metrics.timer('print_mem')
-    def print_mem(when: str):
+    def print_mem(when: str, collect: bool = True, probe: bool = False):
+        """
+        Print heap usage now, and how it changed since the last print_mem().
+        :param collect: run gc.collect() first so the numbers are live memory and garbage is counted separately.
+          Costs a full collection every call, so pass False in loops or use @track_alloc instead.
+        :param probe: also print the largest free block, from largest_free_block()
+        """
         global baseline
         global last_invocation
         alloc_start = gc.mem_alloc()
-        gc.collect()
+        if collect:
+            gc.collect()
         alloc_after = gc.mem_alloc()
         garbage = alloc_start - alloc_after
+        largest = ''
+        if probe:
+            largest = '  largest:{:6d}'.format(largest_free_block())
         now = time.monotonic_ns()
-        print('  {:>8.1f}ms {:36s}:  free:{:6d} alloc:{:6d}  difference:{:6d}  garbage:{:6d}'.format(
+        print('  {:>8.1f}ms {:36s}:  free:{:6d} alloc:{:6d}  difference:{:6d}  garbage:{:6d}{}'.format(
             (now - last_invocation) / 1000000,
             when,
             gc.mem_free(),
             alloc_after,
             alloc_after-baseline,
-            garbage
+            garbage,
+            largest
         ))
         baseline = alloc_after
         last_invocation = now
+
+
+    class AllocTracker:
+        """
+        Prefer @track_alloc(name) to this as there is 0 runtime cost on that strategy when
+          memory logging is disabled.
+        Tracks gc.mem_alloc() from scope open to scope close (use in a `with AllocTracker('name'):` block)
+          into a tree by call stack, the same way metrics.Timer tracks time.
+        Get your results by calling log_allocations() periodically.
+
+        No collections are forced, and a collection inside the scope hides some of what it allocated: whatever
+          the gc freed is subtracted from the difference, so that invocation is under-reported.  Only when it
+          freed more than the scope allocated does alloc go down, and then the invocation is counted as collected
+          rather than recorded.  Max (B) is the better guide for scopes that often see a collection.
+
+        Each scope also keeps the high water mark of gc.mem_alloc() at its exits and, with probe, the smallest
+          largest_free_block() after it: the scopes where that drops are the ones fragmenting the heap, and the
+          ones to preallocate for.  The probe runs after the scope is recorded and isn't counted in the scopes
+          around it either.
+        """
+        def __init__(self, name, probe=False):
+            self.name = name
+            self.probe = probe
+
+        def __enter__(self):
+            global _depth
+            parent = _alloc_stack[_depth]
+            node = parent.children.get(self.name, None)
+            if node is None:
+                node = _AllocNode()
+                parent.children[self.name] = node
+            _depth += 1
+            if _depth == len(_alloc_stack):
+                _alloc_stack.append(node)
+                _alloc_start_stack.append(0)
+            else:
+                _alloc_stack[_depth] = node
+            _alloc_start_stack[_depth] = gc.mem_alloc()
+            return self
+
+        def __exit__(self, exc_type, exc_val, exc_tb):
+            global _depth
+            in_use = gc.mem_alloc()
+            allocated = in_use - _alloc_start_stack[_depth]
+            node = _alloc_stack[_depth]
+            _depth -= 1
+            node.observe(allocated)
+            if in_use > node.high_water:
+                node.high_water = in_use
+            if self.probe:
+                before = gc.mem_alloc()
+                largest = largest_free_block()
+                if largest < node.largest_block:
+                    node.largest_block = largest
+                # The probe's tries stay allocated until a collection.  Move the enclosing scopes' starts by what
+                #  they changed so they aren't charged for them.
+                probed = gc.mem_alloc() - before
+                depth = _depth
+                while depth > 0:
+                    _alloc_start_stack[depth] += probed
+                    depth -= 1
+
+
+    def log_allocations(target_seconds=10, collect=False, probe=False) -> None:
+        """
+        Call on a timer, like every 10 seconds or every 60 seconds.  Prints bytes allocated per invocation of
+          each tracked scope by call stack, then starts over.  Invocations the gc ran in are under-reported, or
+          counted under Collected when it freed more than they allocated; see AllocTracker.
+        :param collect: gc.collect() before printing heap totals, at most once per report.
+        :param probe: find the largest free block for the heap totals line, with largest_free_block()
+        """
+        global _last_allocation_report
+        global _largest_low_water
+        start = time.monotonic_ns()
+        elapsed_nanos = start - _last_allocation_report
+        if elapsed_nanos < target_seconds * 1000000000:
+            return
+        _last_allocation_report = start
+        if collect:
+            gc.collect()
+        print('\n\n--------------   Allocations   ---------------------------------------------------------')
+        print('Elapsed: {:.1f} seconds  free:{:d} alloc:{:d}'.format(elapsed_nanos / 1000000000, gc.mem_free(), gc.mem_alloc()))
+        if probe:
+            largest_free_block()
+        if _largest_low_water < _NOT_PROBED:
+            # Fragmentation: how much of the free heap is outside the biggest piece
+            free = max(1, gc.mem_free())
+            print('Largest free block: lowest {:d} since last report, {:.0%} of free heap fragmented'.format(
+                _largest_low_water, max(0, free - _largest_low_water) / free
+            ))
+            _largest_low_water = _NOT_PROBED
+        rows = []
+        _flatten(_alloc_stack[0], 0, rows)
+        if len(rows) == 0:
+            print('no allocations tracked')
+        else:
+            namewidth = max(max(1, 2*level + len(name)) for level, name, _ in rows)
+            print('{{:{}s}}'.format(namewidth).format('Stack'), end='')
+            print(' | {:>8s} | {:>8s} | {:>8s} | {:>8s} | {:>10s} | {:>9s} | {:>9s} | {:>9s}'.format(
+                'Avg (B)', 'Min (B)', 'Max (B)', 'Count', 'Sum (B)', 'Collected', 'High (B)', 'Block (B)'
+            ))
+            for level, name, node in rows:
+                prefix = '| ' * level
+                if level > 0:
+                    prefix = prefix[:-1] + '-'
+                print('{}{{:{}s}} | {{:8.1f}} | {{:8d}} | {{:8d}} | {{:8d}} | {{:10d}} | {{:9d}} | {{:9d}} | {{:>9s}}'.format(
+                    prefix, namewidth - 2*level
+                ).format(
+                    name, node.sum / max(1, node.count), node.min if node.count else 0, node.max if node.count else 0,
+                    node.count, node.sum, node.collected, node.high_water,
+                    '' if node.largest_block == _NOT_PROBED else str(node.largest_block)
+                ))
+        print('Allocation report completed in {}ms'.format((time.monotonic_ns() - start) / 1000000))
+        print('---------------------------------------------------------------------------------------\n\n')
+        _alloc_stack[0].reset()
+
+
+    ########################################################################################
+    #
+    # Framework tools below.  You probably only care about what's above here.
+    #
+    ########################################################################################
+
+
+    class _AllocNode:
+        __slots__ = ('min', 'max', 'sum', 'count', 'collected', 'high_water', 'largest_block', 'children')
+
+        def __init__(self):
+            self.children = {}
+            self.reset()
+
+        def observe(self, allocated):
+            if allocated < 0:
+                # The gc ran in here and freed more than was allocated; we can't tell how much that was.
+                self.collected += 1
+                return
+            if allocated < self.min:
+                self.min = allocated
+            if allocated > self.max:
+                self.max = allocated
+            self.sum += allocated
+            self.count += 1
+
+        def reset(self):
+            """Zero this subtree in place"""
+            self.min = 1 << 30
+            self.max = 0
+            self.sum = 0
+            self.count = 0
+            self.collected = 0
+            # Most gc.mem_alloc() at an exit, and the least largest_free_block() after one when probing
+            self.high_water = 0
+            self.largest_block = _NOT_PROBED
+            for child in self.children.values():
+                child.reset()
+
+
+    def _flatten(node, level, rows):
+        # Depth first, most bytes first.  Leaves out subtrees with nothing recorded since the last report.
+        for name, child in sorted(node.children.items(), key=lambda c: c[1].sum, reverse=True):
+            index = len(rows)
+            rows.append((level, name, child))
+            _flatten(child, level + 1, rows)
+            if child.count == 0 and child.collected == 0 and len(rows) == index + 1:
+                rows.pop()
+
+
+    # Bisect no finer than this; about a gc block
+    _PROBE_RESOLUTION = 16
+    _NOT_PROBED = 1 << 30
+    _largest_low_water = _NOT_PROBED
+    _alloc_stack = [_AllocNode()]
+    _alloc_start_stack = [0]
+    _depth = 0
+    _last_allocation_report = time.monotonic_ns()
 else:
-    def print_mem(when):
+    # Stubs so you don't have to change your code, just the global memory_logging_enabled boolean.
+
+    def largest_free_block(steps=12):
+        return 0
+
+
+    def print_mem(when, collect=True, probe=False):
+        pass
+
+
+    def log_allocations(target_seconds=10, collect=False, probe=False):
         pass
+
+
+    class AllocTracker:
+        def __init__(self, _, probe=False):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc_val, exc_tb):
+            pass
@@ -22,11 +22,16 @@ except NameError:
     metrics_enabled = False
 
 
-def timer(name):
+def timer(name, sample_rate=1, sample_ms=None):
     """
     @Decorator
     Record milliseconds per invocation when started with metrics_enabled.
     @:param name A string name for the function to be decorated.
+    @:param sample_rate Only time 1 in this many invocations.  Counts and sums are scaled back up in the report.
+    @:param sample_ms Instead of a fixed rate, time about 1 invocation per this many milliseconds however often
+      the function is called.
+    Invocations that aren't timed cost a counter decrement and a branch.  Timers inside them are recorded under
+      the caller, so sample hot leaf functions rather than ones that call other timed functions.
     """
     if type(name) is str:
         def arg_wrapper(function):
@@ -34,18 +39,39 @@ def timer(name):
                 #  No runtime cost when metrics are disabled
                 return function
 
-            def wrapper(*args, **kwargs):
-                with Timer(name):
+            # One Timer per decorated function: it caches where it sits in the tree, so calls don't build a Timer
+            #  or look up their node.
+            context = Timer(name)
+
+            if sample_rate == 1 and sample_ms is None:
+                def wrapper(*args, **kwargs):
+                    with context:
+                        return function(*args, **kwargs)
+                return wrapper
+
+            sampler = _Sampler(sample_rate, sample_ms)
+
+            def sampled_wrapper(*args, **kwargs):
+                sampler.countdown -= 1
+                if sampler.countdown > 0:
+                    return function(*args, **kwargs)
+                sampler.sample(context)
+                with context:
                     return function(*args, **kwargs)
-            return wrapper
+            return sampled_wrapper
         return arg_wrapper
 
 
-def atimer(name):
+def atimer(name, sample_rate=1, sample_ms=None):
     """
     @Decorator
     Record milliseconds per invocation when started with metrics_enabled.
     @:param name A string name for the function to be decorated.
+    @:param sample_rate Only time 1 in this many invocations, see timer()
+    @:param sample_ms Time about 1 invocation per this many milliseconds, see timer()
+    The clock only runs while the coroutine does: time spent suspended at an await is reported separately
+      and coroutines interleaved by an event loop each keep their own place in the timer stack.
+    Unlike @timer this allocates per call: a wrapper coroutine and the _TimedCoroutine stepping yours.
     """
     if type(name) is str:
         def arg_wrapper(function):
@@ -53,14 +79,33 @@ def atimer(name):
                 #  No runtime cost when metrics are disabled
                 return function
 
-            async def wrapper(*args, **kwargs):
-                with Timer(name):
+            context = Timer(name)
+
+            if sample_rate == 1 and sample_ms is None:
+                async def wrapper(*args, **kwargs):
+                    return await _TimedCoroutine(context, function(*args, **kwargs), 1)
+                return wrapper
+
+            sampler = _Sampler(sample_rate, sample_ms)
+
+            async def sampled_wrapper(*args, **kwargs):
+                sampler.countdown -= 1
+                if sampler.countdown > 0:
                     return await function(*args, **kwargs)
-            return wrapper
+                sampler.sample(context)
+                return await _TimedCoroutine(context, function(*args, **kwargs), context.weight)
+            return sampled_wrapper
         return arg_wrapper
 
 
 if metrics_enabled:
+    import math
+    from array import array
+
+    from instrumentation.metrics_export import (
+        BUCKETS_PER_DOUBLING, BUCKET_COUNT, BUCKET_BASE_EXPONENT, HISTOGRAM_LENGTH, bucket_percentile, print_report
+    )
+
     def measure(name, observation):
         """
         Record some numeric observation.
@@ -78,27 +123,157 @@ if metrics_enabled:
         Tracks time for scope open to scope close (use in a `with Timer('name'):` block).
         Emits the time into the stack tracker.
         Get your results by calling log_metrics() periodically.
+        Don't await inside the block: other coroutines would run inside it.  Use @atimer for coroutines.
+
+        A Timer holds no per-call state, so you can keep one around and re-enter it (even recursively).
+          It remembers which node it used under which parent, so re-entering it from the same place
+          skips the lookup.  Timing still allocates: monotonic_ns() outgrows a small int about a second after
+          boot, so each clock read is a heap int on a board, and so is the float arithmetic that records it on
+          ports that box floats.
         """
+        __slots__ = ('name', 'weight', '_parent', '_node')
 
         def __init__(self, name):
             self.name = name
+            # How many invocations the next observation stands for; set by sampling decorators.
+            self.weight = 1
+            self._parent = None
+            self._node = None
 
         def __enter__(self):
-            self.start = time.monotonic_ns()
-            self.timer = timer_stack[-1].get(self.name, None)
-            if self.timer is None:
-                self.timer = _TimerNode(self.name)
-                timer_stack[-1][self.name] = self.timer
-            self.pushed_timer = timer_stack[-1] is not self.timer
-            if self.pushed_timer:
-                timer_stack.append(self.timer)
+            _push(self.current_node())
+            _start_stack[_depth] = time.monotonic_ns()
             return self
 
         def __exit__(self, exc_type, exc_val, exc_tb):
-            elapsed = time.monotonic_ns() - self.start
-            if self.pushed_timer:
-                timer_stack.pop(-1)
-            self.timer.observe(elapsed / 1000000)
+            global _depth
+            elapsed = time.monotonic_ns() - _start_stack[_depth]
+            node = timer_stack[_depth]
+            _depth -= 1
+            node.observe(elapsed / 1000000, self.weight)
+
+        def current_node(self):
+            """The node this Timer records into if entered right now"""
+            parent = timer_stack[_depth]
+            if parent is self._parent:
+                return self._node
+            node = parent.children.get(self.name, None)
+            if node is None:
+                node = _TimerNode(self.name, parent)
+                parent.children[self.name] = node
+            self._parent = parent
+            self._node = node
+            return node
+
+
+    def _rebind(node):
+        """
+        The node at node's path in the live tree, creating it if need be.  node itself if it's already there.
+        metrics_reporter() swaps the live tree for the spare one, so nodes cached before a swap use this to follow.
+        """
+        if node.parent is None:
+            return timer_stack[0]
+        parent = _rebind(node.parent)
+        if parent is node.parent:
+            return node
+        child = parent.children.get(node.name, None)
+        if child is None:
+            child = _TimerNode(node.name, parent)
+            parent.children[node.name] = child
+        return child
+
+
+    def _push(node):
+        global _depth
+        _depth += 1
+        if _depth == len(timer_stack):
+            # Deepest we've been so far; grow the preallocated stacks.
+            timer_stack.append(node)
+            _start_stack.append(0)
+        else:
+            timer_stack[_depth] = node
+
+
+    class _TimedCoroutine:
+        """
+        Runs a coroutine for @atimer, one step at a time.  Each step pushes the coroutine's node onto the timer
+          stack, resumes the coroutine and pops the node when it suspends, so the stack is right for whichever
+          coroutine is running and the clock only runs while this one does.
+        Finishing records the running time and the time spent suspended in between.
+        A coroutine can outlive a metrics_reporter() swap, so its node is looked up again in the live tree when
+          _generation has moved on since it last ran.
+        """
+        __slots__ = ('_context', '_coroutine', '_weight', '_node', '_generation', '_first_step', '_running')
+
+        def __init__(self, context, coroutine, weight):
+            self._context = context
+            self._coroutine = coroutine
+            self._weight = weight
+            self._node = None
+            self._generation = 0
+            self._first_step = 0
+            self._running = 0
+
+        def __await__(self):
+            return self
+
+        __iter__ = __await__
+
+        def __next__(self):
+            return self.send(None)
+
+        def send(self, value):
+            start = self._resume()
+            try:
+                result = self._coroutine.send(value)
+            except BaseException:
+                self._suspend(start)
+                self._finish()
+                raise
+            self._suspend(start)
+            return result
+
+        def throw(self, *exception):
+            start = self._resume()
+            try:
+                result = self._coroutine.throw(*exception)
+            except BaseException:
+                self._suspend(start)
+                self._finish()
+                raise
+            self._suspend(start)
+            return result
+
+        def close(self):
+            self._coroutine.close()
+
+        def _resume(self):
+            if self._node is None:
+                # Whatever is running when the coroutine first runs is its parent from then on.
+                self._node = self._context.current_node()
+                self._generation = _generation
+            _push(self._live_node())
+            start = time.monotonic_ns()
+            if self._first_step == 0:
+                self._first_step = start
+            return start
+
+        def _suspend(self, start):
+            global _depth
+            self._running += time.monotonic_ns() - start
+            _depth -= 1
+
+        def _finish(self):
+            suspended = time.monotonic_ns() - self._first_step - self._running
+            node = self._live_node()
+            node.observe(self._running / 1000000, self._weight)
+            node.suspended += suspended * self._weight / 1000000
+
+        def _live_node(self):
+            if self._generation != _generation:
+                self._node = _rebind(self._node)
+                self._generation = _generation
+            return self._node
 
 
     def log_metrics(target_seconds=10) -> None:
@@ -111,36 +286,70 @@ if metrics_enabled:
         if (start - last_timer_reset) < (target_seconds * 1000000000):
             return
         last_timer_reset = start
-        print('\n\n--------------   Metrics   -------------------------------------------------------------------------------------------------')
-        # Print out the recursive formatted timer stack
-        timer_stack[0].print(elapsed_nanos / 1000000)
+        steps = _exporter(elapsed_nanos / 1000000, timer_stack[0], measurements)
+        if steps is not None:
+            for _ in steps:
+                pass
         timer_stack[0].reset()
+        for stats in measurements.values():
+            stats.reset()
+
 
-        # Print out the literal measurements table
-        if len(measurements) > 0:
-            maxname = max(len(name) for name in measurements)
-            stackname_format = '{{:{}s}}'.format(maxname)
-            # Print measurement header
-            print('\n-------------  Measurements   ', end='')
-            for _ in range(maxname + 11*4):
-                print('-', end='')
-            print()
-            print('{{:>{}s}}'.format(maxname).format('Measurement'), end='')
-            print(' | {avg:>8s} | {min:>8s} | {max:>8s} | {count:>8s}'.format(
-                avg='avg', min='min', max='max', count='count'
-            ))
-
-            for name, stats in measurements.items():
-                print('{stackname} | {avg:8.3f} | {min:8.3f} | {max:8.3f} | {count:8d}'.format(
-                    stackname=stackname_format.format(name),
-                    avg=stats.sum / max(1, stats.count),
-                    min=stats.min,
-                    max=stats.max,
-                    count=stats.count,
-                ))
+    def metrics_reporter(target_seconds=10, slice_ms=2):
+        """
+        Generator: use instead of log_metrics() when a whole report would stall your loop.  Call next() on it
+          every loop() iteration and each report is spread over as many iterations as it needs, spending about
+          slice_ms per iteration.
+
+        When a report is due the live timer tree and measurements are swapped for a spare set, so the report
+          reads a still snapshot while your timers carry on recording into the other one.  Timers open at the
+          swap, and @atimer coroutines suspended across it, record into the live tree when they finish.
+        """
+        global last_timer_reset
+        global measurements
+        global _spare_root
+        global _spare_measurements
+        global _generation
+        slice_nanos = slice_ms * 1000000
+        while True:
+            start = time.monotonic_ns()
+            if (start - last_timer_reset) < (target_seconds * 1000000000):
+                yield
+                continue
+            elapsed_nanos = start - last_timer_reset
+            last_timer_reset = start
+            root = timer_stack[0]
+            timer_stack[0] = _spare_root
+            _spare_root = root
+            _generation += 1
+            # Timers open right now move over to the live tree; they'd be reset with the report otherwise
+            for depth in range(1, _depth + 1):
+                timer_stack[depth] = _rebind(timer_stack[depth])
+            reported_measurements = measurements
+            measurements = _spare_measurements
+            _spare_measurements = reported_measurements
+
+            steps = _exporter(elapsed_nanos / 1000000, root, reported_measurements)
+            if steps is not None:
+                deadline = start + slice_nanos
+                for _ in steps:
+                    if time.monotonic_ns() >= deadline:
+                        yield
+                        deadline = time.monotonic_ns() + slice_nanos
+            root.reset()
+            for stats in reported_measurements.values():
                 stats.reset()
-        print('\nMetrics report completed in {}ms'.format((time.monotonic_ns() - start) / 1000000))
-        print('----------------------------------------------------------------------------------------------------------------------------\n\n')
+            yield
+
+
+    def set_exporter(exporter) -> None:
+        """
+        Choose where log_metrics() sends reports.  Defaults to printing tables.
+        :param exporter: a callable (elapsed_ms, timer_root, measurements) - see instrumentation.metrics_export
+          for print_report and BinaryExporter.
+        """
+        global _exporter
+        _exporter = exporter
 
 
     ########################################################################################
@@ -150,24 +359,67 @@ if metrics_enabled:
     ########################################################################################
 
 
+    # Observations are also counted in a fixed histogram of logarithmic buckets for percentiles.
+    # Bucket i holds [_BUCKET_BASE * _BUCKET_RATIO**i, _BUCKET_BASE * _BUCKET_RATIO**(i+1)), 4 buckets per doubling,
+    #  so percentiles are within about 9% between 2**-7 and 2**17.  Positive values outside that land in the end
+    #  buckets and percentiles are clamped to the exact min and max.  Zero and negative values are counted in one
+    #  more bucket after those, ranked below everything else.
+    _BUCKET_COUNT = BUCKET_COUNT
+    _NONPOSITIVE_BUCKET = BUCKET_COUNT
+    _BUCKET_BASE = 2 ** BUCKET_BASE_EXPONENT
+    _BUCKET_RATIO = 2 ** (1 / BUCKETS_PER_DOUBLING)
+    _LOG_BUCKET_BASE = math.log(_BUCKET_BASE)
+    _BUCKETS_PER_LOG = 1 / math.log(_BUCKET_RATIO)
+    # uint32, so busy timers reported every minute don't run out: RotaryButton.loop at 1kHz for 60s is 60000
+    _MAX_BUCKET_COUNT = 0xffffffff
+    _ZERO_BUCKETS = array('I', [0] * HISTOGRAM_LENGTH)
+
     class _StatisticSet:
+        __slots__ = ('min', 'max', 'sum', 'count', 'buckets')
+
         def __init__(self):
             self.min = float('inf')
             self.max = -float('inf')
             self.sum = 0
             self.count = 0
-
-        def observe(self, value):
-            self.min = min(self.min, value)
-            self.max = max(self.max, value)
-            self.sum += value
-            self.count += 1
+            # 4 bytes per bucket, allocated once.  Counts saturate rather than grow.
+            self.buckets = array('I', [0] * HISTOGRAM_LENGTH)
+
+        def observe(self, value, weight=1):
+            """
+            :param weight: how many observations this one stands for, when sampling
+            """
+            if value < self.min:
+                self.min = value
+            if value > self.max:
+                self.max = value
+            self.sum += value * weight
+            self.count += weight
+            if value > _BUCKET_BASE:
+                bucket = int((math.log(value) - _LOG_BUCKET_BASE) * _BUCKETS_PER_LOG)
+                if bucket >= _BUCKET_COUNT:
+                    bucket = _BUCKET_COUNT - 1
+            elif value > 0:
+                bucket = 0
+            else:
+                bucket = _NONPOSITIVE_BUCKET
+            if self.buckets[bucket] + weight <= _MAX_BUCKET_COUNT:
+                self.buckets[bucket] += weight
+            else:
+                self.buckets[bucket] = _MAX_BUCKET_COUNT
+
+        def percentile(self, fraction):
+            """
+            Estimate the value that fraction of observations were at or below, like 0.99 for p99.
+            """
+            return bucket_percentile(self.buckets, fraction, self.min, self.max, _BUCKET_BASE, _BUCKET_RATIO)
 
         def reset(self):
             self.min = float('inf')
             self.max = -float('inf')
             self.sum = 0
             self.count = 0
+            self.buckets[:] = _ZERO_BUCKETS
 
         def __str__(self):
             # 41 chars
@@ -178,63 +430,56 @@ if metrics_enabled:
                 count=self.count,
             )
 
-    class _TimerNode:
-        def __init__(self, name):
-            self.min = float('inf')
-            self.max = -float('inf')
-            self.sum = 0
-            self.count = 0
+    class _Sampler:
+        """
+        Decides which invocations a sampling decorator times.  countdown is decremented on every invocation
+          and sample() is called when it runs out.
+        """
+        __slots__ = ('countdown', '_period', '_rate', '_sample_nanos', '_last_sample')
+
+        def __init__(self, sample_rate, sample_ms):
+            # The first invocation is always timed
+            self.countdown = 1
+            self._period = 1
+            self._rate = max(1, int(sample_rate))
+            self._sample_nanos = None if sample_ms is None else sample_ms * 1000000
+            self._last_sample = 0
+
+        def sample(self, context):
+            # Exactly _period invocations happened since the last sample; this one stands for all of them.
+            context.weight = self._period
+            if self._sample_nanos is None:
+                self._period = self._rate
+            else:
+                now = time.monotonic_ns()
+                if self._last_sample > 0:
+                    # Aim for the next sample one window from now at the rate we've been called lately
+                    elapsed = max(1, now - self._last_sample)
+                    self._period = max(1, int(self._period * self._sample_nanos / elapsed))
+                self._last_sample = now
+            self.countdown = self._period
+
+    class _TimerNode(_StatisticSet):
+        __slots__ = ('name', 'parent', 'children', 'suspended')
+
+        def __init__(self, name, parent=None):
+            super().__init__()
+            self.name = name
+            # None for the roots
+            self.parent = parent
             self.children = {}
-
-        def observe(self, value):
-            self.min = min(self.min, value)
-            self.max = max(self.max, value)
-            self.sum += value
-            self.count += 1
+            # Milliseconds coroutines timed here spent suspended at an await; not included in sum.
+            self.suspended = 0
 
         def reset(self):
-            """Called on the root node"""
-            self.children.clear()
-
-        def print(self, elapsed_ms):
-            # Root node
-            # 123 characters wide
-            if len(self.children) == 0:
-                print('no timers encountered')
-                return
-            max_namewidth = max(child._namewidth(name) for name, child in self.children.items())
-            header_format_string = '{{:{:d}s}} | {:>8s} | {:>8s} | {:>8s} | {:>8s} | {:>8s} | {:>6s}'
-            step_1_format = header_format_string.format(max_namewidth, 'Avg (ms)', 'Min (ms)', 'Max (ms)', 'Count', 'Sum (s)', '%')
-            format_string = step_1_format.format('Stack')
-            header_preamble = '\n--------------   Timers    '
-            print(header_preamble, end='')
-            for _ in range(max(0, len(format_string) - len(header_preamble))):
-                print('-', end='')
-            print()
-
-            print('Elapsed: {:.1f} seconds'.format(elapsed_ms / 1000))
-            print(format_string)
-            # By time spent descending
-            for name, child in sorted(self.children.items(), key=lambda c: c[1].sum, reverse=True):
-                child._print(name, 0, elapsed_ms, max_namewidth)
-
-        def _print(self, name, level, elapsed_ms, max_namewidth):
-            print(''.join('| ' for _ in range(max(0, level))), end='')
-            if level > 0:
-                print('\b-', end='')
-            leading_chars = max(len(name), max_namewidth - 2*level)
-            format_string = '{{:{}s}} | {{:8.3f}} | {{:8.3f}} | {{:8.3f}} | {{:8d}} | {{:8.3f}} | {{:6.1%}}'.format(leading_chars)
-            percent_time_this_node = self.sum / elapsed_ms
-            print(format_string.format(name, self.sum / max(1, self.count), self.min, self.max, self.count, self.sum / 1000, percent_time_this_node))
-            for name, child in sorted(self.children.items(), key=lambda c: c[1].sum, reverse=True):
-                child._print(name, level+1, elapsed_ms, max_namewidth)
-
-        def _namewidth(self, name, level=0):
-            self_length = max(1, level * 2 + len(name))
-            return self_length if len(self.children) == 0 else max(
-                max(child._namewidth(name, level+1) for name, child in self.children.items()),
-                self_length
-            )
+            """
+            Zero this subtree in place.  Keeping the nodes means Timers' cached nodes stay valid, and the
+              next report interval doesn't have to allocate the tree all over again.
+            """
+            super().reset()
+            self.suspended = 0
+            for child in self.children.values():
+                child.reset()
 
         def get(self, item, default):
             return self.children.get(item, default)
@@ -242,19 +487,20 @@ if metrics_enabled:
         def __setitem__(self, key, value):
             self.children[key] = value
 
-        def __str__(self):
-            # 41 chars
-            return 'avg:{avg:8.3f}  min:{min:8.3f}  max:{max:8.3f}  count:{count:6d}'.format(
-                avg=self.sum / self.count,
-                min=self.min,
-                max=self.max,
-                count=self.count
-            )
-
 
     measurements = {}
+    # Swapped with the live ones by metrics_reporter() so it can report without copying
+    _spare_root = _TimerNode('root')
+    _spare_measurements = {}
+    # Counts swaps, so coroutines can tell their cached node may be in the spare tree
+    _generation = 0
+    # timer_stack[:_depth + 1] is the path of timers currently open, root first.  The stacks only grow;
+    #  entries past _depth are stale leftovers kept around so entering a timer doesn't allocate.
     timer_stack = [_TimerNode('root')]
+    _start_stack = [0]
+    _depth = 0
     last_timer_reset = time.monotonic_ns()
+    _exporter = print_report
 else:
     # Stubs so you don't have to change your code, just the global metrics_enabled boolean when you're doing perf work.
 
@@ -262,7 +508,16 @@ else:
         pass
 
 
-    def log_metrics():
+    def log_metrics(target_seconds=10):
+        pass
+
+
+    def metrics_reporter(target_seconds=10, slice_ms=2):
+        while True:
+            yield
+
+
+    def set_exporter(_):
         pass
 
 
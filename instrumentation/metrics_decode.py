@@ -0,0 +1,102 @@
+import struct
+import sys
+
+from instrumentation.metrics_export import (
+    MAGIC, VERSION, HEADER_FORMAT, RECORD_FORMAT, FLAG_HISTOGRAMS, KIND_END, KIND_TIMER, KIND_MEASUREMENT,
+    bucket_percentile, print_report,
+)
+
+#
+# Host side decoder for instrumentation.metrics_export.BinaryExporter snapshots.
+# Run this on your computer, not on the board:
+#
+#   python -m instrumentation.metrics_decode snapshots.bin
+#
+# prints each snapshot as the same tables log_metrics() would have printed.
+#
+
+
+def read_snapshots(stream):
+    """
+    Decode snapshots from a binary stream until it runs out.
+    :return: generator of (elapsed_ms, timer_root, measurements), the same arguments an exporter receives
+    """
+    header_size = struct.calcsize(HEADER_FORMAT)
+    record_size = struct.calcsize(RECORD_FORMAT)
+    while True:
+        header = stream.read(header_size)
+        if len(header) < header_size:
+            return
+        magic, version, flags, buckets_per_doubling, histogram_length, base_exponent, elapsed_ms = struct.unpack(
+            HEADER_FORMAT, header
+        )
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('not a metrics snapshot (magic {}, version {})'.format(magic, version))
+        geometry = (2 ** base_exponent, 2 ** (1 / buckets_per_doubling))
+        bucket_format = '<{}I'.format(histogram_length)
+        bucket_size = struct.calcsize(bucket_format)
+
+        root = _DecodedStats(geometry)
+        path = [root]
+        measurements = {}
+        while True:
+            kind, depth, count, total, minimum, maximum, suspended, name_length = struct.unpack(
+                RECORD_FORMAT, _read_exactly(stream, record_size)
+            )
+            if kind == KIND_END:
+                break
+            name = _read_exactly(stream, name_length).decode()
+            stats = _DecodedStats(geometry, count, total, minimum, maximum, suspended)
+            if flags & FLAG_HISTOGRAMS:
+                stats.buckets = struct.unpack(bucket_format, _read_exactly(stream, bucket_size))
+            if kind == KIND_TIMER:
+                del path[depth + 1:]
+                path[depth].children[name] = stats
+                path.append(stats)
+            elif kind == KIND_MEASUREMENT:
+                measurements[name] = stats
+            else:
+                raise ValueError('unknown record kind {}'.format(kind))
+        yield elapsed_ms, root, measurements
+
+
+class _DecodedStats:
+    """Looks enough like a metrics timer node or statistic set for the exporters."""
+    def __init__(self, geometry, count=0, total=0, minimum=float('inf'), maximum=-float('inf'), suspended=0):
+        self.count = count
+        self.sum = total
+        self.min = minimum
+        self.max = maximum
+        self.suspended = suspended
+        self.buckets = ()
+        self.children = {}
+        self._geometry = geometry
+
+    def percentile(self, fraction):
+        if not self.buckets:
+            # Sent without histograms; the mean is the best we've got.
+            return self.sum / max(1, self.count)
+        base, ratio = self._geometry
+        return bucket_percentile(self.buckets, fraction, self.min, self.max, base, ratio)
+
+
+def _read_exactly(stream, size):
+    data = stream.read(size)
+    if len(data) < size:
+        raise EOFError('snapshot truncated')
+    return data
+
+
+def main(argv):
+    if len(argv) > 1:
+        stream = open(argv[1], 'rb')
+    else:
+        stream = sys.stdin.buffer
+    with stream:
+        for snapshot in read_snapshots(stream):
+            for _ in print_report(*snapshot):
+                pass
+
+
+if __name__ == '__main__':
+    main(sys.argv)
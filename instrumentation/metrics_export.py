@@ -0,0 +1,245 @@
+import struct
+import time
+
+#
+# Exporters for instrumentation.metrics.
+#
+# log_metrics() hands each report to an exporter: a generator function taking (elapsed_ms, timer_root, measurements)
+#  where timer_root is the root of the timer tree and measurements maps names to statistic sets.  Nodes and statistic
+#  sets offer min, max, sum, count, buckets and percentile(fraction); timer nodes also have a children dict.
+#
+# The exporter yields after each bounded piece of work, like a row, so metrics_reporter() can spread a report across
+#  loop iterations; log_metrics() just runs it to the end.  A plain function returning None works too, in one go.
+#  Either way the exporter must not hold on to the statistics: they are zeroed once it finishes.
+#
+# print_report is the default and prints the tables.  BinaryExporter writes a compact snapshot instead, which
+#  instrumentation.metrics_decode turns back into the same tables on your computer.
+#
+
+# Histogram geometry for percentiles: BUCKET_COUNT log-scale buckets, BUCKETS_PER_DOUBLING per power of 2,
+#  starting at 2**BUCKET_BASE_EXPONENT, then one more counting observations <= 0.
+BUCKETS_PER_DOUBLING = 4
+BUCKET_COUNT = 24 * BUCKETS_PER_DOUBLING
+BUCKET_BASE_EXPONENT = -7
+HISTOGRAM_LENGTH = BUCKET_COUNT + 1
+
+# Binary snapshot layout, little endian:
+#   header:  magic, version, flags, buckets per doubling, histogram length, log2 of the first bucket, elapsed ms
+#   records: kind, depth, count, sum, min, max, suspended, name length, name,
+#            then bucket counts as uint32 when FLAG_HISTOGRAMS
+#   Timers come depth-first, parents before children, leaving out subtrees with nothing recorded.  A record of
+#   kind KIND_END closes the snapshot.
+MAGIC = b'CPYM'
+VERSION = 4
+HEADER_FORMAT = '<4sBBBHbf'
+RECORD_FORMAT = '<BBIffffB'
+FLAG_HISTOGRAMS = 1
+KIND_END = 0
+KIND_TIMER = 1
+KIND_MEASUREMENT = 2
+
+
+def bucket_percentile(buckets, fraction, minimum, maximum, base, ratio):
+    """
+    Estimate the value that fraction of observations were at or below, like 0.99 for p99, from log-scale buckets
+      where bucket i holds [base * ratio**i, base * ratio**(i+1)), except the last, which counts observations <= 0.
+      Positive observations below base are in bucket 0.
+    :return: the geometric middle of the bucket holding that rank, clamped to minimum and maximum.  For a rank
+      among the observations <= 0, halfway between minimum and 0.  0 if empty.
+    """
+    # Counted from the buckets rather than the observation count in case some saturated.
+    rank = fraction * sum(buckets)
+    if rank <= 0:
+        return 0 if minimum > maximum else minimum
+    seen = buckets[-1]
+    if seen >= rank:
+        return (minimum + min(0, maximum)) / 2
+    for bucket in range(len(buckets) - 1):
+        seen += buckets[bucket]
+        if seen >= rank:
+            estimate = base * ratio ** (bucket + 0.5)
+            return min(maximum, max(minimum, estimate))
+    return maximum
+
+
+def print_report(elapsed_ms, timer_root, measurements):
+    """
+    Exporter that prints the timer and measurement tables, yielding after each row.
+    """
+    start = time.monotonic_ns()
+    print('\n\n--------------   Metrics   -------------------------------------------------------------------------------------------------')
+    # Print out the recursive formatted timer stack.  One pass to size the name column and one to print, each a
+    #  step per timer.
+    max_namewidth = 0
+    for row in _recorded_timers(timer_root):
+        if row is not None:
+            level, name, _ = row
+            max_namewidth = max(max_namewidth, 2*level + len(name), 1)
+        yield
+    if max_namewidth == 0:
+        print('no timers encountered')
+    else:
+        # 188 characters wide
+        header_format_string = '{{:{:d}s}} | {:>8s} | {:>8s} | {:>8s} | {:>8s} | {:>8s} | {:>8s} | {:>8s} | {:>8s} | {:>8s} | {:>8s} | {:>8s} | {:>6s}'
+        step_1_format = header_format_string.format(
+            max_namewidth, 'Avg (ms)', 'Min (ms)', 'P50 (ms)', 'P90 (ms)', 'P99 (ms)', 'Max (ms)', 'Count', 'Sum (s)',
+            'Self (s)', 'Chld (s)', 'Susp (s)', '%'
+        )
+        format_string = step_1_format.format('Stack')
+        header_preamble = '\n--------------   Timers    '
+        print(header_preamble + '-' * max(0, len(format_string) - len(header_preamble)))
+
+        print('Elapsed: {:.1f} seconds'.format(elapsed_ms / 1000))
+        print(format_string)
+        for row in _recorded_timers(timer_root):
+            if row is not None:
+                level, name, node = row
+                _print_timer(node, name, level, elapsed_ms, max_namewidth)
+            yield
+
+    # Print out the literal measurements table
+    if len(measurements) > 0:
+        maxname = max(len('Measurement'), max(len(name) for name in measurements))
+        stackname_format = '{{:{}s}}'.format(maxname)
+        # Print measurement header
+        print('\n-------------  Measurements   ' + '-' * (maxname + 11*7))
+        print(stackname_format.format('Measurement'), end='')
+        print(' | {avg:>8s} | {min:>8s} | {p50:>8s} | {p90:>8s} | {p99:>8s} | {max:>8s} | {count:>8s}'.format(
+            avg='avg', min='min', p50='p50', p90='p90', p99='p99', max='max', count='count'
+        ))
+
+        for name, stats in measurements.items():
+            print('{stackname} | {avg:8.3f} | {min:8.3f} | {p50:8.3f} | {p90:8.3f} | {p99:8.3f} | {max:8.3f} | {count:8d}'.format(
+                stackname=stackname_format.format(name),
+                avg=stats.sum / max(1, stats.count),
+                min=stats.min,
+                p50=stats.percentile(0.5),
+                p90=stats.percentile(0.9),
+                p99=stats.percentile(0.99),
+                max=stats.max,
+                count=stats.count,
+            ))
+            yield
+    print('\nMetrics report completed in {}ms'.format((time.monotonic_ns() - start) / 1000000))
+    print('----------------------------------------------------------------------------------------------------------------------------\n\n')
+
+
+class BinaryExporter:
+    def __init__(self, stream, histograms: bool = True):
+        """
+        Exporter that writes each report as a binary snapshot instead of formatting text on the device.
+
+        Decode with instrumentation.metrics_decode on your computer:
+          python -m instrumentation.metrics_decode snapshots.bin
+
+        Writing a snapshot packs into buffers allocated here and writes the histograms straight from their arrays,
+          so it costs a few writes per timer rather than a few dozen formatted prints.  Like print_report it leaves
+          out subtrees with nothing recorded since the last report, so timers that stopped running cost nothing.
+
+        :param stream: anything with write(buffer): a busio.UART, usb_cdc.data, or a file opened 'ab'
+        :param histograms: send the percentile buckets (388 bytes per timer/measurement) so the decoder can show p50/p90/p99
+        """
+        self._stream = stream
+        self._flags = FLAG_HISTOGRAMS if histograms else 0
+        self._header = bytearray(struct.calcsize(HEADER_FORMAT))
+        self._record = bytearray(struct.calcsize(RECORD_FORMAT))
+        self._labels = {}
+
+    def __call__(self, elapsed_ms, timer_root, measurements):
+        struct.pack_into(
+            HEADER_FORMAT, self._header, 0, MAGIC, VERSION, self._flags,
+            BUCKETS_PER_DOUBLING, HISTOGRAM_LENGTH, BUCKET_BASE_EXPONENT, elapsed_ms
+        )
+        self._stream.write(self._header)
+        for row in _recorded_timers(timer_root):
+            if row is not None:
+                level, name, node = row
+                self._write(KIND_TIMER, level, name, node)
+            yield
+        for name, stats in measurements.items():
+            self._write(KIND_MEASUREMENT, 0, name, stats)
+            yield
+        self._write(KIND_END, 0, '', None)
+
+    def _write(self, kind, depth, name, stats):
+        label = self._labels.get(name, None)
+        if label is None:
+            # Encoded once per name
+            label = name.encode()[:255]
+            self._labels[name] = label
+        if stats is None:
+            struct.pack_into(RECORD_FORMAT, self._record, 0, kind, depth, 0, 0, 0, 0, 0, 0)
+        else:
+            struct.pack_into(
+                RECORD_FORMAT, self._record, 0,
+                kind, depth, stats.count, stats.sum, stats.min, stats.max,
+                stats.suspended if kind == KIND_TIMER else 0, len(label)
+            )
+        self._stream.write(self._record)
+        if stats is None:
+            return
+        self._stream.write(label)
+        if self._flags & FLAG_HISTOGRAMS:
+            # Native byte order: little endian on the boards (and computers) this runs on.
+            self._stream.write(stats.buckets)
+
+
+def _walk_timers(root):
+    """
+    Generate (level, name, node) for each timer under root in print order: depth first, by time spent descending.
+      Uses its own stack and sorts one node's children at a time, so each step is bounded however big the tree.
+    """
+    stack = [(0, _by_time(root))]
+    while stack:
+        level, children = stack[-1]
+        entry = next(children, None)
+        if entry is None:
+            stack.pop()
+            continue
+        name, node = entry
+        yield level, name, node
+        if node.children:
+            stack.append((level + 1, _by_time(node)))
+
+
+def _by_time(node):
+    return iter(sorted(node.children.items(), key=lambda c: c[1].sum, reverse=True))
+
+
+def _recorded_timers(root):
+    """
+    _walk_timers() less the subtrees with nothing recorded since the last reset.  A timer with nothing recorded
+      still comes out, just before the first descendant that has something.
+    Generates None for timers it skips, so callers can yield per step.
+    """
+    # [level, name, node, generated] for the path to the current timer
+    path = []
+    for level, name, node in _walk_timers(root):
+        del path[level:]
+        path.append([level, name, node, False])
+        if node.count == 0:
+            yield None
+            continue
+        for entry in path:
+            if not entry[3]:
+                entry[3] = True
+                yield entry[0], entry[1], entry[2]
+
+
+def _print_timer(node, name, level, elapsed_ms, max_namewidth):
+    prefix = '| ' * level
+    if level > 0:
+        prefix = prefix[:-1] + '-'
+    leading_chars = max(len(name), max_namewidth - 2*level)
+    format_string = '{{}}{{:{}s}} | {{:8.3f}} | {{:8.3f}} | {{:8.3f}} | {{:8.3f}} | {{:8.3f}} | {{:8.3f}} | {{:8d}} | {{:8.3f}} | {{:8.3f}} | {{:8.3f}} | {{:8.3f}} | {{:6.1%}}'.format(leading_chars)
+    percent_time_this_node = node.sum / elapsed_ms
+    # Sum is this node's own time plus its children's.  Coroutines' time suspended at awaits is in neither.
+    child_ms = 0
+    for child in node.children.values():
+        child_ms += child.sum
+    print(format_string.format(
+        prefix, name, node.sum / max(1, node.count), node.min,
+        node.percentile(0.5), node.percentile(0.9), node.percentile(0.99),
+        node.max, node.count, node.sum / 1000,
+        max(0, node.sum - child_ms) / 1000, child_ms / 1000, node.suspended / 1000, percent_time_this_node
+    ))
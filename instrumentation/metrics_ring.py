@@ -0,0 +1,281 @@
+import gc
+import struct
+import sys
+import time
+
+try:
+    from binascii import crc32
+except ImportError:
+    def crc32(data, crc=0):
+        crc ^= 0xffffffff
+        for byte in data:
+            crc ^= byte
+            for _ in range(8):
+                crc = (crc >> 1) ^ (0xedb88320 & -(crc & 1))
+        return crc ^ 0xffffffff
+
+#
+# A ring of metrics snapshots in storage that outlives a soft reboot or a watchdog reset, so the numbers from just
+#  before a crash are still there afterwards:
+#
+#   import microcontroller
+#   from instrumentation.metrics import set_exporter
+#   from instrumentation.metrics_ring import MetricsRing
+#
+#   ring = MetricsRing(microcontroller.nvm)
+#   for record in ring.records():   # what was there from before the restart
+#       print(record)
+#   set_exporter(ring)              # or call ring(elapsed_ms, root, measurements) from your own exporter
+#
+# Storage is anything sliceable with a length: microcontroller.nvm, alarm.sleep_memory, a bytearray, or a
+#  FileStorage.  Copy it to your computer and read it there with:
+#
+#   python -m instrumentation.metrics_ring nvm.bin
+#
+# Layout, little endian:
+#   header:  magic, version, slot size
+#   slots:   sequence, uptime ms, elapsed ms, heap free, heap alloc, loop utilization %, timer count,
+#            then per timer with something recorded, and its ancestors: depth, name length, name, count, sum ms,
+#            padding, and a crc32 of everything before it in the slot.
+# Each snapshot overwrites the oldest slot in one write.  A write torn by a reset fails its crc and is skipped on
+#  reading, and every other slot is untouched, so at most the snapshot being written is lost.
+#
+
+MAGIC = b'CPMR'
+VERSION = 1
+HEADER_FORMAT = '<4sBxH'
+RECORD_FORMAT = '<IIfiIfB'
+TIMER_FORMAT = '<If'
+CRC_FORMAT = '<I'
+NAME_LIMIT = 16
+
+_HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+_RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+_TIMER_SIZE = struct.calcsize(TIMER_FORMAT)
+_CRC_SIZE = struct.calcsize(CRC_FORMAT)
+
+
+class FileStorage:
+    def __init__(self, path: str, size: int):
+        """
+        A file that looks like microcontroller.nvm to a MetricsRing: a fixed size you read and write by slice.
+          Created full of zeros if it doesn't exist.  On a board the filesystem has to be writable by your code.
+        """
+        try:
+            self._file = open(path, 'r+b')
+        except OSError:
+            with open(path, 'wb') as new_file:
+                new_file.write(bytes(size))
+            self._file = open(path, 'r+b')
+        self._size = size
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, index):
+        self._file.seek(index.start)
+        return self._file.read(index.stop - index.start)
+
+    def __setitem__(self, index, data):
+        self._file.seek(index.start)
+        self._file.write(data)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class MetricsRing:
+    def __init__(self, storage, slot_size: int = 256):
+        """
+        Keeps the last few metrics snapshots in storage that survives restarts.
+
+        Call it like an exporter, (elapsed_ms, timer_root, measurements), and it writes one fixed size record:
+          each timer's count and sum, depth first, as many as fit in slot_size; heap free and allocated; and loop
+          utilization if instrumentation.loop_stats is measuring it.  Packing reuses a buffer allocated here.
+
+        Storage that doesn't hold a ring with this slot_size yet is formatted, losing what was in it.
+
+        :param storage: microcontroller.nvm, alarm.sleep_memory, a bytearray, or a FileStorage
+        :param slot_size: bytes per snapshot.  len(storage) // slot_size of them are kept.
+        """
+        self._storage = storage
+        self._slot_size = slot_size
+        self._slot_count = (len(storage) - _HEADER_SIZE) // slot_size
+        if self._slot_count < 1:
+            raise ValueError('storage too small for a {} byte slot'.format(slot_size))
+        self._slot = bytearray(slot_size)
+        self._labels = {}
+        magic, version, stored_slot_size = struct.unpack(HEADER_FORMAT, storage[0:_HEADER_SIZE])
+        if magic != MAGIC or version != VERSION or stored_slot_size != slot_size:
+            self._format()
+        # Carry on after the newest snapshot from before the restart
+        self._sequence = 0
+        self._next_slot = 0
+        for slot in range(self._slot_count):
+            record = self._read_slot(slot)
+            if record is not None and record[0] >= self._sequence:
+                self._sequence = record[0]
+                self._next_slot = (slot + 1) % self._slot_count
+
+    def __call__(self, elapsed_ms, timer_root, measurements):
+        slot = self._slot
+        utilization = measurements.get('loop utilization %', None)
+        utilization = 0 if utilization is None or utilization.count == 0 else utilization.sum / utilization.count
+        self._sequence += 1
+        offset = _RECORD_SIZE
+        limit = self._slot_size - _CRC_SIZE
+        timer_count = 0
+        # Depth first, parents before children, as many as fit.  (node, depth) pairs from a list used as a stack.
+        pending = [(child, name, 0) for name, child in timer_root.children.items()]
+        pending.reverse()
+        # [node, name, depth, written] for the path to the current timer.  A timer with nothing recorded is only
+        #  written just before its first descendant that has something, so idle subtrees take no room.
+        path = []
+        while pending:
+            node, name, depth = pending.pop()
+            del path[depth:]
+            path.append([node, name, depth, False])
+            if node.count:
+                for entry in path:
+                    if not entry[3]:
+                        offset = self._pack_timer(offset, limit, entry[0], entry[1], entry[2])
+                        if offset < 0:
+                            break
+                        entry[3] = True
+                        timer_count += 1
+                if offset < 0:
+                    # Full: clear from the end of the last timer that fit
+                    offset = -offset
+                    break
+            children = [(child, child_name, depth + 1) for child_name, child in node.children.items()]
+            children.reverse()
+            pending.extend(children)
+        for index in range(offset, limit):
+            slot[index] = 0
+        # Looked up now rather than at import, so compat.host.install() after importing this still counts
+        heap_free = gc.mem_free() if hasattr(gc, 'mem_free') else 0
+        heap_alloc = gc.mem_alloc() if hasattr(gc, 'mem_alloc') else 0
+        struct.pack_into(
+            RECORD_FORMAT, slot, 0,
+            self._sequence, (time.monotonic_ns() // 1000000) & 0xffffffff, elapsed_ms,
+            heap_free, heap_alloc, utilization, timer_count
+        )
+        struct.pack_into(CRC_FORMAT, slot, limit, crc32(memoryview(slot)[:limit]))
+        start = _HEADER_SIZE + self._next_slot * self._slot_size
+        self._storage[start:start + self._slot_size] = slot
+        self._next_slot = (self._next_slot + 1) % self._slot_count
+
+    def _pack_timer(self, offset, limit, node, name, depth):
+        """
+        :return: the offset after the timer, or -offset if it doesn't fit before limit
+        """
+        slot = self._slot
+        label = self._label(name)
+        size = 2 + len(label) + _TIMER_SIZE
+        if offset + size > limit:
+            return -offset
+        slot[offset] = depth
+        slot[offset + 1] = len(label)
+        slot[offset + 2:offset + 2 + len(label)] = label
+        struct.pack_into(TIMER_FORMAT, slot, offset + 2 + len(label), node.count, node.sum)
+        return offset + size
+
+    def records(self):
+        """
+        :return: the intact snapshots, oldest first, as RingRecords
+        """
+        records = []
+        for slot in range(self._slot_count):
+            record = self._read_slot(slot)
+            if record is not None:
+                records.append(record)
+        records.sort(key=lambda record: record[0])
+        return [RingRecord(*record) for record in records]
+
+    def _format(self):
+        struct.pack_into(HEADER_FORMAT, self._slot, 0, MAGIC, VERSION, self._slot_size)
+        self._storage[0:_HEADER_SIZE] = bytes(self._slot[:_HEADER_SIZE])
+        empty = bytes(self._slot_size)
+        for slot in range(self._slot_count):
+            start = _HEADER_SIZE + slot * self._slot_size
+            self._storage[start:start + self._slot_size] = empty
+
+    def _read_slot(self, slot):
+        start = _HEADER_SIZE + slot * self._slot_size
+        data = bytes(self._storage[start:start + self._slot_size])
+        limit = self._slot_size - _CRC_SIZE
+        (stored_crc,) = struct.unpack_from(CRC_FORMAT, data, limit)
+        if stored_crc != crc32(data[:limit]):
+            return None
+        sequence, uptime_ms, elapsed_ms, heap_free, heap_alloc, utilization, timer_count = struct.unpack_from(
+            RECORD_FORMAT, data, 0
+        )
+        if sequence == 0:
+            return None
+        timers = []
+        offset = _RECORD_SIZE
+        for _ in range(timer_count):
+            depth = data[offset]
+            name_length = data[offset + 1]
+            # Names are cut on a character boundary, but a slot from an older version might not be
+            name = data[offset + 2:offset + 2 + name_length].decode('utf-8', 'replace')
+            count, total = struct.unpack_from(TIMER_FORMAT, data, offset + 2 + name_length)
+            timers.append((depth, name, count, total))
+            offset += 2 + name_length + _TIMER_SIZE
+        return sequence, uptime_ms, elapsed_ms, heap_free, heap_alloc, utilization, timers
+
+    def _label(self, name):
+        label = self._labels.get(name, None)
+        if label is None:
+            # Encoded once per name
+            label = name.encode()
+            if len(label) > NAME_LIMIT:
+                end = NAME_LIMIT
+                # Back off to the start of a character rather than cut one in half
+                while end > 0 and label[end] & 0xc0 == 0x80:
+                    end -= 1
+                label = label[:end]
+            self._labels[name] = label
+        return label
+
+
+class RingRecord:
+    def __init__(self, sequence, uptime_ms, elapsed_ms, heap_free, heap_alloc, utilization, timers):
+        """
+        One snapshot read back from a MetricsRing.
+        :param timers: (depth, name, count, sum ms) depth first
+        """
+        self.sequence = sequence
+        self.uptime_ms = uptime_ms
+        self.elapsed_ms = elapsed_ms
+        self.heap_free = heap_free
+        self.heap_alloc = heap_alloc
+        self.utilization = utilization
+        self.timers = timers
+
+    def __str__(self):
+        lines = ['#{} at {:.1f}s: {:.1f}s of metrics, heap free:{} alloc:{}, loop {:.1f}% busy'.format(
+            self.sequence, self.uptime_ms / 1000, self.elapsed_ms / 1000, self.heap_free, self.heap_alloc,
+            self.utilization
+        )]
+        for depth, name, count, total in self.timers:
+            lines.append('  {}{:{}s} count:{:8d}  sum:{:10.3f}ms'.format(
+                '| ' * depth, name, max(1, NAME_LIMIT + 2 - 2 * depth), count, total
+            ))
+        return '\n'.join(lines)
+
+
+def main(argv):
+    """
+    Print the snapshots in a copy of a MetricsRing's storage.
+    """
+    with open(argv[1], 'rb') as dump:
+        data = dump.read()
+    slot_size = struct.unpack_from(HEADER_FORMAT, data, 0)[2]
+    for record in MetricsRing(bytearray(data), slot_size).records():
+        print(record)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,71 @@
+import builtins
+import importlib.util
+import time
+import types
+from unittest import mock
+
+#
+# Scaffolding shared by the tests: a clock to stand in for time.monotonic_ns(), separate copies of the instrumentation
+#  modules with their flag enabled, and stepping coroutines without an event loop.
+#
+
+MS = 1000000
+
+
+class Clock:
+    """A time.monotonic_ns() that only moves when the test advances it."""
+    def __init__(self, now: int = 10 ** 12):
+        self.now = now
+
+    def advance(self, ms):
+        self.now += ms * MS
+
+    def __call__(self):
+        return self.now
+
+
+def patch_clock(test_case, now: int = 10 ** 12) -> Clock:
+    """
+    :return: a Clock patched in for time.monotonic_ns() until test_case's test finishes
+    """
+    clock = Clock(now)
+    patcher = mock.patch.object(time, 'monotonic_ns', clock)
+    patcher.start()
+    test_case.addCleanup(patcher.stop)
+    return clock
+
+
+def enabled_copy(name: str, flag: str):
+    """
+    A separate copy of module name imported with builtins.<flag> set, so every other test keeps the copy that was
+      imported with it unset.  The copy's own flag stays set, for code that reads it when it runs.
+    :param flag: like 'metrics_enabled'
+    """
+    spec = importlib.util.find_spec(name)
+    module = importlib.util.module_from_spec(spec)
+    setattr(builtins, flag, True)
+    try:
+        with mock.patch('builtins.print'):
+            spec.loader.exec_module(module)
+    finally:
+        delattr(builtins, flag)
+    setattr(module, flag, True)
+    return module
+
+
+@types.coroutine
+def suspend():
+    """Await this to suspend a coroutine once, like an await on a sleep."""
+    yield
+
+
+def run(coroutine):
+    """
+    Step coroutine until it finishes.
+    :return: its result
+    """
+    try:
+        while True:
+            coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
@@ -0,0 +1,67 @@
+from unittest import TestCase
+
+import compat.host
+compat.host.install()
+
+import displayio
+import vectorio
+
+from animation.driver import AnimationDriver
+
+
+class TestAnimationDriver(TestCase):
+    def setUp(self):
+        self.display = displayio.Display()
+        self.driver = AnimationDriver(self.display)
+        self.polygon = vectorio.Polygon(points=[(0, 0), (10, 0), (5, 8)])
+        self.shape = vectorio.VectorShape(shape=self.polygon, pixel_shader=displayio.Palette(2), x=1, y=2)
+        self.animated = self.driver.track(self.shape, self.polygon)
+
+    def test_turns_off_auto_refresh(self):
+        self.assertFalse(self.display.auto_refresh)
+
+    def test_idle_frame_does_not_refresh(self):
+        self.assertFalse(self.driver.frame())
+        self.animated.move(1, 2)
+        self.animated.set_point(1, 10, 0)
+        self.assertFalse(self.driver.frame())
+        self.assertEqual(0, self.display.refresh_count)
+
+    def test_changes_wait_for_frame(self):
+        self.animated.move(5, 6)
+        self.animated.set_point(2, 4, 9)
+        self.animated.move(7, 8)
+        self.assertEqual((1, 2), (self.shape.x, self.shape.y))
+        self.assertTrue(self.driver.frame())
+        self.assertEqual((7, 8), (self.shape.x, self.shape.y))
+        self.assertEqual([(0, 0), (10, 0), (4, 9)], self.polygon.points)
+        self.assertEqual(1, self.display.refresh_count)
+
+    def test_one_refresh_for_many_shapes(self):
+        circle = vectorio.Circle(radius=3)
+        animated_circle = self.driver.track(
+            vectorio.VectorShape(shape=circle, pixel_shader=displayio.Palette(2)), circle
+        )
+        self.animated.move(0, 0)
+        animated_circle.set_radius(9)
+        self.driver.frame()
+        self.assertEqual(9, circle.radius)
+        self.assertEqual(1, self.display.refresh_count)
+
+    def test_point_list_reused(self):
+        self.animated.set_point(0, 1, 1)
+        self.driver.frame()
+        points = self.polygon.points
+        self.animated.set_point(0, 2, 2)
+        self.driver.frame()
+        self.assertIs(points, self.polygon.points)
+
+    def test_only_changed_points_rebuilt(self):
+        self.animated.set_point(0, 1, 1)
+        self.driver.frame()
+        unchanged = self.polygon.points[1], self.polygon.points[2]
+        self.animated.set_point(0, 2, 2)
+        self.driver.frame()
+        self.assertEqual([(2, 2), (10, 0), (5, 8)], self.polygon.points)
+        self.assertIs(unchanged[0], self.polygon.points[1])
+        self.assertIs(unchanged[1], self.polygon.points[2])
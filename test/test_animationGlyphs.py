@@ -0,0 +1,42 @@
+from unittest import TestCase
+
+import compat.host
+compat.host.install()
+
+import displayio
+
+from animation.glyphs import VectorFont, VectorLabel
+
+
+class TestVectorLabel(TestCase):
+    def setUp(self):
+        self.font = VectorFont({
+            'V': [(0, 0), (10, 0), (18, 24), (26, 0), (36, 0), (22, 34), (10, 34)],
+            'I': [(0, 0), (10, 0), (10, 34), (0, 34)],
+        })
+        self.label = VectorLabel(self.font, displayio.Palette(2), max_length=8, text='VIV')
+
+    def test_repeated_glyphs_share_polygon(self):
+        group = self.label.group
+        self.assertIs(group[0].shape, group[2].shape)
+        self.assertIsNot(group[0].shape, group[1].shape)
+
+    def test_placement(self):
+        self.assertEqual([0, 38, 50], [shape.x for shape in self.label.group])
+
+    def test_update_touches_only_changed_glyphs(self):
+        before = list(self.label.group)
+        self.label.text = 'VVV'
+        after = list(self.label.group)
+        self.assertIs(before[0], after[0])
+        self.assertIsNot(before[1], after[1])
+        # The last V stays, moved right because the glyph before it got wider
+        self.assertIs(before[2], after[2])
+        self.assertEqual(76, after[2].x)
+
+    def test_length_changes(self):
+        self.label.text = 'V I'
+        self.assertEqual(3, len(self.label.group))
+        self.assertEqual(76, self.label.group[2].x)
+        self.label.text = 'V'
+        self.assertEqual(1, len(self.label.group))
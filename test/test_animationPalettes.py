@@ -0,0 +1,61 @@
+from unittest import TestCase
+
+import compat.host
+compat.host.install()
+
+from animation.palettes import PaletteCache
+
+
+class TestPaletteCache(TestCase):
+    def setUp(self):
+        self.cache = PaletteCache(capacity=2)
+
+    def test_same_color_shares_palette(self):
+        palette = self.cache.monochrome(0xff0000)
+        self.assertIs(palette, self.cache.monochrome(0xff0000))
+        self.assertEqual(0xff0000, palette[1])
+        self.assertTrue(palette.is_transparent(0))
+        self.assertEqual(1, len(self.cache))
+
+    def test_in_use_palettes_are_kept(self):
+        palettes = [self.cache.monochrome(color) for color in (1, 2, 3)]
+        self.assertEqual(3, len(self.cache))
+        self.assertIs(palettes[0], self.cache.monochrome(1))
+
+    def test_released_palettes_evicted_least_recent_first(self):
+        palettes = [self.cache.monochrome(color) for color in (1, 2, 3)]
+        self.cache.release(1)
+        self.assertEqual(2, len(self.cache))
+        self.cache.release(2)
+        self.cache.release(3)
+        self.assertEqual(2, len(self.cache))
+        self.cache.monochrome(4)
+        # 2 was released longest ago
+        self.assertEqual(2, len(self.cache))
+        self.assertIs(palettes[2], self.cache.monochrome(3))
+        self.assertIsNot(palettes[1], self.cache.monochrome(2))
+
+    def test_reuse_after_release(self):
+        palette = self.cache.monochrome(1)
+        self.cache.release(1)
+        self.assertIs(palette, self.cache.monochrome(1))
+
+    def test_release_without_use_raises(self):
+        with self.assertRaises(ValueError):
+            self.cache.release(1)
+        self.cache.monochrome(1)
+        self.cache.release(1)
+        with self.assertRaises(ValueError):
+            self.cache.release(1)
+
+    def test_extra_release_leaves_palette_in_use(self):
+        cache = PaletteCache(capacity=1)
+        palette = cache.monochrome(1)
+        cache.release(1)
+        with self.assertRaises(ValueError):
+            cache.release(1)
+        self.assertIs(palette, cache.monochrome(1))
+        cache.monochrome(2)
+        # 1 is on screen again, so it isn't evicted to make room
+        self.assertIs(palette, cache.monochrome(1))
+        self.assertEqual(2, len(cache))
@@ -0,0 +1,31 @@
+import math
+from unittest import TestCase
+
+from animation import tables
+
+
+class TestTables(TestCase):
+    def test_sine_close_to_math(self):
+        for step in range(0, tables.PHASE_PERIOD, tables.PHASE_PERIOD // tables.TABLE_SIZE):
+            radians = 2 * math.pi * step / tables.PHASE_PERIOD
+            self.assertAlmostEqual(math.sin(radians), tables.sin(step) / tables.ONE, places=3)
+            self.assertAlmostEqual(math.cos(radians), tables.cos(step) / tables.ONE, places=3)
+
+    def test_phase_wraps(self):
+        self.assertEqual(tables.sin(123), tables.sin(123 + tables.PHASE_PERIOD))
+
+    def test_easing_ends(self):
+        self.assertEqual(0, tables.lookup(tables.TRIANGLE, 0))
+        self.assertEqual(tables.ONE, tables.lookup(tables.TRIANGLE, tables.PHASE_PERIOD // 2))
+        self.assertEqual(0, tables.lookup(tables.EASE_IN_OUT, 0))
+        self.assertEqual(tables.ONE, tables.lookup(tables.EASE_IN_OUT, tables.PHASE_PERIOD - 1))
+
+    def test_scale(self):
+        self.assertEqual(30, tables.scale(60, tables.ONE // 2))
+        self.assertEqual(-60, tables.scale(60, -tables.ONE))
+
+    def test_clock_phase(self):
+        clock = tables.FrameClock()
+        clock.now_ms = 10500
+        self.assertEqual(tables.PHASE_PERIOD // 4, clock.phase(2000))
+        self.assertEqual(0, clock.phase(500))
@@ -29,3 +29,25 @@ class TestBudgetScheduler(TestCase):
         while not complete and time.monotonic() - start < 1:
             next(bs)
         self.assertTrue(complete)
+
+    def test_sleeps_keep_their_own_deadlines(self):
+        bs = BudgetEventLoop()
+        woke = []
+
+        async def late():
+            # Created first, awaited after another task made its own sleep
+            pending = bs.sleep(10)
+            await bs.sleep(0)
+            await pending
+            woke.append('late')
+
+        async def soon():
+            await bs.sleep(0.05)
+            woke.append('soon')
+        bs.create_task(late())
+        bs.create_task(soon())
+        start = time.monotonic()
+        while 'soon' not in woke and time.monotonic() - start < 1:
+            next(bs)
+        self.assertEqual(['soon'], woke)
+        self.assertGreater(next(bs), 5000000000)
@@ -0,0 +1,27 @@
+import gc
+import sys
+from unittest import TestCase, mock
+
+from compat import host
+
+
+class TestBytesPerCall(TestCase):
+    def test_counts_garbage_on_desktop(self):
+        def garbage():
+            bytearray(1000)
+        self.assertGreaterEqual(host.bytes_per_call(garbage, 10), 1000)
+
+    def test_board_uses_mem_alloc_with_gc_disabled(self):
+        heap = [0]
+        enabled = []
+
+        def allocate():
+            enabled.append(gc.isenabled())
+            heap[0] += 24
+        # No tracemalloc, like on a board
+        with mock.patch.dict(sys.modules, {'tracemalloc': None}), \
+                mock.patch.object(gc, 'mem_alloc', lambda: heap[0], create=True):
+            self.assertEqual(24, host.bytes_per_call(allocate, 250, batch=100))
+        self.assertEqual(250, len(enabled))
+        self.assertFalse(any(enabled))
+        self.assertTrue(gc.isenabled())
@@ -0,0 +1,52 @@
+import builtins
+import sys
+import types
+from unittest import TestCase, mock
+
+from instrumentation import config
+
+FLAGS = ('metrics_enabled', 'memory_logging_enabled', 'event_trace_enabled')
+
+
+class TestConfig(TestCase):
+    def setUp(self):
+        saved = {flag: getattr(builtins, flag) for flag in FLAGS if hasattr(builtins, flag)}
+
+        def restore():
+            for flag in FLAGS:
+                if flag in saved:
+                    setattr(builtins, flag, saved[flag])
+                elif hasattr(builtins, flag):
+                    delattr(builtins, flag)
+        self.addCleanup(restore)
+        # Pretend nothing is imported yet, except what each test puts here
+        patcher = mock.patch.dict(sys.modules)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        for name in ('instrumentation.metrics', 'instrumentation.loop_stats', 'instrumentation.memory_logging',
+                     'instrumentation.event_trace'):
+            sys.modules.pop(name, None)
+
+    def test_sets_builtins(self):
+        config.enable(metrics=True, memory_logging=True)
+        self.assertTrue(builtins.metrics_enabled)
+        self.assertTrue(builtins.memory_logging_enabled)
+        self.assertFalse(builtins.event_trace_enabled)
+        config.disable()
+        self.assertFalse(builtins.metrics_enabled)
+
+    def test_module_imported_with_flag_from_builtins(self):
+        # Imported while the flag was set in builtins, so the module doesn't define it
+        builtins.metrics_enabled = True
+        sys.modules['instrumentation.metrics'] = types.ModuleType('instrumentation.metrics')
+        config.enable(metrics=True)
+        with self.assertRaises(RuntimeError):
+            config.enable(metrics=False)
+
+    def test_module_imported_disabled(self):
+        module = types.ModuleType('instrumentation.memory_logging')
+        module.memory_logging_enabled = False
+        sys.modules['instrumentation.memory_logging'] = module
+        config.enable(memory_logging=False)
+        with self.assertRaises(RuntimeError):
+            config.enable(memory_logging=True)
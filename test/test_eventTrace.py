@@ -0,0 +1,94 @@
+import io
+from contextlib import redirect_stdout
+from unittest import TestCase, mock
+
+import compat.host
+compat.host.install()
+
+from adafruit_debouncer import Debouncer
+from rotaryio import IncrementalEncoder
+
+from cpy_rotary import rotarybutton
+from cpy_rotary.rotarybutton import RotaryButton
+from instrumentation import event_trace
+from test.support import enabled_copy, run
+
+
+def _enabled_event_trace():
+    return enabled_copy('instrumentation.event_trace', 'event_trace_enabled')
+
+
+class TestEventTrace(TestCase):
+    def setUp(self):
+        self.tracing = _enabled_event_trace()
+
+    def events(self, trace):
+        return [(event, value) for _, event, value in trace.records()]
+
+    def test_records_in_order(self):
+        trace = self.tracing.EventTrace(capacity=4)
+        trace.record(1, 10)
+        trace.record(2)
+        trace.record(3, -5)
+        self.assertEqual([(1, 10), (2, 0), (3, -5)], self.events(trace))
+        self.assertEqual(3, len(trace))
+        timestamps = [timestamp for timestamp, _, _ in trace.records()]
+        self.assertEqual(sorted(timestamps), timestamps)
+
+    def test_ring_wraps(self):
+        trace = self.tracing.EventTrace(capacity=3)
+        for event in range(1, 6):
+            trace.record(event, event * 10)
+        # Only the last capacity records, oldest first
+        self.assertEqual([(3, 30), (4, 40), (5, 50)], self.events(trace))
+        self.assertEqual(3, len(trace))
+
+    def test_dump_clears(self):
+        trace = self.tracing.EventTrace()
+        trace.record(RotaryButton.TRACE_CLICK, 120)
+        output = io.StringIO()
+        with redirect_stdout(output):
+            trace.dump(RotaryButton.TRACE_EVENT_NAMES)
+        self.assertIn('click', output.getvalue())
+        self.assertIn('120', output.getvalue())
+        self.assertEqual(0, len(trace))
+
+    def test_disabled_records_nothing(self):
+        # The copy everything else imported, with event_trace_enabled unset
+        self.assertFalse(event_trace.event_trace_enabled)
+        trace = event_trace.EventTrace()
+        trace.record(1, 2)
+        self.assertEqual(0, len(trace))
+        self.assertEqual([], list(trace.records()))
+
+
+class TestRotaryButtonTrace(TestCase):
+    def setUp(self):
+        self.rotary = IncrementalEncoder()
+        self.button = Debouncer()
+
+    def make(self, trace):
+        return RotaryButton(self.rotary, self.button, trace=trace)
+
+    def test_records_increments_and_clicks(self):
+        trace = _enabled_event_trace().EventTrace()
+        with mock.patch.object(rotarybutton, 'event_trace_enabled', True):
+            button = self.make(trace)
+        run(button.loop())
+        self.rotary.turn(2)
+        run(button.loop())
+        self.button.press()
+        run(button.loop())
+        self.button.release()
+        run(button.loop())
+        events = [event for _, event, _ in trace.records()]
+        self.assertEqual([RotaryButton.TRACE_INCREMENT, RotaryButton.TRACE_PRESS, RotaryButton.TRACE_CLICK], events)
+        self.assertEqual(-2, next(trace.records())[2])
+
+    def test_nothing_recorded_when_disabled(self):
+        trace = _enabled_event_trace().EventTrace()
+        # RotaryButton ignores the trace when its module was imported with tracing off
+        button = self.make(trace)
+        self.rotary.turn(2)
+        run(button.loop())
+        self.assertEqual(0, len(trace))
@@ -0,0 +1,89 @@
+from unittest import TestCase
+
+import compat.host
+compat.host.install()
+
+from cpy_rotary.edge_queue import EdgeQueue
+from cpy_rotary.gestures import Gestures, IDLE
+
+
+class TestGestures(TestCase):
+    def setUp(self):
+        self.events = []
+        self.queue = EdgeQueue()
+        self.gestures = Gestures(
+            self.queue,
+            on_increment=[lambda amount: self.events.append(('increment', amount))],
+            on_click=[lambda: self.events.append('click')],
+            on_double_click=[lambda: self.events.append('double')],
+            on_triple_click=[lambda: self.events.append('triple')],
+            click_window=0.2,
+            hold_duration=0.5,
+            repeat_hz=10,
+            on_hold_repeat=[lambda repeat: self.events.append(('repeat', repeat))],
+            on_hold_release=[lambda: self.events.append('hold_release')],
+            on_press_rotate=[lambda amount: self.events.append(('press_rotate', amount))],
+        )
+
+    def click(self, at):
+        self.queue.push_press(timestamp=at)
+        self.queue.push_release(timestamp=at + 50)
+
+    def test_click_waits_for_window(self):
+        self.click(1000)
+        self.gestures.tick(1100)
+        self.assertEqual([], self.events)
+        self.gestures.tick(1250)
+        self.assertEqual(['click'], self.events)
+        self.assertEqual(IDLE, self.gestures.state)
+
+    def test_double_and_triple_click(self):
+        self.click(1000)
+        self.click(1100)
+        self.gestures.tick(2000)
+        self.click(3000)
+        self.click(3100)
+        self.click(3200)
+        self.gestures.tick(4000)
+        self.assertEqual(['double', 'triple'], self.events)
+
+    def test_late_tick_sees_separate_clicks(self):
+        # Both clicks are drained in one late tick, but the window closed between them
+        self.click(1000)
+        self.click(1500)
+        self.gestures.tick(2000)
+        self.assertEqual(['click', 'click'], self.events)
+
+    def test_hold_repeats(self):
+        self.queue.push_press(timestamp=1000)
+        self.gestures.tick(1499)
+        self.assertEqual([], self.events)
+        for now in range(1500, 1760, 10):
+            self.gestures.tick(now)
+        self.queue.push_release(timestamp=1760)
+        self.gestures.tick(1760)
+        self.assertEqual([('repeat', 0), ('repeat', 1), ('repeat', 2), 'hold_release'], self.events)
+
+    def test_stalled_hold_does_not_burst(self):
+        self.queue.push_press(timestamp=1000)
+        self.gestures.tick(1500)
+        self.gestures.tick(3000)
+        self.gestures.tick(3050)
+        self.assertEqual([('repeat', 0), ('repeat', 1)], self.events)
+
+    def test_press_and_rotate(self):
+        self.queue.push_press(timestamp=1000)
+        self.queue.push_rotation(2, timestamp=1100)
+        self.gestures.tick(1100)
+        self.queue.push_rotation(-1, timestamp=1700)
+        self.queue.push_release(timestamp=1800)
+        self.gestures.tick(2500)
+        self.queue.push_rotation(3, timestamp=2600)
+        self.gestures.tick(2600)
+        self.assertEqual([('press_rotate', 2), ('press_rotate', -1), ('increment', 3)], self.events)
+
+    def test_rotation_ends_click_window(self):
+        self.click(1000)
+        self.queue.push_rotation(1, timestamp=1100)
+        self.gestures.tick(1100)
+        self.assertEqual(['click', ('increment', 1)], self.events)
@@ -0,0 +1,129 @@
+import time
+from unittest import TestCase, mock
+
+import compat.host
+compat.host.install()
+
+from keypad import Keys
+from rotaryio import IncrementalEncoder
+
+from functional.ticks import ticks_ms
+from cpy_rotary import input_manager
+from cpy_rotary.input_manager import InputManager
+
+
+class TestInputManager(TestCase):
+    def setUp(self):
+        self.encoders = [IncrementalEncoder() for _ in range(4)]
+        self.keys = Keys(pins=(None,) * 4)
+        self.events = []
+        self.manager = InputManager(
+            self.encoders, self.keys,
+            on_increment=[lambda device, amount: self.events.append(('increment', device, amount))],
+            on_click=[lambda device: self.events.append(('click', device))],
+            longhold_duration=0.05,
+            on_longhold_hold=[lambda device: self.events.append(('hold', device))],
+            on_longhold_release=[lambda device: self.events.append(('release', device))],
+        )
+
+    def test_idle(self):
+        self.manager.tick()
+        self.assertEqual([], self.events)
+
+    def test_increments_per_device(self):
+        self.encoders[1].turn(2)
+        self.encoders[3].turn(-1)
+        self.manager.tick()
+        self.manager.tick()
+        self.assertEqual([('increment', 1, -2), ('increment', 3, 1)], self.events)
+
+    def test_clicks_and_holds(self):
+        now = ticks_ms()
+        self.keys.press(0, now)
+        self.keys.press(2, now)
+        self.keys.release(0, now + 10)
+        self.manager.tick()
+        self.assertEqual([('click', 0)], self.events)
+        time.sleep(0.06)
+        self.manager.tick()
+        self.assertEqual([('click', 0), ('hold', 2)], self.events)
+        self.keys.release(2)
+        self.manager.tick()
+        self.assertEqual([('click', 0), ('hold', 2), ('release', 2)], self.events)
+
+    def test_longhold_released_between_ticks(self):
+        now = ticks_ms()
+        self.keys.press(1, now)
+        self.keys.release(1, now + 100)
+        self.manager.tick()
+        self.assertEqual([('hold', 1), ('release', 1)], self.events)
+
+
+class _CountingEncoder(IncrementalEncoder):
+    """Counts how often its position is read"""
+    def __init__(self):
+        self.reads = 0
+        self._position = 0
+        super().__init__()
+
+    @property
+    def position(self):
+        self.reads += 1
+        return self._position
+
+    @position.setter
+    def position(self, value):
+        self._position = value
+
+
+class TestInputManagerPolling(TestCase):
+    def setUp(self):
+        self.now = 1000
+        patcher = mock.patch.object(input_manager, 'ticks_ms', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.encoders = [_CountingEncoder() for _ in range(16)]
+        self.events = []
+        self.manager = InputManager(
+            self.encoders,
+            on_increment=[lambda device, amount: self.events.append((device, amount))],
+            idle_polls_per_tick=2,
+        )
+
+    def reads(self):
+        reads = sum(encoder.reads for encoder in self.encoders)
+        for encoder in self.encoders:
+            encoder.reads = 0
+        return reads
+
+    def test_idle_ticks_poll_a_few_encoders(self):
+        self.reads()
+        for _ in range(10):
+            self.manager.tick()
+        self.assertEqual(20, self.reads())
+
+    def test_turning_encoder_polled_every_tick_until_it_stops(self):
+        self.encoders[5].turn(1)
+        for _ in range(8):
+            self.manager.tick()
+        # The round robin reached it on the third tick
+        self.assertEqual([(5, -1)], self.events)
+        self.encoders[5].turn(1)
+        self.reads()
+        self.manager.tick()
+        self.assertEqual([(5, -1), (5, -1)], self.events)
+        # The active one and two idle ones
+        self.assertEqual(3, self.reads())
+        self.now += InputManager.ACTIVE_MS
+        self.manager.tick()
+        self.assertEqual(3, self.reads())
+        # Idle again
+        self.manager.tick()
+        self.assertEqual(2, self.reads())
+
+    def test_no_detents_lost_while_idle(self):
+        self.encoders[15].turn(3)
+        self.encoders[15].turn(2)
+        for _ in range(8):
+            self.manager.tick()
+        self.assertEqual([(15, -5)], self.events)
@@ -0,0 +1,69 @@
+import time
+from unittest import TestCase, mock
+
+# Imported with metrics disabled first, so the enabled copy of loop_stats below doesn't enable it for other tests
+import instrumentation.metrics
+from functional import rate_limited as rate_limited_module, scheduler as scheduler_module
+from functional.rate_limited import rate_limited
+from functional.scheduler import Scheduler
+from instrumentation import loop_stats
+from test.support import MS, enabled_copy, patch_clock
+
+
+class TestLoopStats(TestCase):
+    def setUp(self):
+        self.clock = patch_clock(self)
+        self.measured = []
+        # Measuring into a list instead of the metrics tables
+        self.stats = enabled_copy('instrumentation.loop_stats', 'metrics_enabled')
+        self.stats.measure = lambda name, value: self.measured.append((name, value))
+        patcher = mock.patch.object(time, 'sleep', self.clock_sleep)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def clock_sleep(self, seconds):
+        self.clock.advance(seconds * 1000)
+
+    def values(self, name):
+        return [round(value, 3) for measured_name, value in self.measured if measured_name == name]
+
+    def test_busy_and_idle(self):
+        for _ in range(4):
+            self.clock.advance(100)
+            self.stats.sleep(0.15)
+            self.stats.tick()
+        self.assertEqual([100] * 4, self.values('loop busy ms'))
+        self.assertEqual([40.0], self.values('loop utilization %'))
+        self.assertEqual([4.0], self.values('loop iterations/s'))
+
+    def test_lateness_name(self):
+        def render():
+            pass
+        self.assertEqual('late render ms', self.stats.lateness_name(render))
+        self.stats.lateness('late render ms', 3 * MS)
+        self.assertEqual([3], self.values('late render ms'))
+
+    def test_jobs_measured_under_their_names(self):
+        self.assertEqual('late frame ms', self.stats.lateness_name(lambda: None, 'frame'))
+        with mock.patch.object(scheduler_module, 'loop_stats', self.stats), \
+                mock.patch.object(rate_limited_module, 'loop_stats', self.stats):
+            scheduler = Scheduler()
+            scheduler.add(lambda: None, hz=10, phase=0, name='frame')
+            scheduler.add(lambda: None, hz=10, phase=0, name='wobble')
+            limited = rate_limited(hz=10, phase=0, name='render')(lambda: None)
+            for _ in range(2):
+                self.clock.advance(150)
+                scheduler.tick()
+                limited()
+        # Lambdas all share one __name__, so without names these would be one measurement
+        self.assertEqual({'late frame ms', 'late wobble ms', 'late render ms'}, {name for name, _ in self.measured})
+
+
+class TestLoopStatsDisabled(TestCase):
+    def test_stubs(self):
+        if loop_stats.metrics_enabled:
+            self.skipTest('metrics are enabled')
+        loop_stats.tick()
+        loop_stats.idle(5)
+        loop_stats.lateness('late x ms', 1)
+        self.assertIsNone(loop_stats.lateness_name(self.test_stubs))
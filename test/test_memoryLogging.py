@@ -0,0 +1,172 @@
+import gc
+import io
+from contextlib import redirect_stdout
+from unittest import TestCase, mock
+
+from test.support import enabled_copy
+
+
+class _Heap:
+    """gc.mem_alloc()/gc.mem_free() for a pretend heap the tests allocate from by hand."""
+    def __init__(self, size=100000):
+        self.size = size
+        self.allocated = 0
+
+    def mem_alloc(self):
+        return self.allocated
+
+    def mem_free(self):
+        return self.size - self.allocated
+
+
+class MemoryLoggingTestCase(TestCase):
+    def setUp(self):
+        self.heap = _Heap()
+        for name in ('mem_alloc', 'mem_free'):
+            patcher = mock.patch.object(gc, name, getattr(self.heap, name), create=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.logging = enabled_copy('instrumentation.memory_logging', 'memory_logging_enabled')
+
+    def allocate(self, size):
+        self.heap.allocated += size
+
+    def report(self):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.logging.log_allocations(target_seconds=0)
+        return output.getvalue()
+
+    def fragment(self, largest):
+        """Make bytearrays bigger than largest fail, and the ones that fit stay allocated until collected."""
+        def bytearray(size):
+            if size > largest:
+                raise MemoryError()
+            self.allocate(size)
+        self.logging.bytearray = bytearray
+
+    def rows(self, report):
+        """{name with its tree prefix: [avg, min, max, count, sum, collected, high, block]}"""
+        lines = report.splitlines()
+        header = next(index for index, line in enumerate(lines) if line.startswith('Stack'))
+        rows = {}
+        for line in lines[header + 1:]:
+            if line.startswith('Allocation report'):
+                break
+            cells = [cell.strip() for cell in line.split(' | ')]
+            rows[cells[0]] = cells[1:]
+        return rows
+
+
+class TestAllocTracker(MemoryLoggingTestCase):
+    def test_nested_scopes(self):
+        logging = self.logging
+
+        @logging.track_alloc('inner')
+        def inner():
+            self.allocate(10)
+
+        @logging.track_alloc('outer')
+        def outer():
+            self.allocate(100)
+            inner()
+            inner()
+
+        outer()
+        outer()
+        inner()
+        rows = self.rows(self.report())
+        self.assertEqual(['120.0', '120', '120', '2', '240', '0'], rows['outer'][:6])
+        self.assertEqual(['10.0', '10', '10', '4', '40', '0'], rows['|-inner'][:6])
+        self.assertEqual(['10.0', '10', '10', '1', '10', '0'], rows['inner'][:6])
+
+    def test_collection_inside_scope(self):
+        logging = self.logging
+
+        @logging.track_alloc('collects')
+        def collects(freed):
+            self.allocate(50)
+            self.allocate(-freed)
+
+        # Freed less than allocated: under-reported, not detected
+        collects(20)
+        # Freed more: counted as collected
+        collects(80)
+        rows = self.rows(self.report())
+        self.assertEqual(['30.0', '30', '30', '1', '30', '1'], rows['collects'][:6])
+
+    def test_report_starts_over(self):
+        logging = self.logging
+
+        @logging.track_alloc('once')
+        def once():
+            self.allocate(5)
+
+        once()
+        self.report()
+        self.assertIn('no allocations tracked', self.report())
+
+    def test_exception_closes_scope(self):
+        logging = self.logging
+
+        @logging.track_alloc('fails')
+        def fails():
+            self.allocate(7)
+            raise ValueError()
+
+        with self.assertRaises(ValueError):
+            fails()
+        self.assertEqual(0, logging._depth)
+        self.assertEqual('7', self.rows(self.report())['fails'][4])
+
+    def test_disabled_is_untouched(self):
+        from instrumentation import memory_logging
+
+        def function():
+            pass
+        self.assertIs(function, memory_logging.track_alloc('function')(function))
+
+
+class TestProbes(MemoryLoggingTestCase):
+    def test_largest_free_block(self):
+        self.fragment(30000)
+        largest = self.logging.largest_free_block()
+        # Within mem_free() / 2**12
+        self.assertTrue(30000 - 25 <= largest <= 30000, largest)
+        self.assertIn('Largest free block: lowest {:d}'.format(largest), self.report())
+
+    def test_probe_not_charged_to_enclosing_scopes(self):
+        logging = self.logging
+        self.fragment(30000)
+
+        @logging.track_alloc('probed', probe=True)
+        def probed():
+            self.allocate(10)
+
+        @logging.track_alloc('outer')
+        def outer():
+            self.allocate(100)
+            probed()
+            self.allocate(1)
+
+        outer()
+        rows = self.rows(self.report())
+        self.assertEqual('111', rows['outer'][4])
+        self.assertEqual('10', rows['|-probed'][4])
+        block = int(rows['|-probed'][7])
+        self.assertTrue(30000 - 25 <= block <= 30000, block)
+        self.assertEqual('', rows['outer'][7])
+
+    def test_high_water(self):
+        logging = self.logging
+
+        @logging.track_alloc('grows')
+        def grows(size):
+            self.allocate(size)
+
+        grows(100)
+        grows(50)
+        self.allocate(-1000)
+        grows(20)
+        rows = self.rows(self.report())
+        self.assertEqual('150', rows['grows'][6])
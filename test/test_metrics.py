@@ -0,0 +1,353 @@
+from unittest import TestCase, mock
+
+from test.support import enabled_copy, patch_clock, run, suspend
+
+
+class MetricsTestCase(TestCase):
+    def setUp(self):
+        self.clock = patch_clock(self)
+        self.metrics = enabled_copy('instrumentation.metrics', 'metrics_enabled')
+        self.reports = []
+        self.metrics.set_exporter(self.export)
+
+    def export(self, elapsed_ms, root, measurements):
+        # Copy what the exporter would have written: (count, sum) by path
+        report = {}
+        self._copy(root, (), report)
+        for name, stats in measurements.items():
+            report[name] = (stats.count, stats.sum)
+        self.reports.append(report)
+
+    def _copy(self, node, path, report):
+        for name, child in node.children.items():
+            if child.count:
+                report[path + (name,)] = (child.count, child.sum)
+            self._copy(child, path + (name,), report)
+
+
+class TestTimer(MetricsTestCase):
+    def test_nested_calls(self):
+        metrics = self.metrics
+
+        @metrics.timer('inner')
+        def inner():
+            self.clock.advance(1)
+
+        @metrics.timer('outer')
+        def outer():
+            self.clock.advance(2)
+            inner()
+            inner()
+
+        for _ in range(3):
+            outer()
+        inner()
+        self.clock.advance(10000)
+        metrics.log_metrics()
+
+        self.assertEqual({
+            ('outer',): (3, 12),
+            ('outer', 'inner'): (6, 6),
+            ('inner',): (1, 1),
+        }, self.reports[0])
+
+    def test_recursive_calls(self):
+        metrics = self.metrics
+
+        @metrics.timer('countdown')
+        def countdown(depth):
+            self.clock.advance(1)
+            if depth > 0:
+                countdown(depth - 1)
+
+        countdown(2)
+        countdown(1)
+        self.clock.advance(10000)
+        metrics.log_metrics()
+
+        self.assertEqual({
+            ('countdown',): (2, 5),
+            ('countdown', 'countdown'): (2, 3),
+            ('countdown', 'countdown', 'countdown'): (1, 1),
+        }, self.reports[0])
+
+    def test_reused_timer_after_report(self):
+        metrics = self.metrics
+        context = metrics.Timer('block')
+        for report in range(2):
+            with context:
+                self.clock.advance(3)
+            self.clock.advance(10000)
+            metrics.log_metrics()
+        self.assertEqual([{('block',): (1, 3)}, {('block',): (1, 3)}], self.reports)
+
+    def test_exception_pops_timer(self):
+        metrics = self.metrics
+
+        @metrics.timer('fails')
+        def fails():
+            raise ValueError()
+
+        with self.assertRaises(ValueError):
+            fails()
+        with metrics.Timer('after'):
+            pass
+        self.clock.advance(10000)
+        metrics.log_metrics()
+        self.assertEqual({('fails',): (1, 0), ('after',): (1, 0)}, self.reports[0])
+
+
+class TestPercentiles(MetricsTestCase):
+    def stats(self, values):
+        for value in values:
+            self.metrics.measure('values', value)
+        return self.metrics.measurements['values']
+
+    def test_within_a_bucket_of_exact(self):
+        stats = self.stats(range(1, 1001))
+        for fraction, exact in ((0.5, 500), (0.9, 900), (0.99, 990)):
+            self.assertAlmostEqual(exact, stats.percentile(fraction), delta=exact * 0.1)
+
+    def test_small_and_large(self):
+        stats = self.stats([0.05] * 90 + [5000] * 10)
+        self.assertAlmostEqual(0.05, stats.percentile(0.5), delta=0.005)
+        self.assertAlmostEqual(5000, stats.percentile(0.99), delta=450)
+
+    def test_constant_is_exact(self):
+        stats = self.stats([3.0] * 10)
+        self.assertEqual(3.0, stats.percentile(0.5))
+        self.assertEqual(3.0, stats.percentile(0.99))
+
+    def test_zero_and_negative(self):
+        self.assertEqual(0, self.stats([0, 0, 0]).percentile(0.5))
+        self.metrics.measurements.clear()
+        stats = self.stats([5, -3])
+        self.assertEqual(-1.5, stats.percentile(0.5))
+        self.assertAlmostEqual(5, stats.percentile(0.99), delta=0.5)
+        self.metrics.measurements.clear()
+        stats = self.stats([-2] * 3 + [1] * 7)
+        self.assertEqual(-1, stats.percentile(0.2))
+        self.assertAlmostEqual(1, stats.percentile(0.5), delta=0.1)
+
+    def test_weighted(self):
+        stats = self.metrics._StatisticSet()
+        stats.observe(1, weight=9)
+        stats.observe(100, weight=1)
+        self.assertEqual(10, stats.count)
+        self.assertAlmostEqual(1, stats.percentile(0.5), delta=0.1)
+        self.assertAlmostEqual(100, stats.percentile(0.99), delta=9)
+
+    def test_busy_timer_keeps_its_tail(self):
+        # More than a uint16 bucket holds, like a 1kHz loop over a minute
+        stats = self.metrics._StatisticSet()
+        stats.observe(1.0, weight=200000)
+        for _ in range(1000):
+            stats.observe(100.0)
+        self.assertEqual(200000, max(stats.buckets))
+        # 0.5% at 100: p99 is still about 1, p99.9 is 100
+        self.assertAlmostEqual(1, stats.percentile(0.99), delta=0.1)
+        self.assertAlmostEqual(100, stats.percentile(0.999), delta=9)
+
+    def test_reset(self):
+        stats = self.stats([1, 2, 3])
+        stats.reset()
+        self.assertEqual(0, stats.percentile(0.5))
+        self.assertEqual(0, sum(stats.buckets))
+
+
+class TestMetricsReporter(MetricsTestCase):
+    def report(self, reporter):
+        self.clock.advance(10000)
+        next(reporter)
+
+    def test_timer_open_across_report(self):
+        metrics = self.metrics
+        reporter = metrics.metrics_reporter(target_seconds=10)
+
+        @metrics.timer('work')
+        def work():
+            self.clock.advance(2)
+
+        @metrics.timer('loop')
+        def loop():
+            work()
+            self.report(reporter)
+
+        for _ in range(3):
+            loop()
+        self.report(reporter)
+
+        self.assertEqual({('loop', 'work'): (1, 2)}, self.reports[0])
+        # loop was open at each swap, so it lands in the report after
+        for report in self.reports[1:3]:
+            self.assertEqual({('loop',): (1, 10002), ('loop', 'work'): (1, 2)}, report)
+        self.assertEqual({('loop',): (1, 10002)}, self.reports[3])
+
+    def test_suspended_coroutine_spans_reports(self):
+        metrics = self.metrics
+        reporter = metrics.metrics_reporter(target_seconds=10)
+
+        @metrics.timer('work')
+        def work():
+            self.clock.advance(2)
+
+        @metrics.atimer('main')
+        async def main():
+            for _ in range(3):
+                work()
+                self.report(reporter)
+                await suspend()
+
+        run(main())
+        self.report(reporter)
+
+        self.assertEqual(4, len(self.reports))
+        for report in self.reports[:3]:
+            self.assertEqual({('main', 'work'): (1, 2)}, report)
+        self.assertEqual({('main',): (1, 30006)}, self.reports[3])
+
+    def test_measurements_swap(self):
+        metrics = self.metrics
+        reporter = metrics.metrics_reporter(target_seconds=10)
+        for value in range(3):
+            metrics.measure('value', value)
+            self.report(reporter)
+        self.assertEqual([{'value': (1, value)} for value in range(3)], self.reports)
+
+
+class TestSampling(MetricsTestCase):
+    def test_sample_rate(self):
+        metrics = self.metrics
+        calls = 0
+
+        @metrics.timer('hot', sample_rate=4)
+        def hot():
+            nonlocal calls
+            calls += 1
+            self.clock.advance(1)
+
+        for _ in range(12):
+            hot()
+        self.clock.advance(10000)
+        metrics.log_metrics()
+        self.assertEqual(12, calls)
+        # The first call, then one in 4 standing for the 4 before it; the last 3 wait for the next sample
+        self.assertEqual({('hot',): (9, 9)}, self.reports[0])
+
+    def test_sample_ms_follows_call_rate(self):
+        metrics = self.metrics
+        weights = []
+        observe = metrics._TimerNode.observe
+
+        def recording_observe(node, value, weight=1):
+            weights.append(weight)
+            observe(node, value, weight)
+
+        @metrics.timer('hot', sample_ms=10)
+        def hot():
+            self.clock.advance(1)
+
+        with mock.patch.object(metrics._TimerNode, 'observe', recording_observe):
+            for _ in range(200):
+                hot()
+        # About one sample per 10ms of 1ms calls, each standing for the calls since the last
+        self.assertLess(len(weights), 30)
+        self.assertEqual(10, weights[-1])
+        self.assertEqual(sum(weights), metrics.timer_stack[0].children['hot'].count)
+        self.assertGreater(sum(weights), 190)
+
+    def test_untimed_calls_charge_children_to_caller(self):
+        metrics = self.metrics
+
+        @metrics.timer('leaf')
+        def leaf():
+            pass
+
+        @metrics.timer('hot', sample_rate=2)
+        def hot():
+            leaf()
+
+        for _ in range(3):
+            hot()
+        self.clock.advance(10000)
+        metrics.log_metrics()
+        self.assertEqual({('hot',): (3, 0), ('hot', 'leaf'): (2, 0), ('leaf',): (1, 0)}, self.reports[0])
+
+    def test_sampled_atimer(self):
+        metrics = self.metrics
+
+        @metrics.atimer('task', sample_rate=3)
+        async def task():
+            self.clock.advance(1)
+            await suspend()
+
+        for _ in range(7):
+            run(task())
+        self.clock.advance(10000)
+        metrics.log_metrics()
+        self.assertEqual({('task',): (7, 7)}, self.reports[0])
+
+
+class TestAtimer(MetricsTestCase):
+    def test_running_and_suspended_time(self):
+        metrics = self.metrics
+
+        @metrics.atimer('task')
+        async def task():
+            self.clock.advance(2)
+            await suspend()
+            self.clock.advance(3)
+            return 'done'
+
+        coroutine = task()
+        coroutine.send(None)
+        # Suspended: not charged as running time
+        self.clock.advance(100)
+        self.assertEqual('done', run(coroutine))
+        node = metrics.timer_stack[0].children['task']
+        self.assertEqual((1, 5, 100), (node.count, node.sum, node.suspended))
+
+    def test_interleaved_coroutines_keep_their_parents(self):
+        metrics = self.metrics
+
+        @metrics.timer('leaf')
+        def leaf():
+            self.clock.advance(1)
+
+        @metrics.atimer('a')
+        async def a():
+            leaf()
+            await suspend()
+            leaf()
+
+        @metrics.atimer('b')
+        async def b():
+            await suspend()
+            leaf()
+
+        first = a()
+        second = b()
+        first.send(None)
+        second.send(None)
+        run(first)
+        run(second)
+        self.assertEqual(0, metrics._depth)
+        self.clock.advance(10000)
+        metrics.log_metrics()
+        self.assertEqual({
+            ('a',): (1, 2), ('a', 'leaf'): (2, 2),
+            ('b',): (1, 1), ('b', 'leaf'): (1, 1),
+        }, self.reports[0])
+
+    def test_exception_is_recorded_and_raised(self):
+        metrics = self.metrics
+
+        @metrics.atimer('fails')
+        async def fails():
+            await suspend()
+            raise ValueError()
+
+        with self.assertRaises(ValueError):
+            run(fails())
+        self.assertEqual(0, metrics._depth)
+        self.assertEqual(1, metrics.timer_stack[0].children['fails'].count)
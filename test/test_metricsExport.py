@@ -0,0 +1,119 @@
+import io
+from array import array
+from contextlib import redirect_stdout
+from unittest import TestCase
+
+from instrumentation.metrics_decode import read_snapshots
+from instrumentation.metrics_export import BinaryExporter, HISTOGRAM_LENGTH, print_report
+
+
+class _Stats:
+    def __init__(self, count, total, minimum, maximum, bucket=0):
+        self.count = count
+        self.sum = total
+        self.min = minimum
+        self.max = maximum
+        self.buckets = array('I', [0] * HISTOGRAM_LENGTH)
+        self.buckets[bucket] = count
+        self.children = {}
+        self.suspended = 0.0
+
+    def percentile(self, fraction):
+        return self.max
+
+
+class TestBinaryExporter(TestCase):
+    def test_round_trip(self):
+        root = _Stats(0, 0, 0, 0)
+        loop = _Stats(10, 20.0, 1.0, 4.0, bucket=30)
+        loop.children['render'] = _Stats(5, 7.5, 1.0, 2.0, bucket=28)
+        root.children['loop'] = loop
+        root.children['rotary'] = _Stats(3, 0.75, 0.25, 0.25, bucket=20)
+        root.children['rotary'].suspended = 1.5
+        measurements = {'free_memory': _Stats(2, 30.0, 14.0, 16.0, bucket=60)}
+
+        stream = io.BytesIO()
+        exporter = BinaryExporter(stream)
+        for _ in exporter(1000.0, root, measurements):
+            pass
+        for _ in exporter(2000.0, root, {}):
+            pass
+        stream.seek(0)
+        snapshots = list(read_snapshots(stream))
+
+        self.assertEqual(2, len(snapshots))
+        elapsed_ms, decoded_root, decoded_measurements = snapshots[0]
+        self.assertEqual(1000.0, elapsed_ms)
+        self.assertEqual(['loop', 'rotary'], list(decoded_root.children))
+        decoded_loop = decoded_root.children['loop']
+        self.assertEqual((10, 20.0, 1.0, 4.0), (decoded_loop.count, decoded_loop.sum, decoded_loop.min, decoded_loop.max))
+        self.assertEqual(5, decoded_loop.children['render'].count)
+        self.assertEqual({}, decoded_root.children['rotary'].children)
+        self.assertEqual(1.5, decoded_root.children['rotary'].suspended)
+        self.assertEqual(2, decoded_measurements['free_memory'].count)
+        # Percentiles come back out of the histogram, within the bucket around 2**(30/4 - 7)
+        self.assertAlmostEqual(2 ** (30.5 / 4 - 7), decoded_loop.percentile(0.5))
+        self.assertEqual(2000.0, snapshots[1][0])
+        self.assertEqual({}, snapshots[1][2])
+
+    def test_skips_idle_subtrees(self):
+        root = _Stats(0, 0, 0, 0)
+        for index in range(20):
+            root.children['timer{}'.format(index)] = _Stats(0, 0, 0, 0)
+        root.children['timer3'] = _Stats(1, 1.0, 1.0, 1.0)
+        # Open across the last report: written so its child has a parent
+        root.children['timer5'].children['child'] = _Stats(2, 2.0, 1.0, 1.0)
+        stream = io.BytesIO()
+        for _ in BinaryExporter(stream)(10.0, root, {}):
+            pass
+        stream.seek(0)
+        (_, decoded_root, _), = read_snapshots(stream)
+        self.assertEqual(['timer3', 'timer5'], list(decoded_root.children))
+        self.assertEqual(2, decoded_root.children['timer5'].children['child'].count)
+        self.assertEqual(0, decoded_root.children['timer5'].count)
+
+    def test_without_histograms(self):
+        root = _Stats(0, 0, 0, 0)
+        root.children['loop'] = _Stats(4, 8.0, 1.0, 3.0)
+        stream = io.BytesIO()
+        for _ in BinaryExporter(stream, histograms=False)(10.0, root, {}):
+            pass
+        stream.seek(0)
+        (_, decoded_root, _), = read_snapshots(stream)
+        self.assertEqual(2.0, decoded_root.children['loop'].percentile(0.99))
+
+
+class TestPrintReport(TestCase):
+    def report(self, root):
+        output = io.StringIO()
+        steps = 0
+        with redirect_stdout(output):
+            for _ in print_report(1000.0, root, {}):
+                steps += 1
+        return output.getvalue(), steps
+
+    def test_order_and_empty_subtrees(self):
+        root = _Stats(0, 0, 0, 0)
+        slow = _Stats(0, 0, 0, 0)
+        slow.children['unused'] = _Stats(0, 0, 0, 0)
+        slow.children['busy'] = _Stats(2, 4.0, 1.0, 3.0)
+        root.children['slow'] = slow
+        root.children['fast'] = _Stats(1, 1.0, 1.0, 1.0)
+        root.children['idle'] = _Stats(0, 0, 0, 0)
+        root.children['idle'].children['never'] = _Stats(0, 0, 0, 0)
+
+        output, _ = self.report(root)
+        names = [line.split(' | ')[0].strip(' |-') for line in output.splitlines() if line.endswith('%')]
+        # An open timer with nothing recorded still heads the children that have something
+        self.assertEqual(['Stack', 'fast', 'slow', 'busy'], names)
+
+    def test_steps_per_timer(self):
+        root = _Stats(0, 0, 0, 0)
+        node = root
+        for depth in range(50):
+            child = _Stats(1, 1.0, 1.0, 1.0)
+            node.children['level{}'.format(depth)] = child
+            node = child
+        _, steps = self.report(root)
+        # Sizing and printing each take a step per timer
+        self.assertGreaterEqual(steps, 100)
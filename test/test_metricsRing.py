@@ -0,0 +1,99 @@
+import gc
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from instrumentation.metrics_ring import MetricsRing, FileStorage
+
+
+class _Stats:
+    def __init__(self, count, total):
+        self.count = count
+        self.sum = total
+        self.children = {}
+
+
+class TestMetricsRing(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'nvm.bin')
+        self.root = _Stats(0, 0)
+        loop = _Stats(10, 20.0)
+        loop.children['render'] = _Stats(5, 7.5)
+        self.root.children['loop'] = loop
+        self.root.children['rotary'] = _Stats(3, 0.75)
+        self.measurements = {'loop utilization %': _Stats(2, 90.0)}
+
+    def open_ring(self):
+        storage = FileStorage(self.path, 8 + 3 * 128)
+        self.addCleanup(storage.close)
+        return storage, MetricsRing(storage, slot_size=128)
+
+    def test_round_trip(self):
+        _, ring = self.open_ring()
+        ring(1000.0, self.root, self.measurements)
+        records = ring.records()
+        self.assertEqual(1, len(records))
+        record = records[0]
+        self.assertEqual(1, record.sequence)
+        self.assertEqual(1000.0, record.elapsed_ms)
+        self.assertEqual(45.0, record.utilization)
+        self.assertEqual([(0, 'loop', 10, 20.0), (1, 'render', 5, 7.5), (0, 'rotary', 3, 0.75)], record.timers)
+        self.assertIn('render', str(record))
+
+    def test_survives_restart_and_wraps(self):
+        storage, ring = self.open_ring()
+        for elapsed in range(4):
+            ring(float(elapsed), self.root, {})
+        storage.close()
+        # Like after a reset: a new ring over the same storage picks up where the old one stopped
+        _, ring = self.open_ring()
+        self.assertEqual([2, 3, 4], [record.sequence for record in ring.records()])
+        ring(4.0, self.root, {})
+        self.assertEqual([3, 4, 5], [record.sequence for record in ring.records()])
+
+    def test_torn_write_loses_only_that_record(self):
+        storage, ring = self.open_ring()
+        for elapsed in range(3):
+            ring(float(elapsed), self.root, {})
+        # A reset halfway through rewriting the middle slot
+        storage[8 + 128 + 20:8 + 128 + 40] = bytes(20)
+        self.assertEqual([1, 3], [record.sequence for record in ring.records()])
+
+    def test_timers_truncated_to_slot(self):
+        for index in range(20):
+            self.root.children['timer number {}'.format(index)] = _Stats(1, 1.0)
+        _, ring = self.open_ring()
+        ring(1.0, self.root, {})
+        timers = ring.records()[0].timers
+        self.assertLess(len(timers), 23)
+        self.assertEqual((0, 'loop', 10, 20.0), timers[0])
+
+    def test_skips_subtrees_with_nothing_recorded(self):
+        idle = _Stats(0, 0)
+        idle.children['idle child'] = _Stats(0, 0)
+        self.root.children['idle'] = idle
+        # Open across the last report: nothing recorded itself, but its child has
+        waiting = _Stats(0, 0)
+        waiting.children['work'] = _Stats(2, 4.0)
+        self.root.children['waiting'] = waiting
+        _, ring = self.open_ring()
+        ring(1.0, self.root, {})
+        self.assertEqual([(0, 'loop', 10, 20.0), (1, 'render', 5, 7.5), (0, 'rotary', 3, 0.75),
+                          (0, 'waiting', 0, 0.0), (1, 'work', 2, 4.0)], ring.records()[0].timers)
+
+    def test_long_names_cut_between_characters(self):
+        # 17 bytes: the 16 byte limit falls in the middle of the last 2 byte character
+        self.root.children['x' + '\u00e9' * 8] = _Stats(1, 1.0)
+        _, ring = self.open_ring()
+        ring(1.0, self.root, {})
+        self.assertEqual('x' + '\u00e9' * 7, ring.records()[0].timers[-1][1])
+
+    def test_heap_read_when_written(self):
+        _, ring = self.open_ring()
+        with mock.patch.object(gc, 'mem_free', lambda: 1234, create=True), \
+                mock.patch.object(gc, 'mem_alloc', lambda: 567, create=True):
+            ring(1.0, self.root, {})
+        record = ring.records()[0]
+        self.assertEqual((1234, 567), (record.heap_free, record.heap_alloc))
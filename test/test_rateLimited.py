@@ -0,0 +1,236 @@
+from unittest import TestCase, mock
+
+from functional import rate_limited as rate_limited_module
+from budget_async.budget_loop import BudgetEventLoop
+from functional.rate_limited import (
+    rate_limited, token_bucket, adaptive_rate_limited, async_rate_limited, paced, Paced, RateStats
+)
+from functional.scheduler import Scheduler
+from test.support import MS, patch_clock
+
+
+class TestRateLimited(TestCase):
+    def setUp(self):
+        # Starting at the epoch, so phase locked grids line up with whole milliseconds
+        self.clock = patch_clock(self, rate_limited_module._epoch)
+        self.calls = []
+
+    def record(self):
+        self.calls.append(int((self.clock.now - rate_limited_module._epoch) // MS))
+        return len(self.calls)
+
+    def test_first_call_runs(self):
+        limited = rate_limited(hz=10)(self.record)
+        self.clock.advance(5000)
+        self.assertEqual(1, limited())
+        self.assertEqual(1, limited())
+
+    def test_phase_offsets_grid(self):
+        limited = rate_limited(hz=10, phase=0.5)(self.record)
+        for _ in range(300):
+            limited()
+            self.clock.advance(1)
+        self.assertEqual([50, 150, 250], self.calls)
+
+    def test_phase_locked_skips_missed_slots(self):
+        stats = RateStats()
+        limited = rate_limited(hz=10, phase=0, stats=stats)(self.record)
+        limited()
+        self.clock.advance(350)
+        limited()
+        self.clock.advance(50)
+        limited()
+        # Stays on the 100ms grid instead of restarting from 350
+        self.assertEqual([0, 350, 400], self.calls)
+        self.assertEqual(1, stats.late)
+        self.assertEqual(2, stats.skipped)
+
+    def test_fixed_delay_counts_late(self):
+        stats = RateStats()
+        limited = rate_limited(hz=10, stats=stats)(self.record)
+        self.clock.advance(1000)
+        limited()
+        self.clock.advance(350)
+        limited()
+        self.assertEqual(1, stats.late)
+        self.assertEqual(2, stats.skipped)
+
+    def test_spread_phases_differ(self):
+        first = rate_limited_module.spread_phase()
+        second = rate_limited_module.spread_phase()
+        self.assertGreater(abs(first - second), 0.2)
+
+
+class TestTokenBucket(TestCase):
+    def setUp(self):
+        self.clock = patch_clock(self, rate_limited_module._epoch)
+        self.calls = 0
+
+    def record(self):
+        self.calls += 1
+
+    def test_bursts_after_quiet(self):
+        limited = token_bucket(hz=10, burst=3)(self.record)
+        for _ in range(5):
+            limited()
+        self.assertEqual(3, self.calls)
+        self.clock.advance(1000)
+        for _ in range(5):
+            limited()
+        self.assertEqual(6, self.calls)
+
+    def test_holds_rate(self):
+        limited = token_bucket(hz=10, burst=2)(self.record)
+        for _ in range(1001):
+            limited()
+            self.clock.advance(1)
+        self.assertEqual(2 + 10, self.calls)
+
+    def test_throttles_counted_and_measured(self):
+        stats = RateStats()
+        measured = []
+        limited = token_bucket(hz=10, burst=1, name='sensor', stats=stats)(self.record)
+        with mock.patch.object(rate_limited_module, 'measure', lambda name, value: measured.append((name, value))):
+            for _ in range(9):
+                limited()
+                self.clock.advance(25)
+        self.assertEqual(3, self.calls)
+        # Every 100ms turn turns away the three 25ms calls before it
+        self.assertEqual(6, stats.throttled)
+        self.assertEqual([('sensor throttled', 0), ('sensor hz', 10.0), ('sensor throttled', 3),
+                          ('sensor hz', 10.0), ('sensor throttled', 3)], measured)
+
+
+class TestAdaptiveRateLimited(TestCase):
+    def setUp(self):
+        self.clock = patch_clock(self, rate_limited_module._epoch)
+        self.cost_ms = 1
+        self.calls = 0
+
+    def render(self):
+        self.calls += 1
+        self.clock.advance(self.cost_ms)
+
+    def run_for(self, limited, ms):
+        end = self.clock.now + ms * MS
+        while self.clock.now < end:
+            limited()
+            self.clock.advance(1)
+
+    def test_runs_at_rate_when_cheap(self):
+        limited = adaptive_rate_limited('render', hz=20, utilization=0.5)(self.render)
+        self.run_for(limited, 1000)
+        self.assertTrue(19 <= self.calls <= 21, self.calls)
+
+    def test_slows_down_when_expensive(self):
+        stats = RateStats()
+        limited = adaptive_rate_limited('render', hz=20, utilization=0.5, stats=stats)(self.render)
+        self.cost_ms = 100
+        self.run_for(limited, 2000)
+        self.calls = 0
+        self.run_for(limited, 2000)
+        # 100ms per call at 50% is 5 calls a second rather than 20
+        self.assertTrue(9 <= self.calls <= 11, self.calls)
+        self.assertGreater(stats.throttled, 0)
+
+    def test_throttles_measured(self):
+        stats = RateStats()
+        throttled = []
+
+        def record(name, value):
+            if name == 'render throttled':
+                throttled.append(value)
+        limited = adaptive_rate_limited('render', hz=20, utilization=0.5, stats=stats)(self.render)
+        self.cost_ms = 100
+        with mock.patch.object(rate_limited_module, 'measure', record):
+            self.run_for(limited, 2000)
+        self.assertEqual(self.calls, len(throttled))
+        self.assertEqual(stats.throttled, sum(throttled))
+        self.assertGreater(stats.throttled, 0)
+
+
+class TestSchedulerPhase(TestCase):
+    def setUp(self):
+        self.clock = patch_clock(self, rate_limited_module._epoch)
+
+    def test_phase_locked_jobs_take_turns(self):
+        scheduler = Scheduler()
+        ran = []
+        scheduler.add(lambda: ran.append('a'), hz=10, phase=0)
+        scheduler.add(lambda: ran.append('b'), hz=10, phase=0.5)
+        most_per_tick = 0
+        for _ in range(400):
+            before = len(ran)
+            scheduler.tick()
+            most_per_tick = max(most_per_tick, len(ran) - before)
+            self.clock.advance(1)
+        self.assertEqual(1, most_per_tick)
+        self.assertEqual(['a', 'b'] * 4, ran)
+
+    def test_phase_locked_job_counts_skipped(self):
+        scheduler = Scheduler()
+        stats = RateStats()
+        scheduler.add(lambda: None, hz=10, phase=0, stats=stats)
+        self.clock.advance(1)
+        scheduler.tick()
+        self.clock.advance(450)
+        scheduler.tick()
+        self.assertEqual(1, stats.late)
+        self.assertEqual(3, stats.skipped)
+
+
+class TestAsyncRateLimited(TestCase):
+    def setUp(self):
+        self.clock = patch_clock(self, rate_limited_module._epoch)
+        self.loop = BudgetEventLoop()
+        self.ran = []
+
+    def now_ms(self):
+        return int((self.clock.now - rate_limited_module._epoch) // MS)
+
+    def run_for(self, ms):
+        idle_ticks = 0
+        for _ in range(ms):
+            wait_nanos = next(self.loop)
+            if wait_nanos is not None and wait_nanos > 0:
+                idle_ticks += 1
+            self.clock.advance(1)
+        return idle_ticks
+
+    def test_decorated_coroutine_sleeps_between_turns(self):
+        @async_rate_limited(hz=10, sleep=self.loop.sleep)
+        async def render():
+            self.ran.append(self.now_ms())
+            return len(self.ran)
+
+        async def task():
+            while await render() < 4:
+                pass
+        self.loop.create_task(task())
+        idle_ticks = self.run_for(350)
+        self.assertEqual([0, 100, 200, 300], self.ran)
+        # Sleeping in between rather than spinning
+        self.assertGreater(idle_ticks, 290)
+
+    def test_paced(self):
+        async def task():
+            async for turn in paced(20, self.loop.sleep):
+                self.ran.append((turn, self.now_ms()))
+        self.loop.create_task(task())
+        self.run_for(120)
+        self.assertEqual([(1, 0), (2, 50), (3, 100)], self.ran)
+
+    def test_paced_counts_late(self):
+        stats = RateStats()
+        pacer = Paced(10, self.loop.sleep, stats)
+
+        async def task():
+            while True:
+                await pacer.wait()
+                self.clock.advance(250)
+                await self.loop.sleep(0)
+        self.loop.create_task(task())
+        next(self.loop)
+        next(self.loop)
+        self.assertEqual(1, stats.late)
+        self.assertEqual(1, stats.skipped)
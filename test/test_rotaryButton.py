@@ -0,0 +1,161 @@
+import time
+from unittest import TestCase
+
+import compat.host
+compat.host.install()
+
+from adafruit_debouncer import Debouncer
+from rotaryio import IncrementalEncoder
+
+from cpy_rotary.acceleration import Acceleration
+from cpy_rotary.edge_queue import EdgeQueue, EdgeSource
+from cpy_rotary.rotarybutton import RotaryButton
+from functional.ticks import ticks_ms
+from test.support import run
+
+
+class TestRotaryButton(TestCase):
+    def setUp(self):
+        self.rotary = IncrementalEncoder()
+        self.button = Debouncer()
+        self.events = []
+        self.rotarybutton = RotaryButton(
+            self.rotary, self.button,
+            on_increment=[lambda amount: self.events.append(('increment', amount))],
+            on_click=[lambda: self.events.append('click')],
+            longhold_duration=0.05,
+            on_longhold_hold=[lambda: self.events.append('hold')],
+            on_longhold_release=[lambda: self.events.append('release')],
+        )
+
+    def loop(self):
+        run(self.rotarybutton.loop())
+
+    def test_increment(self):
+        self.loop()
+        self.rotary.turn(3)
+        self.loop()
+        self.loop()
+        self.assertEqual([('increment', -3)], self.events)
+
+    def test_click(self):
+        self.button.press()
+        self.loop()
+        self.button.release()
+        self.loop()
+        self.assertEqual(['click'], self.events)
+
+    def test_longhold(self):
+        self.button.press()
+        self.loop()
+        time.sleep(0.06)
+        self.loop()
+        self.assertEqual(['hold'], self.events)
+        self.button.release()
+        self.loop()
+        self.assertEqual(['hold', 'release'], self.events)
+
+
+class TestRotaryButtonEvents(TestCase):
+    def setUp(self):
+        self.events = []
+        self.queue = EdgeQueue(capacity=4)
+        self.rotarybutton = RotaryButton(
+            None, None,
+            on_increment=[lambda amount: self.events.append(('increment', amount))],
+            on_click=[lambda: self.events.append('click')],
+            longhold_duration=0.05,
+            on_longhold_hold=[lambda: self.events.append('hold')],
+            on_longhold_release=[lambda: self.events.append('release')],
+            events=self.queue,
+        )
+
+    def loop(self):
+        run(self.rotarybutton.loop())
+
+    def test_spin_coalesces(self):
+        for _ in range(10):
+            self.queue.push_rotation(1)
+        self.queue.push_rotation(-3)
+        self.assertEqual(1, len(self.queue))
+        self.loop()
+        self.loop()
+        self.assertEqual([('increment', 7)], self.events)
+
+    def test_click_during_stall(self):
+        now = ticks_ms()
+        self.queue.push_press(timestamp=now)
+        self.queue.push_release(timestamp=now + 10)
+        self.queue.push_press(timestamp=now + 20)
+        self.queue.push_release(timestamp=now + 100)
+        self.loop()
+        self.assertEqual(['click', 'hold', 'release'], self.events)
+
+    def test_longhold(self):
+        self.queue.push_press()
+        self.loop()
+        self.assertEqual([], self.events)
+        time.sleep(0.06)
+        self.loop()
+        self.assertEqual(['hold'], self.events)
+        self.queue.push_release()
+        self.loop()
+        self.assertEqual(['hold', 'release'], self.events)
+
+    def test_overflow_keeps_rotation(self):
+        for _ in range(4):
+            self.queue.push_press()
+            self.queue.push_rotation(1)
+        self.queue.push_rotation(1)
+        self.assertTrue(self.queue.overflowed)
+        self.assertEqual(4, len(self.queue))
+
+    def test_source_polls_encoder(self):
+        encoder = IncrementalEncoder()
+        self.rotarybutton._event_source = EdgeSource(self.queue, encoder=encoder)
+        self.loop()
+        encoder.turn(2)
+        self.loop()
+        self.assertEqual([('increment', -2)], self.events)
+
+
+class TestAcceleration(TestCase):
+    def test_slow_turns_unscaled(self):
+        acceleration = Acceleration(window_ms=100)
+        self.assertEqual([1, -1, 1], [acceleration.scale(d, 1000 + 200 * i) for i, d in enumerate((1, -1, 1))])
+
+    def test_fast_spin_scales(self):
+        acceleration = Acceleration(window_ms=100, curve=((0, 1), (2, 1), (4, 3)))
+        amounts = [acceleration.scale(-1, 1000 + 10 * i) for i in range(6)]
+        self.assertEqual([-1, -1, -2, -3, -3, -3], amounts)
+
+    def test_rate_across_wraparound(self):
+        acceleration = Acceleration(window_ms=100, curve=((0, 1), (2, 1), (4, 3)))
+        for timestamp in ((1 << 29) - 20, (1 << 29) - 10, 0):
+            acceleration.scale(1, timestamp)
+        self.assertEqual(3, acceleration.scale(1, 10))
+
+    def test_stale_history_after_ticks_wrap(self):
+        acceleration = Acceleration(window_ms=100)
+        for i in range(8):
+            acceleration.scale(3, 1000 + 10 * i)
+        # Half a ticks_ms() period later, about 3.1 days, those timestamps look like they're from the future
+        self.assertEqual(1, acceleration.scale(1, 1070 + (1 << 28) + 5))
+
+    def test_idle_gap_forgets_history(self):
+        acceleration = Acceleration(window_ms=100, curve=((0, 1), (2, 1), (4, 3)))
+        for i in range(3):
+            acceleration.scale(1, 1000 + 10 * i)
+        self.assertEqual(1, acceleration.scale(1, 1500))
+        self.assertEqual(1, acceleration.scale(1, 1510))
+
+    def test_rotarybutton_scales_increments(self):
+        queue = EdgeQueue()
+        events = []
+        rotarybutton = RotaryButton(
+            None, None, on_increment=[events.append], events=queue,
+            acceleration=Acceleration(curve=((0, 1), (4, 1), (8, 2))),
+        )
+        queue.push_rotation(8)
+        run(rotarybutton.loop())
+        self.assertEqual([16], events)
@@ -0,0 +1,55 @@
+import time
+from unittest import TestCase
+
+from functional.scheduler import Scheduler
+
+
+class TestScheduler(TestCase):
+    def test_runs_due_jobs_on_first_tick(self):
+        scheduler = Scheduler()
+        ran = []
+        scheduler.add(lambda: ran.append('a'), hz=1)
+        scheduler.add(lambda: ran.append('b'), hz=1)
+        wait_nanos = scheduler.tick()
+        self.assertEqual(['a', 'b'], ran)
+        self.assertGreater(wait_nanos, 0)
+        self.assertLessEqual(wait_nanos, 1000000000)
+
+    def test_runs_at_rate(self):
+        scheduler = Scheduler()
+        fast = 0
+        slow = 0
+
+        @scheduler.rate_limited(hz=100)
+        def count_fast():
+            nonlocal fast
+            fast += 1
+
+        @scheduler.rate_limited(hz=10)
+        def count_slow():
+            nonlocal slow
+            slow += 1
+
+        start = time.monotonic()
+        while time.monotonic() - start < 0.5:
+            time.sleep(scheduler.tick() / 1000000000)
+        self.assertTrue(35 <= fast <= 52, fast)
+        self.assertTrue(4 <= slow <= 7, slow)
+
+    def test_no_jobs(self):
+        self.assertIsNone(Scheduler().tick())
+
+    def test_job_that_raises_stays_scheduled(self):
+        scheduler = Scheduler()
+        calls = 0
+
+        def flaky():
+            nonlocal calls
+            calls += 1
+            raise ValueError('flaky')
+        scheduler.add(flaky, hz=1000)
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                scheduler.tick()
+            time.sleep(0.002)
+        self.assertEqual(2, calls)
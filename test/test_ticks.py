@@ -0,0 +1,18 @@
+import time
+from unittest import TestCase, mock
+
+from functional.ticks import ticks_ms, ticks_add, ticks_diff
+
+PERIOD = 1 << 29
+
+
+class TestTicks(TestCase):
+    def test_wraps(self):
+        with mock.patch.object(time, 'monotonic_ns', lambda: (PERIOD + 5) * 1000000):
+            self.assertEqual(5, ticks_ms())
+        self.assertEqual(3, ticks_add(PERIOD - 2, 5))
+
+    def test_diff_across_wrap(self):
+        self.assertEqual(7, ticks_diff(ticks_add(PERIOD - 2, 7), PERIOD - 2))
+        self.assertEqual(-7, ticks_diff(PERIOD - 2, ticks_add(PERIOD - 2, 7)))
+        self.assertEqual(PERIOD // 2 - 1, ticks_diff(PERIOD // 2 - 1, 0))